@@ -64,4 +64,5 @@ class WeaponData(TypedDict):
     icon: str
     text_map_key: str
     type: str
+    rarity: int
     stats: dict[str, WeaponStat]
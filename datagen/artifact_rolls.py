@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections.abc import Mapping, Sequence
+from itertools import combinations_with_replacement
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from copy_data import BASE_DATA
+from scaling_engine import artifact_main_stat_array
+from stats import STAT_INDEX, STAT_KEYS, Record
+
+ROLLS_FILE = "rolls.json"
+RARITIES = (1, 2, 3, 4, 5)
+MAX_LEVELS = {1: 4, 2: 4, 3: 12, 4: 16, 5: 20}
+# Most substats an artifact of each rarity can start with
+MAX_INITIAL_SUBSTATS = {1: 0, 2: 1, 3: 2, 4: 3, 5: 4}
+# Levels between substat upgrades
+UPGRADE_INTERVAL = 4
+PRECISION = 4
+
+
+def display_value(stat: str, value: float) -> float:
+    """A stat value in GOOD units, i.e. percentages scaled by 100"""
+    return round(value * 100 if stat.endswith("_") else value, PRECISION)
+
+
+def roll_key(stat: str, value: float) -> str:
+    """A substat total as shown in game, to one decimal for percentages"""
+    return f"{value:.1f}" if stat.endswith("_") else f"{value:.0f}"
+
+
+def max_rolls(rarity: int, level: int) -> int:
+    """Substat rolls an artifact can have had by ``level``"""
+    return (
+        MAX_INITIAL_SUBSTATS[rarity]
+        + min(level, MAX_LEVELS[rarity]) // UPGRADE_INTERVAL
+    )
+
+
+def substat_roll_counts(
+    rarity: int, stat: str, tiers: list[float]
+) -> dict[str, list[int]]:
+    """Every total a substat can reach, mapped to the roll counts that reach it.
+
+    A substat is rolled once when it appears and once per upgrade it wins.
+    Different roll counts can round to the same total, so each maps to all
+    of them.
+    """
+    totals: dict[str, set[int]] = {}
+    for count in range(1, MAX_LEVELS[rarity] // UPGRADE_INTERVAL + 2):
+        for rolls in combinations_with_replacement(tiers, count):
+            totals.setdefault(roll_key(stat, sum(rolls)), set()).add(count)
+    return {
+        key: sorted(counts)
+        for key, counts in sorted(totals.items(), key=lambda item: float(item[0]))
+    }
+
+
+def build_roll_tables(
+    artifact_scaling: dict[int, dict[int, dict[str, float]]],
+    substats: dict[int, dict[str, list[float]]],
+) -> dict[str, Any]:
+    """Dense main stat and substat roll tables, in GOOD units.
+
+    ``main_stats.values`` is indexed ``[rarity][level][stat]`` with the stats
+    in ``main_stats.stats`` order, null where a stat cannot roll.
+    ``substats[rarity][stat]`` holds the stat's roll tiers, lowest first, and
+    ``rolls``, every reachable total mapped to its possible roll counts.
+    """
+    main_stat_keys, main_stats = artifact_main_stat_array(artifact_scaling)
+    values = [
+        [
+            [
+                None if np.isnan(value) else display_value(stat, float(value))
+                for stat, value in zip(main_stat_keys, level)
+            ]
+            for level in rarity
+        ]
+        for rarity in main_stats
+    ]
+
+    substat_tables: dict[str, dict[str, Any]] = {}
+    for rarity, stats in substats.items():
+        if rarity not in MAX_LEVELS:
+            continue
+        substat_tables[str(rarity)] = {}
+        for stat, rolls in stats.items():
+            # Rolls that only differ past PRECISION would count twice
+            tiers = sorted({display_value(stat, roll) for roll in rolls})
+            substat_tables[str(rarity)][stat] = {
+                "tiers": tiers,
+                "rolls": substat_roll_counts(rarity, stat, tiers),
+            }
+
+    return {
+        "main_stats": {"stats": main_stat_keys, "values": values},
+        "substats": substat_tables,
+    }
+
+
+class ArtifactRolls:
+    """Roll tables read from a generated artifacts/rolls.json.
+
+    Main stats and top rolls live in dense arrays and roll counts in a dict,
+    so every lookup is O(1), and roll_efficiency scores a whole inventory
+    with a handful of array operations.
+    """
+
+    def __init__(self, data_dir: Path = BASE_DATA):
+        with (data_dir / "artifacts" / ROLLS_FILE).open() as file:
+            tables = json.load(file)
+
+        self.main_stat_keys: list[str] = tables["main_stats"]["stats"]
+        self._main_stat_index = {s: i for i, s in enumerate(self.main_stat_keys)}
+        # (rarity, level, stat), NaN where the stat cannot roll
+        self.main_stats = np.array(tables["main_stats"]["values"], dtype=float)
+
+        # (rarity, GOOD stat) highest single roll, NaN for stats that never roll
+        self.top_rolls = np.full((max(RARITIES) + 1, len(STAT_KEYS)), np.nan)
+        self.tiers: dict[tuple[int, str], list[float]] = {}
+        self._roll_counts: dict[tuple[int, str, str], tuple[int, ...]] = {}
+        for rarity, stats in tables["substats"].items():
+            for stat, table in stats.items():
+                self.tiers[int(rarity), stat] = table["tiers"]
+                if stat in STAT_INDEX:
+                    self.top_rolls[int(rarity), STAT_INDEX[stat]] = table["tiers"][-1]
+                for key, counts in table["rolls"].items():
+                    self._roll_counts[int(rarity), stat, key] = tuple(counts)
+
+        # (rarity, level) most rolls an artifact can have had
+        self.possible_rolls = np.zeros(
+            (len(self.top_rolls), max(MAX_LEVELS.values()) + 1), dtype=np.intp
+        )
+        for rarity in RARITIES:
+            for level in range(self.possible_rolls.shape[1]):
+                self.possible_rolls[rarity, level] = max_rolls(rarity, level)
+
+    def main_stat(self, rarity: int, level: int, stat: str) -> float:
+        return float(self.main_stats[rarity, level, self._main_stat_index[stat]])
+
+    def roll_counts(self, rarity: int, stat: str, value: float) -> tuple[int, ...]:
+        """Roll counts that add up to a substat value, empty if none can"""
+        return self._roll_counts.get((rarity, stat, roll_key(stat, value)), ())
+
+    def roll_efficiency(
+        self,
+        artifacts: Sequence[Record],
+        weights: Mapping[str, float] | None = None,
+    ) -> np.ndarray:
+        """Weighted substat rolls of each artifact over the most it could have.
+
+        Each substat counts as its value over the stat's top roll, so 1.0
+        means every roll the artifact had so far was a top roll into a stat
+        of weight 1. Without ``weights`` every substat has weight 1.
+        """
+        scores = np.zeros(len(artifacts))
+        if not artifacts:
+            return scores
+        if weights is None:
+            weight_vector = np.ones(len(STAT_KEYS))
+        else:
+            weight_vector = np.array([weights.get(stat, 0.0) for stat in STAT_KEYS])
+
+        rows, columns, values = [], [], []
+        for i, artifact in enumerate(artifacts):
+            for substat in artifact["substats"]:
+                column = STAT_INDEX.get(substat["key"])
+                if column is not None:
+                    rows.append(i)
+                    columns.append(column)
+                    values.append(substat["value"])
+        rarities = np.array([a["rarity"] for a in artifacts], dtype=np.intp)
+        levels = np.array([a["level"] for a in artifacts], dtype=np.intp)
+
+        rows_array = np.array(rows, dtype=np.intp)
+        columns_array = np.array(columns, dtype=np.intp)
+        rolls = (
+            np.array(values, dtype=float)
+            / self.top_rolls[rarities[rows_array], columns_array]
+        )
+        np.add.at(
+            scores, rows_array, np.nan_to_num(rolls) * weight_vector[columns_array]
+        )
+        possible = self.possible_rolls[
+            rarities, np.minimum(levels, self.possible_rolls.shape[1] - 1)
+        ]
+        return scores / np.maximum(possible, 1)
+
+
+def _parse_weights(values: list[str]) -> dict[str, float] | None:
+    if not values:
+        return None
+    weights = {}
+    for value in values:
+        stat, _, weight = value.partition("=")
+        weights[stat] = float(weight or 1)
+    return weights
+
+
+if __name__ == "__main__":
+    from good import GOODConstants, GOODReader
+    from optimizer import random_artifacts
+
+    parser = argparse.ArgumentParser(
+        description="Score artifacts by how well their substats rolled"
+    )
+    parser.add_argument("database", type=Path, nargs="?", help="GOOD database")
+    parser.add_argument("--data-dir", type=Path, default=BASE_DATA)
+    parser.add_argument(
+        "--weight", action="append", default=[], help="stat[=weight], repeatable"
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--random",
+        type=int,
+        metavar="N",
+        help="score N random artifacts instead of a database",
+    )
+    args = parser.parse_args()
+
+    rolls = ArtifactRolls(args.data_dir)
+    if args.random:
+        artifacts = random_artifacts(args.random, ["Random"])
+    elif args.database:
+        reader = GOODReader([args.database], GOODConstants.load())
+        artifacts = list(reader.iter_section("artifacts"))
+    else:
+        parser.error("Either a database or --random is required")
+
+    start = time.perf_counter()
+    scores = rolls.roll_efficiency(artifacts, _parse_weights(args.weight))
+    elapsed = time.perf_counter() - start
+    print(f"Scored {len(artifacts)} artifacts in {elapsed * 1000:.1f}ms")
+    for i in np.argsort(-scores)[: args.top]:
+        artifact = artifacts[i]
+        substats = ", ".join(
+            f"{s['key']} {s['value']}" for s in artifact["substats"] if s["key"]
+        )
+        print(
+            f"{scores[i]:.0%}: {artifact['setKey']} {artifact['slotKey']}"
+            f" {artifact['mainStatKey']} ({substats})"
+        )
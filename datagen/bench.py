@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+BENCH_OUTPUT = Path("../bench_output.txt")
+# Slowdown over the baseline median before a stage counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any):
+        pass
+
+
+def serve_fixtures(fixtures: Path) -> ThreadingHTTPServer:
+    """Serve a fixtures directory as a local stand-in for the upstream hosts"""
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), partial(QuietHandler, directory=str(fixtures))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_once(
+    config: dict[str, Any], trace_memory: bool = False
+) -> list[dict[str, Any]]:
+    """Run every stage of main.py in a fresh workspace and time each one.
+
+    Runs in its own interpreter, so module level caches start cold. Source
+    tables are loaded by whichever stage first needs them, mostly
+    load_sources. With ``trace_memory`` each stage also records, via
+    tracemalloc, its peak allocation above what was allocated when it
+    started and how much of it it kept. Tracing slows every allocation, so
+    those runs are not timed, and allocations in worker processes are not
+    seen.
+    """
+    from cache import SOURCE_CACHE
+    from character_filter import CharacterFilter
+    from copy_data import copy_artifact_data, copy_character_data, copy_weapon_data
+    from data_context import DataContext
+    from diff_data import diff_generation
+    from fetch_data import TEXTMAP
+    from generate_data import (
+        generate_artifact_dirs,
+        generate_character_dirs,
+        generate_constants,
+        generate_weapon_data,
+    )
+    from schema import validate_sources
+    from state import GenerationState
+
+    # Read from the datagen directory before moving into the workspace
+    character_filter = CharacterFilter.load()
+    workspace = Path(tempfile.mkdtemp(prefix="datagen-bench-"))
+    (workspace / "datagen").mkdir()
+    (workspace / "src" / "data").mkdir(parents=True)
+    os.chdir(workspace / "datagen")
+
+    fixtures = None if config["serve"] else Path(config["fixtures"])
+    SOURCE_CACHE.configure(fixtures=fixtures)
+    TEXTMAP.configure(projected=not config["full_textmap"])
+
+    state = GenerationState(force=True)
+    ctx = DataContext(state)
+    compact = config["format"] == "compact"
+    no_images = not config["images"]
+    jobs = config["jobs"]
+    constants: dict[str, Any] = {}
+
+    def load_sources():
+        for view in ("characters", "artifacts", "weapons", "artifact_scaling"):
+            getattr(ctx, view)
+
+    def constants_stage():
+        constants.update(
+            generate_constants(ctx, no_file=True, character_filter=character_filter)
+        )
+
+    def copy_stage():
+        state.save()
+        copy_character_data(state.changed("characters"))
+        copy_artifact_data(state.changed("artifacts"))
+        copy_weapon_data(state.changed("weapons"))
+
+    stages: list[tuple[str, Callable[[], Any]]] = [
+        ("load_sources", load_sources),
+        ("validate_sources", lambda: validate_sources(ctx)),
+        ("generate_constants", constants_stage),
+        ("build_scaling", lambda: ctx.character_scalings),
+        (
+            "generate_character_dirs",
+            lambda: generate_character_dirs(
+                ctx,
+                constants,
+                no_images=no_images,
+                jobs=jobs,
+                compact=compact,
+                float_encoding=config["float_encoding"],
+            ),
+        ),
+        (
+            "generate_artifact_dirs",
+            lambda: generate_artifact_dirs(
+                ctx, constants, no_images=no_images, jobs=jobs
+            ),
+        ),
+        (
+            "generate_weapon_data",
+            lambda: generate_weapon_data(
+                ctx,
+                constants,
+                no_images=no_images,
+                jobs=jobs,
+                compact=compact,
+                float_encoding=config["float_encoding"],
+            ),
+        ),
+        ("diff_generation", lambda: diff_generation(state, {})),
+        ("copy_data", copy_stage),
+    ]
+
+    results = []
+    output = sys.stdout if config["verbose"] else open(os.devnull, "w")
+    try:
+        with contextlib.redirect_stdout(output):
+            if trace_memory:
+                tracemalloc.start()
+            for name, stage in stages:
+                if trace_memory:
+                    tracemalloc.reset_peak()
+                    before, _ = tracemalloc.get_traced_memory()
+                start = time.perf_counter()
+                stage()
+                result = {"stage": name, "seconds": time.perf_counter() - start}
+                if trace_memory:
+                    current, peak = tracemalloc.get_traced_memory()
+                    result["peak_kb"] = (peak - before) / 1024
+                    result["retained_kb"] = (current - before) / 1024
+                results.append(result)
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(workspace, ignore_errors=True)
+    return results
+
+
+def summarise(
+    runs: list[list[dict[str, Any]]], memory: list[dict[str, Any]] | None = None
+) -> dict[str, dict[str, float]]:
+    summary = {}
+    for stage in [result["stage"] for result in runs[0]]:
+        seconds = [r["seconds"] for run in runs for r in run if r["stage"] == stage]
+        summary[stage] = {
+            "min": min(seconds),
+            "median": statistics.median(seconds),
+            "max": max(seconds),
+        }
+    for result in memory or []:
+        summary[result["stage"]]["peak_kb"] = result["peak_kb"]
+        summary[result["stage"]]["retained_kb"] = result["retained_kb"]
+    return summary
+
+
+def find_regressions(
+    summary: dict[str, dict[str, float]],
+    config: dict[str, Any],
+    baseline_path: Path,
+    tolerance: float,
+) -> list[str]:
+    with baseline_path.open() as file:
+        recorded = json.load(file)
+    if recorded["config"] != config:
+        print("Warning: the baseline was recorded with a different configuration")
+    baseline = recorded["summary"]
+    regressions = []
+    for stage, result in summary.items():
+        if stage not in baseline:
+            continue
+        before = baseline[stage]["median"]
+        if result["median"] > before * (1 + tolerance):
+            regressions.append(
+                f"{stage}: {result['median']:.3f}s, baseline {before:.3f}s"
+            )
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark datagen against recorded fixtures")
+    parser.add_argument(
+        "fixtures",
+        type=Path,
+        help="Directory with ExcelBinOutput/, TextMap/ and optionally ui/,"
+        " as written by record_fixtures.py",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Replay fixtures through a local HTTP server instead of reading them",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="Download textures from the fixtures too, requires --serve",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--format", choices=("expanded", "compact"), default="compact")
+    parser.add_argument("--float-encoding", default="json")
+    parser.add_argument("--full-textmap", action="store_true")
+    parser.add_argument("--output", type=Path, default=BENCH_OUTPUT)
+    parser.add_argument(
+        "--baseline", type=Path, help="Previous output to check for regressions"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip the extra run that traces each stage's allocations",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args: Namespace = parser.parse_args()
+    if args.images and not args.serve:
+        parser.error("--images requires --serve")
+
+    fixtures = args.fixtures.resolve()
+    config = {
+        "fixtures": str(fixtures),
+        "serve": args.serve,
+        "images": args.images,
+        "jobs": args.jobs,
+        "format": args.format,
+        "float_encoding": args.float_encoding,
+        "full_textmap": args.full_textmap,
+        "verbose": args.verbose,
+    }
+
+    server = None
+    if args.serve:
+        server = serve_fixtures(fixtures)
+        base = f"http://127.0.0.1:{server.server_port}"
+        os.environ["DATAGEN_DATA_URL"] = f"{base}/ExcelBinOutput"
+        os.environ["DATAGEN_TEXTURES_URL"] = f"{base}/ui/"
+    # Every run starts from an empty cache inside its workspace
+    os.environ["DATAGEN_CACHE_DIR"] = "./.cache"
+
+    def run_in_subprocess(trace_memory: bool) -> list[dict[str, Any]]:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            return executor.submit(run_once, config, trace_memory).result()
+
+    runs = []
+    memory = None
+    try:
+        for i in range(args.repeat):
+            run = run_in_subprocess(False)
+            runs.append(run)
+            total = sum(r["seconds"] for r in run)
+            print(f"Run {i + 1}/{args.repeat}: {total:.2f}s")
+        if not args.no_memory:
+            memory = run_in_subprocess(True)
+            print("Traced allocations in one more run")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    summary = summarise(runs, memory)
+    for stage, result in summary.items():
+        line = f"{stage:<24} {result['median']:8.3f}s median"
+        if memory is not None:
+            line += (
+                f" {result['peak_kb'] / 1024:8.1f} MiB peak"
+                f" {result['retained_kb'] / 1024:+8.1f} MiB retained"
+            )
+        print(line)
+
+    with args.output.open("w") as file:
+        json.dump(
+            {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "config": config,
+                "runs": runs,
+                "memory": memory,
+                "summary": summary,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Wrote results to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(summary, config, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression in {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
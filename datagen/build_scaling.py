@@ -2,28 +2,28 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from fetch_data import get_ascension_values, get_character_curves
-
 if TYPE_CHECKING:
-    from _types import CharacterData, CharacterScaling
+    from _types import CharacterBases, CharacterData, CharacterScaling
+    from scaling_engine import ScalingEngine
 
-CURVES = get_character_curves()
-ASCENSION_VALUES = get_ascension_values()
 
+def build_scaling(
+    data: list[CharacterData],
+    engine: ScalingEngine,
+    ascension_values: dict[int, dict[int, CharacterBases]],
+) -> dict[int, CharacterScaling]:
+    # (character, level, stat) multipliers for the whole roster in one gather
+    multipliers = engine.character_multipliers(data).tolist()
 
-def build_scaling(data: list[CharacterData]) -> dict[int, CharacterScaling]:
     scalings: dict[int, CharacterScaling] = {}
-    for character in data:
+    for character, levels in zip(data, multipliers):
         scalings[character["id"]] = {  # type: ignore
             "level_multipliers": [
-                {
-                    k: CURVES[lvl][k][character["curves"][k]]
-                    for k in ["hp", "atk", "def_"]
-                } for lvl in range(100)
+                {"hp": hp, "atk": atk, "def_": def_} for hp, atk, def_ in levels
             ],
             "ascension_values": {
                 ascension: {
-                    k: ASCENSION_VALUES[character["ascension_id"]][ascension][k]
+                    k: ascension_values[character["ascension_id"]][ascension][k]
                     for k in ["hp", "atk", "def_"]
                 }
                 for ascension in range(0, 7)
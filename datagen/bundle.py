@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+
+from copy_data import BASE_OUTPUT
+from encoding import decode_floats
+from metrics import METRICS
+from scaling_engine import CHARACTER_STATS
+from stats import STAT_KEYS, StatCalculator
+
+BUNDLE_PATH = Path("./output/data.bundle")
+BUNDLE_MAGIC = b"GBMDATA\0"
+BUNDLE_VERSION = 1
+# magic, version, entry count, offset of the first array
+HEADER = struct.Struct("<8sIIQ")
+# name, offset, element count, ndim, shape
+INDEX_ENTRY = struct.Struct("<64sQQI4I")
+MAX_NDIM = 4
+ALIGNMENT = 64
+DTYPE = np.dtype("<f4")
+
+
+class BundleError(ValueError):
+    pass
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def bundle_arrays(calculator: StatCalculator) -> dict[str, np.ndarray]:
+    """Every array stored in a bundle, keyed by its name.
+
+    * ``characters/<Key>``: ``(level, ascension, hp/atk/def_)`` base stats
+    * ``weapons/<Key>/base_atk``: ``(level, ascension)`` base ATK, NaN past
+      the weapon's last ascension
+    * ``weapons/<Key>/<stat>``: per-level value of the weapon substat
+    * ``artifacts/main_stats/<stat>``: ``(rarity, level)`` main stat values
+    * ``curves/characters/<curve>`` and ``curves/weapons/<curve>``: growth
+      curve multipliers per level
+    """
+    arrays: dict[str, np.ndarray] = {}
+    for key, i in calculator.character_index.items():
+        arrays[f"characters/{key}"] = calculator.character_table[i]
+    for key, i in calculator.weapon_index.items():
+        arrays[f"weapons/{key}/base_atk"] = calculator.weapon_atk_table[i]
+        substat = calculator.weapon_substat_keys[i]
+        if substat >= 0:
+            name = f"weapons/{key}/{STAT_KEYS[substat]}"
+            arrays[name] = calculator.weapon_substats[i]
+    for i, stat in enumerate(calculator.artifact_stats):
+        arrays[f"artifacts/main_stats/{stat}"] = calculator.artifact_main_stats[:, :, i]
+    for category in ("characters", "weapons"):
+        curves_path = calculator.data_dir / category / "curves.json"
+        if not curves_path.is_file():
+            continue
+        with curves_path.open() as file:
+            for name, values in json.load(file).items():
+                arrays[f"curves/{category}/{name}"] = np.array(decode_floats(values))
+    return arrays
+
+
+def encode_bundle(arrays: dict[str, np.ndarray]) -> bytes:
+    """Pack float arrays into the bundle layout read by DataBundle.
+
+    A fixed header is followed by one fixed-size index entry per array,
+    sorted by name, then the little-endian float32 arrays themselves, each
+    aligned to 64 bytes.
+    """
+    names = sorted(arrays)
+    data_offset = offset = _align(HEADER.size + INDEX_ENTRY.size * len(names))
+    index, blobs = [], []
+    for name in names:
+        array = np.ascontiguousarray(arrays[name], dtype=DTYPE)
+        encoded = name.encode()
+        if len(encoded) > 64 or array.ndim > MAX_NDIM:
+            raise BundleError(f"Cannot store {name!r} with shape {array.shape}")
+        shape = (*array.shape, *[0] * (MAX_NDIM - array.ndim))
+        index.append(INDEX_ENTRY.pack(encoded, offset, array.size, array.ndim, *shape))
+        blobs.append((offset, array.tobytes()))
+        offset = _align(offset + array.nbytes)
+
+    data = bytearray(offset)
+    HEADER.pack_into(data, 0, BUNDLE_MAGIC, BUNDLE_VERSION, len(names), data_offset)
+    data[HEADER.size : HEADER.size + INDEX_ENTRY.size * len(index)] = b"".join(index)
+    for start, blob in blobs:
+        data[start : start + len(blob)] = blob
+    return bytes(data)
+
+
+def write_bundle(calculator: StatCalculator, path: Path = BUNDLE_PATH) -> bool:
+    """Write the bundle of a generated data directory unless it is unchanged"""
+    data = encode_bundle(bundle_arrays(calculator))
+    if path.is_file() and path.read_bytes() == data:
+        return False
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    METRICS.record_written(path)
+    return True
+
+
+class DataBundle:
+    """Read-only, memory-mapped view of a bundle written by write_bundle.
+
+    Arrays are NumPy views straight onto the mapped pages, so opening a
+    bundle only parses its index, and every process mapping the same file
+    shares one copy of it. Arrays must not outlive ``close``.
+    """
+
+    def __init__(self, path: Path = BUNDLE_PATH):
+        self.path = path
+        with path.open("rb") as file:
+            # mmap cannot map an empty file, and a short one has no header
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise BundleError(f"{path} is empty or truncated")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, _ = HEADER.unpack_from(self._mmap)
+            if magic != BUNDLE_MAGIC:
+                raise BundleError(f"{path} is not a data bundle")
+            if version != BUNDLE_VERSION:
+                raise BundleError(
+                    f"{path} is bundle version {version}, expected {BUNDLE_VERSION}"
+                )
+            if HEADER.size + count * INDEX_ENTRY.size > len(self._mmap):
+                raise BundleError(f"{path} is truncated within its index")
+            self.index: dict[str, tuple[int, int, tuple[int, ...]]] = {}
+            for i in range(count):
+                name, offset, size, ndim, *shape = INDEX_ENTRY.unpack_from(
+                    self._mmap, HEADER.size + i * INDEX_ENTRY.size
+                )
+                if offset + size * DTYPE.itemsize > len(self._mmap):
+                    raise BundleError(f"{path} is truncated within its arrays")
+                self.index[name.rstrip(b"\0").decode()] = (
+                    offset,
+                    size,
+                    tuple(shape[:ndim]),
+                )
+        except (BundleError, struct.error):
+            self._mmap.close()
+            raise
+
+    def __enter__(self) -> DataBundle:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def names(self, prefix: str = "") -> Iterator[str]:
+        return (name for name in self.index if name.startswith(prefix))
+
+    def array(self, name: str) -> np.ndarray:
+        try:
+            offset, size, shape = self.index[name]
+        except KeyError:
+            raise KeyError(f"No array {name!r} in {self.path}") from None
+        return np.frombuffer(self._mmap, DTYPE, size, offset).reshape(shape)
+
+    def character_base_stat(
+        self, key: str, level: int, ascension: int, stat: str
+    ) -> float:
+        """Base hp, atk or def_ of a character, without weapon ATK"""
+        table = self.array(f"characters/{key}")
+        return float(table[level - 1, ascension, CHARACTER_STATS.index(stat)])
+
+    def weapon_base_atk(self, key: str, level: int, ascension: int) -> float:
+        return float(self.array(f"weapons/{key}/base_atk")[level - 1, ascension])
+
+    def artifact_main_stat(self, stat: str, rarity: int, level: int) -> float:
+        return float(self.array(f"artifacts/main_stats/{stat}")[rarity, level])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pack a generated data directory into a binary bundle"
+    )
+    parser.add_argument("--data-dir", type=Path, default=BASE_OUTPUT)
+    parser.add_argument("-o", "--output", type=Path, default=BUNDLE_PATH)
+    args = parser.parse_args()
+
+    if write_bundle(StatCalculator(args.data_dir), args.output):
+        print(f"Wrote {args.output}")
+    else:
+        print(f"{args.output} is up to date")
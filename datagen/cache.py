@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import METRICS
+
+if TYPE_CHECKING:
+    from yarl import URL
+
+CACHE_DIR = Path(os.environ.get("DATAGEN_CACHE_DIR", "./.cache"))
+# Seconds a cached file is trusted before it is revalidated upstream
+DEFAULT_MAX_AGE = 60 * 60
+# (connect, read) timeouts of upstream requests, in seconds
+TIMEOUT = (10, 60)
+RETRIES = 4
+BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CHUNK_SIZE = 1 << 16
+# Values of a boolean environment variable that turn it on
+TRUTHY = frozenset({"1", "true", "yes", "on"})
+
+
+class OfflineError(RuntimeError):
+    pass
+
+
+class SourceCache:
+    """Content-addressed on-disk cache for upstream source files.
+
+    Each file is stored once under ``objects/`` keyed by its sha256, and
+    ``index.json`` maps source URLs to the stored object along with the
+    ``ETag``/``Last-Modified`` validators used to revalidate it.
+    """
+
+    def __init__(
+        self,
+        root: Path = CACHE_DIR,
+        *,
+        offline: bool = False,
+        fixtures: Path | None = None,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        self.root = root
+        self.offline = offline
+        self.fixtures = fixtures
+        self.max_age = max_age
+        self._index: dict[str, dict[str, Any]] | None = None
+        # URLs already validated during this process
+        self._fresh: set[str] = set()
+        self._session: requests.Session | None = None
+
+    def configure(
+        self,
+        *,
+        offline: bool | None = None,
+        fixtures: Path | None = None,
+        max_age: float | None = None,
+    ):
+        if offline is not None:
+            self.offline = offline
+        if fixtures is not None:
+            self.fixtures = fixtures
+        if max_age is not None:
+            self.max_age = max_age
+
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive session for fetches that were not prefetched"""
+        if self._session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=("GET",),
+            )
+            self._session = requests.Session()
+            self._session.mount("https://", HTTPAdapter(max_retries=retry))
+            self._session.mount("http://", HTTPAdapter(max_retries=retry))
+        return self._session
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.json"
+
+    @property
+    def index(self) -> dict[str, dict[str, Any]]:
+        if self._index is None:
+            try:
+                with self.index_path.open() as file:
+                    self._index = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = {}
+        return self._index  # type: ignore
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with tmp_path.open("w") as file:
+            json.dump(self.index, file, indent=2)
+        tmp_path.replace(self.index_path)
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def fixture_path(self, url: URL) -> Path:
+        # Fixtures mirror the last two URL segments, i.e. ExcelBinOutput/<name>
+        assert self.fixtures is not None
+        return self.fixtures / url.parent.name / url.name
+
+    def fetch(self, url: URL) -> Path:
+        """Return a local path holding the contents of ``url``"""
+        start = time.perf_counter()
+        path, source, size = self._fetch(url)
+        METRICS.record_fetch(str(url), source, time.perf_counter() - start, size)
+        return path
+
+    def _fetch(self, url: URL) -> tuple[Path, str, int]:
+        if self.fixtures is not None:
+            path = self.fixture_path(url)
+            if not path.is_file():
+                raise FileNotFoundError(f"No fixture for {url} at {path}")
+            return path, "fixture", path.stat().st_size
+
+        key = str(url)
+        entry = self.index.get(key)
+        cached = self.cached_path(url)
+        if cached is not None:
+            return cached, "cache", entry.get("size", 0)  # type: ignore
+        if self.offline:
+            raise OfflineError(f"{url} is not cached and offline mode is enabled")
+        if entry is not None and self.object_path(entry["sha256"]).is_file():
+            cached = self.object_path(entry["sha256"])
+
+        with self.session.get(
+            key, headers=self.request_headers(key), stream=True, timeout=TIMEOUT
+        ) as resp:
+            if resp.status_code == 304 and cached is not None:
+                self.mark_revalidated(key)
+                return cached, "revalidated", entry.get("size", 0)  # type: ignore
+            resp.raise_for_status()
+
+            tmp_path = self.download_path(key)
+            digest = hashlib.sha256()
+            size = 0
+            with tmp_path.open("wb") as file:
+                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    file.write(chunk)
+            object_path = self.store(
+                key, tmp_path, digest.hexdigest(), size, resp.headers
+            )
+            return object_path, "download", size
+
+    def cached_path(self, url: URL) -> Path | None:
+        """Path of the stored copy of ``url`` that can be used without asking upstream"""
+        key = str(url)
+        entry = self.index.get(key)
+        if entry is None or not self.object_path(entry["sha256"]).is_file():
+            return None
+        if (
+            self.offline
+            or key in self._fresh
+            or time.time() - entry["checked_at"] < self.max_age
+        ):
+            return self.object_path(entry["sha256"])
+        return None
+
+    def needs_fetch(self, url: URL) -> bool:
+        """Whether fetching ``url`` would go upstream"""
+        return (
+            self.fixtures is None and not self.offline and self.cached_path(url) is None
+        )
+
+    def request_headers(self, key: str) -> dict[str, str]:
+        """Conditional request headers revalidating the stored copy of ``key``"""
+        entry = self.index.get(key)
+        headers = {}
+        if entry is not None and self.object_path(entry["sha256"]).is_file():
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def download_path(self, key: str) -> Path:
+        """Temporary path a download of ``key`` is streamed to before store"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return self.root / f"download-{os.getpid()}-{name}.tmp"
+
+    def mark_revalidated(self, key: str):
+        self.index[key]["checked_at"] = time.time()
+        self._save_index()
+        self._fresh.add(key)
+
+    def store(
+        self,
+        key: str,
+        tmp_path: Path,
+        digest: str,
+        size: int,
+        headers: Mapping[str, str],
+    ) -> Path:
+        """Move a finished download into the object store and index it"""
+        object_path = self.object_path(digest)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.replace(object_path)
+        self.index[key] = {
+            "sha256": digest,
+            "size": size,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "checked_at": time.time(),
+        }
+        self._save_index()
+        self._fresh.add(key)
+        return object_path
+
+    def load_json(self, url: URL) -> Any:
+        path = self.fetch(url)
+        with METRICS.timer("parse"), path.open("rb") as file:
+            return json.load(file)
+
+
+SOURCE_CACHE = SourceCache(
+    offline=os.environ.get("DATAGEN_OFFLINE", "").strip().lower() in TRUTHY,
+    fixtures=(
+        Path(os.environ["DATAGEN_FIXTURES"])
+        if os.environ.get("DATAGEN_FIXTURES")
+        else None
+    ),
+    max_age=float(os.environ.get("DATAGEN_CACHE_MAX_AGE", DEFAULT_MAX_AGE)),
+)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from scaling_engine import MAX_ASCENSION
+
+if TYPE_CHECKING:
+    from _types import CharacterData
+    from data_context import DataContext
+
+CHARACTER_FILTER_PATH = Path("./character_filter.json")
+
+
+def _has_icon(character: CharacterData, ctx: DataContext) -> str | None:
+    if not character["icon"].startswith("UI_AvatarIcon_"):
+        return f"invalid icon {character['icon']!r}"
+    return None
+
+
+def _has_base_stats(character: CharacterData, ctx: DataContext) -> str | None:
+    missing = [stat for stat, value in character["base"].items() if value <= 0]
+    if missing:
+        return f"no base {', '.join(missing)}"
+    return None
+
+
+def _has_promote_data(character: CharacterData, ctx: DataContext) -> str | None:
+    ascensions = ctx.ascension_values.get(character["ascension_id"], {})
+    missing = [asc for asc in range(MAX_ASCENSION + 1) if asc not in ascensions]
+    if missing:
+        return (
+            f"promote id {character['ascension_id']} has no ascension"
+            f" {', '.join(map(str, missing))}"
+        )
+    return None
+
+
+def _has_curves(character: CharacterData, ctx: DataContext) -> str | None:
+    missing = [
+        curve
+        for curve in character["curves"].values()
+        if curve not in ctx.character_curve_table
+    ]
+    if missing:
+        return f"unknown growth curve {', '.join(missing)}"
+    return None
+
+
+# Checks a character must pass, each returning why it failed or None
+RULES: dict[str, Callable[[CharacterData, DataContext], str | None]] = {
+    "has_icon": _has_icon,
+    "has_base_stats": _has_base_stats,
+    "has_promote_data": _has_promote_data,
+    "has_curves": _has_curves,
+}
+
+
+class FilterResult(NamedTuple):
+    included: list[str]
+    # Reasons each excluded character was dropped, keyed by "Key (id)"
+    excluded: dict[str, list[str]]
+    # Policy entries that matched no character
+    unused: list[str]
+
+    def report(self) -> str:
+        lines = [
+            f"Included {len(self.included)} characters,"
+            f" excluded {len(self.excluded)}"
+        ]
+        for name, reasons in self.excluded.items():
+            lines.append(f"  {name}: {'; '.join(reasons)}")
+        for entry in self.unused:
+            lines.append(f"  Warning: policy entry {entry!r} matched no character")
+        return "\n".join(lines)
+
+
+class CharacterFilter:
+    """Include and exclude policy for the characters written to constants.json.
+
+    Entries in ``include`` and ``exclude`` are constants.json keys such as
+    ``HuTao``, or character ids. A non-empty ``include`` keeps only the listed
+    characters, ``exclude`` always wins, and every character must also pass
+    each of the named ``rules``.
+    """
+
+    def __init__(
+        self,
+        include: Iterable[str | int] = (),
+        exclude: Iterable[str | int] = (),
+        rules: Iterable[str] = tuple(RULES),
+    ):
+        self.include = set(include)
+        self.exclude = set(exclude)
+        self.rules = list(rules)
+        unknown = [rule for rule in self.rules if rule not in RULES]
+        if unknown:
+            raise ValueError(f"Unknown character filter rules: {', '.join(unknown)}")
+
+    @classmethod
+    def load(cls, path: Path = CHARACTER_FILTER_PATH) -> CharacterFilter:
+        with path.open(encoding="utf-8") as file:
+            policy: dict[str, Any] = json.load(file)
+        return cls(
+            policy.get("include", ()),
+            policy.get("exclude", ()),
+            policy.get("rules", tuple(RULES)),
+        )
+
+    def evaluate(
+        self, ctx: DataContext, characters: Iterable[tuple[str, CharacterData]]
+    ) -> FilterResult:
+        """Split ``(key, character)`` pairs into included keys and exclusions"""
+        included: list[str] = []
+        excluded: dict[str, list[str]] = {}
+        matched: set[str | int] = set()
+        for key, character in characters:
+            entries = {key, character["id"]}
+            matched |= entries & (self.include | self.exclude)
+
+            reasons = []
+            if entries & self.exclude:
+                reasons.append("excluded by policy")
+            elif self.include and not entries & self.include:
+                reasons.append("not in the include list")
+            for rule in self.rules:
+                reason = RULES[rule](character, ctx)
+                if reason is not None:
+                    reasons.append(f"{rule}: {reason}")
+
+            if reasons:
+                excluded[f"{key} ({character['id']})"] = reasons
+            else:
+                included.append(key)
+
+        unused = sorted(map(str, (self.include | self.exclude) - matched))
+        return FilterResult(included, excluded, unused)
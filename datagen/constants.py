@@ -1,9 +1,16 @@
+import os
+
 from yarl import URL
 
 # Source for textures to be downloaded from
-TexturesBase = URL("https://enka.network/ui/")
+TexturesBase = URL(os.environ.get("DATAGEN_TEXTURES_URL", "https://enka.network/ui/"))
 # Source for data files to be downloaded from
-DataFileBase = URL("https://gitlab.com/Dimbreath/AnimeGameData/-/raw/master/ExcelBinOutput")
+DataFileBase = URL(
+    os.environ.get(
+        "DATAGEN_DATA_URL",
+        "https://gitlab.com/Dimbreath/AnimeGameData/-/raw/master/ExcelBinOutput",
+    )
+)
 
 # Map data stat names to GOOD stat keys
 STAT_MAPPING = {
@@ -37,6 +44,9 @@ SLOT_MAPPING = {
     "EQUIP_DRESS": "circlet",
 }
 
+# Map ReliquaryAffixExcelConfigData depots to the rarity whose substats they roll
+SUBSTAT_DEPOTS = {101: 1, 201: 2, 301: 3, 401: 4, 501: 5}
+
 # Map data weapon types to GOOD weapon type keys
 WEAPON_TYPE_MAPPING = {
     "WEAPON_BOW": "Bow",
@@ -1,20 +1,193 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import tempfile
+from collections.abc import Iterable, Iterator
 from functools import partial
 from pathlib import Path
-from shutil import copy as copyfile
-from shutil import copytree, rmtree
+from shutil import copy2, rmtree
+from typing import NamedTuple
+
+from metrics import METRICS
 
 BASE_OUTPUT = Path("./output")
 BASE_DATA = Path("../src/data")
+# Suffix of the staging directories created next to a sync's source
+STAGING_SUFFIX = ".sync-"
+HASH_CHUNK = 1 << 20
+
+
+def copyfile(source: str, dest: str) -> str:
+    copied = copy2(source, dest)
+    METRICS.count("files_copied")
+    METRICS.count("bytes_copied", Path(copied).stat().st_size)
+    return copied
+
+
+def file_digest(path: Path) -> bytes:
+    digest = hashlib.blake2b()
+    with path.open("rb") as file:
+        while chunk := file.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def same_file(source: Path, dest: Path) -> bool:
+    """Whether ``dest`` already holds the content of ``source``.
+
+    Files of the same size and modification time are taken as equal without
+    reading them, like rsync's quick check; otherwise equal sizes are hashed.
+    """
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+    source_stat = source.stat()
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if (source_stat.st_ino, source_stat.st_dev) == (dest_stat.st_ino, dest_stat.st_dev):
+        return True
+    if source_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    return file_digest(source) == file_digest(dest)
+
+
+def _iter_files(path: Path) -> Iterator[Path]:
+    if path.is_file():
+        yield path
+    elif path.is_dir():
+        for root, _, files in os.walk(path):
+            for name in files:
+                yield Path(root, name)
+
+
+class SyncPlan(NamedTuple):
+    """Differences between a generated tree and its copy, as relative paths"""
+
+    added: list[Path]
+    changed: list[Path]
+    removed: list[Path]
+    unchanged: int
+
+    def report(self) -> str:
+        lines = [f"+ {path}" for path in self.added]
+        lines += [f"~ {path}" for path in self.changed]
+        lines += [f"- {path}" for path in self.removed]
+        lines.append(
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged"
+        )
+        return "\n".join(lines)
+
+
+def plan_sync(source: Path, dest: Path, names: Iterable[str] | None = None) -> SyncPlan:
+    """Compare ``source`` with ``dest``, limited to the entries in ``names``.
+
+    Files under a synced entry that no longer exist in ``source`` are
+    removed; entries missing from ``source`` altogether are left alone.
+    """
+    children = (
+        sorted(source.iterdir())
+        if names is None
+        else [source / name for name in sorted(names)]
+    )
+    added, changed, removed, unchanged = [], [], [], 0
+    for child in children:
+        if not child.exists():
+            continue
+        generated = set()
+        for path in _iter_files(child):
+            relative = path.relative_to(source)
+            generated.add(relative)
+            if not (dest / relative).exists():
+                added.append(relative)
+            elif same_file(path, dest / relative):
+                unchanged += 1
+            else:
+                changed.append(relative)
+        for path in _iter_files(dest / child.name):
+            relative = path.relative_to(dest)
+            if relative not in generated:
+                removed.append(relative)
+    return SyncPlan(added, changed, removed, unchanged)
+
+
+def _remove_empty_dirs(path: Path, stop: Path):
+    while path != stop:
+        try:
+            path.rmdir()
+        except OSError:
+            return
+        path = path.parent
+
+
+def _staging_dir(source: Path, dest: Path) -> Path:
+    """Create the hidden directory a sync from ``source`` into ``dest`` stages in.
+
+    It goes next to ``source``, outside the app tree a file watcher sees.
+    Files can only be renamed into place within one filesystem, so when
+    ``dest`` is on another one it goes next to ``dest`` instead.
+    """
+    parent = source.parent
+    if parent.stat().st_dev != dest.stat().st_dev:
+        parent = dest.parent
+    return Path(tempfile.mkdtemp(prefix=f".{dest.name}{STAGING_SUFFIX}", dir=parent))
+
+
+def apply_sync(plan: SyncPlan, source: Path, dest: Path, link: bool = True):
+    """Bring ``dest`` in line with ``source`` following ``plan``.
+
+    New content is first staged in a hidden directory from _staging_dir,
+    hardlinked from ``source`` where the filesystem allows it and copied
+    otherwise. Each file is then renamed into place. Replacement is atomic
+    per file only: a reader never sees a partly written file, but a run that
+    fails midway leaves ``dest`` with some files updated and others not.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    staging = _staging_dir(source, dest)
+    try:
+        for relative in plan.added + plan.changed:
+            staged = staging / relative
+            staged.parent.mkdir(parents=True, exist_ok=True)
+            if link:
+                try:
+                    os.link(source / relative, staged)
+                    METRICS.count("files_linked")
+                    continue
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                        raise
+                    # Linking fails the same way for every file, stop trying
+                    link = False
+            copyfile(str(source / relative), str(staged))
+
+        for relative in plan.added + plan.changed:
+            (dest / relative).parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staging / relative, dest / relative)
+        for relative in plan.removed:
+            (dest / relative).unlink(missing_ok=True)
+            _remove_empty_dirs((dest / relative).parent, dest)
+        METRICS.count("files_removed", len(plan.removed))
+        METRICS.count("files_unchanged", plan.unchanged)
+    finally:
+        rmtree(staging, ignore_errors=True)
 
 
-def copy_data(source: Path, dest: Path):
-    for child in source.iterdir():
-        if child.is_dir():
-            rmtree(str(dest / child.name), ignore_errors=True)
-            copytree(str(child), str(dest / child.name))
-        elif child.is_file():
-            (dest / child.name).unlink(missing_ok=True)
-            copyfile(str(child), str(dest / child.name))
+def copy_data(
+    source: Path,
+    dest: Path,
+    names: Iterable[str] | None = None,
+    dry_run: bool = False,
+) -> SyncPlan:
+    """Sync generated entities into the app, limited to ``names`` if given"""
+    plan = plan_sync(source, dest, names)
+    if dry_run:
+        print(plan.report())
+    elif plan.added or plan.changed or plan.removed:
+        apply_sync(plan, source, dest)
+    return plan
 
 
 copy_character_data = partial(
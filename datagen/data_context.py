@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, Callable
+
+from build_scaling import build_scaling
+from scaling_engine import ScalingEngine
+from fetch_data import (
+    TEXTMAP,
+    get_artifact_data,
+    get_artifact_scaling,
+    get_artifact_set_text_keys,
+    get_artifact_sets,
+    get_artifact_substats,
+    get_ascension_values,
+    get_character_curves,
+    get_character_data,
+    get_weapon_ascension_base_atk,
+    get_weapon_curves,
+    get_weapon_data,
+)
+from state import GenerationState
+
+if TYPE_CHECKING:
+    from _types import (
+        ArtifactData,
+        CharacterBases,
+        CharacterData,
+        CharacterScaling,
+        WeaponData,
+    )
+
+MAX_LEVEL = 100
+
+
+class DataContext:
+    """Source data for a single generation run.
+
+    Every table is loaded the first time a stage asks for it and shared with
+    every later stage, along with the views derived from it. The projected
+    TextMap takes the names to keep from these views too.
+    """
+
+    def __init__(self, state: GenerationState | None = None):
+        self.state = state if state is not None else GenerationState()
+        self._views: dict[str, Any] = {}
+        # Number of times each view was loaded and reused
+        self.loads: Counter[str] = Counter()
+        self.reuses: Counter[str] = Counter()
+        # Views computed from other views rather than read from source tables
+        self.derived: set[str] = set()
+        TEXTMAP.configure(references=self.text_map_keys)
+
+    def _view(self, name: str, loader: Callable[[], Any], derived: bool = False) -> Any:
+        if derived:
+            self.derived.add(name)
+        if name in self._views:
+            self.reuses[name] += 1
+        else:
+            self.loads[name] += 1
+            self._views[name] = loader()
+        return self._views[name]
+
+    @property
+    def characters(self) -> list[CharacterData]:
+        return self._view("characters", get_character_data)
+
+    @property
+    def character_curves(self) -> list[dict[str, dict[str, int]]]:
+        return self._view("character_curves", get_character_curves)
+
+    @property
+    def ascension_values(self) -> dict[int, dict[int, CharacterBases]]:
+        return self._view("ascension_values", get_ascension_values)
+
+    @property
+    def character_curve_table(self) -> dict[str, list[float]]:
+        """Every character growth curve as a per-level array, keyed by curve name"""
+
+        def build():
+            table: dict[str, list[float]] = {}
+            for lvl in self.character_curves[:MAX_LEVEL]:
+                # The def_ curves are the HP curves, so merge before appending
+                merged: dict[str, float] = {}
+                for curves in lvl.values():
+                    merged.update(curves)
+                for name, value in merged.items():
+                    table.setdefault(name, []).append(value)
+            # Only curves covering every level are usable for lookups
+            return {k: v for k, v in table.items() if len(v) == MAX_LEVEL}
+
+        return self._view("character_curve_table", build, derived=True)
+
+    @property
+    def scaling_engine(self) -> ScalingEngine:
+        return self._view(
+            "scaling_engine", lambda: ScalingEngine.from_context(self), derived=True
+        )
+
+    @property
+    def character_scalings(self) -> dict[int, CharacterScaling]:
+        return self._view(
+            "character_scalings",
+            lambda: build_scaling(
+                self.characters, self.scaling_engine, self.ascension_values
+            ),
+            derived=True,
+        )
+
+    @property
+    def artifacts(self) -> list[ArtifactData]:
+        return self._view("artifacts", get_artifact_data)
+
+    @property
+    def artifact_set_text_keys(self) -> dict[int, str]:
+        return self._view("artifact_set_text_keys", get_artifact_set_text_keys)
+
+    @property
+    def artifact_sets(self) -> dict[int, str]:
+        return self._view(
+            "artifact_sets",
+            lambda: get_artifact_sets(self.artifact_set_text_keys),
+            derived=True,
+        )
+
+    @property
+    def artifact_scaling(self) -> dict:
+        return self._view("artifact_scaling", get_artifact_scaling)
+
+    @property
+    def artifact_substats(self) -> dict[int, dict[str, list[float]]]:
+        return self._view("artifact_substats", get_artifact_substats)
+
+    @property
+    def weapons(self) -> list[WeaponData]:
+        return self._view("weapons", get_weapon_data)
+
+    @property
+    def weapon_curves(self) -> list[dict[str, int]]:
+        return self._view("weapon_curves", get_weapon_curves)
+
+    @property
+    def weapon_curve_table(self) -> dict[str, list[float]]:
+        """Every weapon growth curve as a per-level array, keyed by curve name"""
+
+        def build():
+            table: dict[str, list[float]] = {}
+            for lvl in self.weapon_curves[:MAX_LEVEL]:
+                for name, value in lvl.items():
+                    table.setdefault(name, []).append(value)
+            return {k: v for k, v in table.items() if len(v) == MAX_LEVEL}
+
+        return self._view("weapon_curve_table", build, derived=True)
+
+    @property
+    def weapon_ascension_base_atk(self) -> dict[int, int]:
+        return self._view(
+            "weapon_ascension_base_atk",
+            lambda: get_weapon_ascension_base_atk(self.weapons),
+        )
+
+    def preload(self, *names: str):
+        """Load the named views now rather than when a stage first reads them"""
+        for name in names:
+            getattr(self, name)
+
+    def drop_invalid(self, category: str, ids: Iterable[Any]):
+        """Replace a source view with one without the records with these ids.
+
+        Stages read the view afterwards, so it must be called before any view
+        derived from it is built.
+        """
+        dropped = set(ids)
+        self._views[category] = [
+            record
+            for record in getattr(self, category)
+            if record.get("id") not in dropped
+        ]
+
+    def text_map_keys(self) -> set[str]:
+        """TextMap key of every name a stage looks up"""
+        keys = {
+            record["text_map_key"]
+            for records in (self.characters, self.artifacts, self.weapons)
+            for record in records
+        }
+        keys.update(self.artifact_set_text_keys.values())
+        return keys
+
+    def report(self) -> str:
+        # Only reusing a view read from source tables saves a fetch and parse
+        avoided = sum(
+            count for name, count in self.reuses.items() if name not in self.derived
+        )
+        lines = [
+            f"Loaded {sum(self.loads.values())} data views, "
+            f"avoided {avoided} repeated fetches and parses"
+        ]
+        lines.extend(
+            f"  {name}: reused {count} time(s)"
+            + (" (derived)" if name in self.derived else "")
+            for name, count in sorted(self.reuses.items())
+        )
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from state import GenerationState
+
+OUTPUT_PATH = Path("./output")
+SNAPSHOT_PATH = Path("./output/generation.json")
+CATEGORIES = ("characters", "artifacts", "weapons")
+# Per-level arrays derived from the shared growth curves, by category. They
+# change whenever a curve does and would bury the entity's own stats.
+IGNORED_PATHS = {
+    "characters": frozenset({"scalings.level_multipliers"}),
+    "weapons": frozenset({"scalings"}),
+}
+
+
+def flatten_stats(
+    data: Any,
+    prefix: str = "",
+    stats: dict[str, float] | None = None,
+    ignored: frozenset[str] = frozenset(),
+) -> dict[str, float]:
+    """Numeric leaves of a generated record keyed by their dotted path,
+    leaving out the subtrees at the paths in ``ignored``"""
+    if stats is None:
+        stats = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if f"{prefix}{key}" not in ignored:
+                flatten_stats(value, f"{prefix}{key}.", stats, ignored)
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            flatten_stats(value, f"{prefix}{i}.", stats, ignored)
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        stats[prefix[:-1]] = data
+    return stats
+
+
+def stat_deltas(
+    old: dict[str, float], new: dict[str, float]
+) -> dict[str, tuple[float | None, float | None]]:
+    """Old and new value of every stat that differs, None where it is absent"""
+    return {
+        stat: (old.get(stat), new.get(stat))
+        for stat in sorted(old.keys() | new.keys())
+        if old.get(stat) != new.get(stat)
+    }
+
+
+def _format_number(value: float, sign: bool = False) -> str:
+    # :g switches to exponent form from 1e6, which ids and HP values reach
+    if isinstance(value, int):
+        return f"{value:+d}" if sign else str(value)
+    return f"{value:+g}" if sign else f"{value:g}"
+
+
+def _format_delta(stat: str, old: float | None, new: float | None) -> str:
+    if old is None:
+        return f"{stat} added ({_format_number(new)})"  # type: ignore[arg-type]
+    if new is None:
+        return f"{stat} removed ({_format_number(old)})"
+    return (
+        f"{stat} {_format_number(old)} -> {_format_number(new)}"
+        f" ({_format_number(new - old, sign=True)})"
+    )
+
+
+class CategoryDiff(NamedTuple):
+    added: list[str]
+    removed: list[str]
+    # Stat deltas of every entity whose fingerprint changed, possibly empty
+    # when only text such as a name changed
+    changed: dict[str, dict[str, tuple[float | None, float | None]]]
+    unchanged: int
+
+
+class GenerationDiff(NamedTuple):
+    categories: dict[str, CategoryDiff]
+    # Source rows dropped for a missing key, by table: (previous, current) count
+    dropped: dict[str, tuple[int, int]]
+    # Whether there was a previous generation to compare with
+    compared: bool = True
+
+    def __bool__(self) -> bool:
+        return bool(self.dropped) or any(
+            diff.added or diff.removed or diff.changed
+            for diff in self.categories.values()
+        )
+
+    def report(self) -> str:
+        if not self.compared:
+            count = sum(len(diff.added) for diff in self.categories.values())
+            return f"Recorded {count} entities to compare the next generation with"
+        if not self:
+            return "No changes since the previous generation"
+        lines = ["Changes since the previous generation:"]
+        for category, diff in self.categories.items():
+            lines.append(
+                f"  {category}: {len(diff.added)} added, {len(diff.removed)} removed,"
+                f" {len(diff.changed)} changed, {diff.unchanged} unchanged"
+            )
+            if diff.added:
+                lines.append(f"    Added: {', '.join(diff.added)}")
+            if diff.removed:
+                lines.append(f"    Removed: {', '.join(diff.removed)}")
+            for name, deltas in diff.changed.items():
+                changes = "; ".join(_format_delta(s, *d) for s, d in deltas.items())
+                lines.append(f"    {name}: {changes or 'non-numeric fields'}")
+        for table, (old, new) in self.dropped.items():
+            lines.append(f"  Dropped rows of {table}: {old} -> {new}")
+        return "\n".join(lines)
+
+
+class GenerationSnapshot:
+    """Fingerprint and numeric stats of every entity from the last generation.
+
+    Kept separately from GenerationState, which remembers every entity ever
+    generated, so entities that stop being generated show up as removed.
+    """
+
+    def __init__(self, path: Path = SNAPSHOT_PATH):
+        self.path = path
+        self.entities: dict[str, dict[str, dict[str, Any]]] = {}
+        self.dropped: dict[str, int] = {}
+        self.exists = False
+        try:
+            with path.open() as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.exists = True
+        self.entities = data.get("entities", {})
+        self.dropped = data.get("dropped", {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as file:
+            json.dump(
+                {"entities": self.entities, "dropped": self.dropped},
+                file,
+                sort_keys=True,
+            )
+        tmp_path.replace(self.path)
+
+
+def _load_stats(category: str, name: str) -> dict[str, float]:
+    with (OUTPUT_PATH / category / name / "data.json").open() as file:
+        return flatten_stats(
+            json.load(file), ignored=IGNORED_PATHS.get(category, frozenset())
+        )
+
+
+def diff_category(
+    category: str, previous: dict[str, dict[str, Any]], current: dict[str, str]
+) -> tuple[CategoryDiff, dict[str, dict[str, Any]]]:
+    """Compare one category's entities by fingerprint.
+
+    Only entities whose fingerprint is new or changed have their data.json
+    read, so an unchanged roster costs one dict comparison per entity.
+    Returns the diff and the category's entries for the next snapshot.
+    """
+    entries: dict[str, dict[str, Any]] = {}
+    added, changed, unchanged = [], {}, 0
+    for name, digest in current.items():
+        old = previous.get(name)
+        if old is not None and old["fingerprint"] == digest:
+            entries[name] = old
+            unchanged += 1
+            continue
+        stats = _load_stats(category, name)
+        entries[name] = {"fingerprint": digest, "stats": stats}
+        if old is None:
+            added.append(name)
+        else:
+            changed[name] = stat_deltas(old["stats"], stats)
+    removed = sorted(previous.keys() - current.keys())
+    return CategoryDiff(added, removed, changed, unchanged), entries
+
+
+def diff_generation(
+    state: GenerationState,
+    dropped: dict[str, dict[str, int]],
+    snapshot: GenerationSnapshot | None = None,
+) -> GenerationDiff:
+    """Diff this run's entities against the last snapshot, then replace it"""
+    if snapshot is None:
+        snapshot = GenerationSnapshot()
+    compared = snapshot.exists
+    categories = {}
+    for category in CATEGORIES:
+        categories[category], snapshot.entities[category] = diff_category(
+            category, snapshot.entities.get(category, {}), state.generated(category)
+        )
+    dropped_counts = {table: sum(keys.values()) for table, keys in dropped.items()}
+    dropped_diff = {}
+    if compared:
+        dropped_diff = {
+            table: (snapshot.dropped.get(table, 0), dropped_counts.get(table, 0))
+            for table in sorted(snapshot.dropped.keys() | dropped_counts.keys())
+            if snapshot.dropped.get(table, 0) != dropped_counts.get(table, 0)
+        }
+    snapshot.dropped = dropped_counts
+    snapshot.save()
+    return GenerationDiff(categories, dropped_diff, compared)
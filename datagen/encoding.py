@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import base64
+import sys
+from array import array
+from collections.abc import Sequence
+
+# How float arrays are stored in generated JSON
+FLOAT_ENCODINGS = ("json", "float32")
+
+
+def encode_floats(values: Sequence[float], encoding: str = "json") -> list | str:
+    """Encode a float array as a JSON list or base64 of little-endian float32"""
+    if encoding == "json":
+        return list(values)
+    if encoding == "float32":
+        packed = array("f", values)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        return base64.b64encode(packed.tobytes()).decode("ascii")
+    raise ValueError(f"Unknown float encoding {encoding!r}")
+
+
+def decode_floats(encoded: list | str) -> list[float]:
+    """Inverse of encode_floats, detecting the encoding from the value"""
+    if not isinstance(encoded, str):
+        return list(encoded)
+    packed = array("f")
+    packed.frombytes(base64.b64decode(encoded))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
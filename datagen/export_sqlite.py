@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from copy_data import BASE_OUTPUT
+from encoding import decode_floats
+from metrics import METRICS
+
+DATABASE_PATH = Path("./output/data.sqlite")
+
+SCHEMA = """
+CREATE TABLE characters (
+    key TEXT PRIMARY KEY,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    weapon_type TEXT NOT NULL,
+    icon TEXT NOT NULL,
+    image TEXT,
+    ascension_id INTEGER NOT NULL,
+    base_hp REAL NOT NULL,
+    base_atk REAL NOT NULL,
+    base_def REAL NOT NULL,
+    curve_hp TEXT NOT NULL,
+    curve_atk TEXT NOT NULL,
+    curve_def TEXT NOT NULL
+);
+CREATE TABLE weapons (
+    key TEXT PRIMARY KEY,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    rarity INTEGER,
+    icon TEXT NOT NULL,
+    image TEXT,
+    ascension_id INTEGER NOT NULL
+);
+CREATE TABLE weapon_stats (
+    weapon_key TEXT NOT NULL REFERENCES weapons (key),
+    stat TEXT NOT NULL,
+    prop_type TEXT NOT NULL,
+    base_value REAL NOT NULL,
+    curve TEXT NOT NULL,
+    PRIMARY KEY (weapon_key, stat)
+);
+CREATE TABLE artifact_sets (
+    key TEXT PRIMARY KEY,
+    set_id INTEGER,
+    name TEXT NOT NULL
+);
+CREATE TABLE artifact_pieces (
+    set_key TEXT NOT NULL REFERENCES artifact_sets (key),
+    slot TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    icon TEXT NOT NULL,
+    image TEXT,
+    PRIMARY KEY (set_key, slot)
+);
+CREATE TABLE artifact_main_stats (
+    rarity INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    stat TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (rarity, level, stat)
+);
+CREATE TABLE curves (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (category, name, level)
+);
+CREATE TABLE ascension_values (
+    category TEXT NOT NULL,
+    key TEXT NOT NULL,
+    ascension INTEGER NOT NULL,
+    stat TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (category, key, ascension, stat)
+);
+CREATE INDEX characters_weapon_type ON characters (weapon_type);
+CREATE INDEX weapons_type ON weapons (type, rarity);
+CREATE INDEX weapon_stats_stat ON weapon_stats (stat);
+CREATE INDEX artifact_pieces_set_id ON artifact_pieces (set_id);
+CREATE INDEX artifact_pieces_slot ON artifact_pieces (slot);
+CREATE INDEX artifact_main_stats_stat ON artifact_main_stats (stat);
+"""
+
+Row = tuple[Any, ...]
+
+
+def _load_json(path: Path) -> Any:
+    with path.open(encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _iter_entities(path: Path) -> Iterator[tuple[Path, dict[str, Any]]]:
+    for directory in sorted(path.iterdir()):
+        if (directory / "data.json").is_file():
+            yield directory, _load_json(directory / "data.json")
+
+
+def _image(directory: Path, name: str) -> str | None:
+    """Path of an entity image relative to its category, if it was downloaded"""
+    path = directory / name
+    return f"{directory.name}/{name}" if path.is_file() else None
+
+
+class DatabaseRows:
+    """Rows of every table, read from a generated data directory"""
+
+    def __init__(self, data_dir: Path):
+        self.tables: dict[str, list[Row]] = {
+            "characters": [],
+            "weapons": [],
+            "weapon_stats": [],
+            "artifact_sets": [],
+            "artifact_pieces": [],
+            "artifact_main_stats": [],
+            "curves": [],
+            "ascension_values": [],
+        }
+        self._read_characters(data_dir / "characters")
+        self._read_weapons(data_dir / "weapons")
+        self._read_artifacts(data_dir / "artifacts")
+
+    def _read_curves(self, category: str, path: Path):
+        if not path.is_file():
+            return
+        for name, values in _load_json(path).items():
+            self.tables["curves"].extend(
+                (category, name, level, value)
+                for level, value in enumerate(decode_floats(values), 1)
+            )
+
+    def _read_characters(self, path: Path):
+        for directory, data in _iter_entities(path):
+            self.tables["characters"].append(
+                (
+                    directory.name,
+                    data["id"],
+                    data["name"],
+                    data["weapon_type"],
+                    data["icon"],
+                    _image(directory, "avatar.png"),
+                    data["ascension_id"],
+                    data["base"]["hp"],
+                    data["base"]["atk"],
+                    data["base"]["def_"],
+                    data["curves"]["hp"],
+                    data["curves"]["atk"],
+                    data["curves"]["def_"],
+                )
+            )
+            for ascension, values in data["scalings"]["ascension_values"].items():
+                self.tables["ascension_values"].extend(
+                    ("characters", directory.name, int(ascension), stat, value)
+                    for stat, value in values.items()
+                )
+        self._read_curves("characters", path / "curves.json")
+
+    def _read_weapons(self, path: Path):
+        for directory, data in _iter_entities(path):
+            self.tables["weapons"].append(
+                (
+                    directory.name,
+                    data["id"],
+                    data["name"],
+                    data["type"],
+                    data.get("rarity"),
+                    data["icon"],
+                    _image(directory, "icon.png"),
+                    data["ascension_id"],
+                )
+            )
+            self.tables["weapon_stats"].extend(
+                (directory.name, stat, v["type"], v["base_value"], v["curve"])
+                for stat, v in data["stats"].items()
+            )
+            self.tables["ascension_values"].extend(
+                ("weapons", directory.name, int(ascension), "base_atk", value)
+                for ascension, value in data["ascension_base_atk"].items()
+            )
+        self._read_curves("weapons", path / "curves.json")
+
+    def _read_artifacts(self, path: Path):
+        for directory, data in _iter_entities(path):
+            pieces = data["pieces"].values()
+            set_ids = {piece["set_id"] for piece in pieces}
+            self.tables["artifact_sets"].append(
+                (
+                    directory.name,
+                    set_ids.pop() if len(set_ids) == 1 else None,
+                    data["name"],
+                )
+            )
+            self.tables["artifact_pieces"].extend(
+                (
+                    directory.name,
+                    piece["slot"],
+                    piece["id"],
+                    piece["set_id"],
+                    piece["name"],
+                    piece["icon"],
+                    _image(directory, f"{piece['slot']}.png"),
+                )
+                for piece in pieces
+            )
+
+        scaling = _load_json(path / "scaling.json")
+        for rarity, levels in scaling.items():
+            for level, values in levels.items():
+                self.tables["artifact_main_stats"].extend(
+                    (int(rarity), int(level), stat, value)
+                    for stat, value in values.items()
+                )
+
+
+def write_database(data_dir: Path = BASE_OUTPUT, path: Path = DATABASE_PATH) -> int:
+    """Export a generated data directory to SQLite, returning the row count.
+
+    The database is built next to ``path`` in one transaction and then
+    renamed over it, so readers never see a partial export.
+    """
+    rows = DatabaseRows(data_dir)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+            for table, table_rows in rows.tables.items():
+                if table_rows:
+                    placeholders = ", ".join("?" * len(table_rows[0]))
+                    connection.executemany(
+                        f"INSERT INTO {table} VALUES ({placeholders})", table_rows
+                    )
+    finally:
+        connection.close()
+    tmp_path.replace(path)
+    METRICS.record_written(path)
+    return sum(map(len, rows.tables.values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export a generated data directory to SQLite"
+    )
+    parser.add_argument("--data-dir", type=Path, default=BASE_OUTPUT)
+    parser.add_argument("-o", "--output", type=Path, default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    count = write_database(args.data_dir, args.output)
+    print(f"Wrote {count} rows to {args.output}")
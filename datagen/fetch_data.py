@@ -1,47 +1,183 @@
 from __future__ import annotations
 
 import pathlib
-from collections import defaultdict
-from typing import TYPE_CHECKING
-
-import requests
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from typing import TYPE_CHECKING, Any
 
+from cache import SOURCE_CACHE
+from jsonstream import iter_array, iter_object
+from metrics import METRICS
 from constants import (
     SLOT_MAPPING,
     STAT_MAPPING,
+    SUBSTAT_DEPOTS,
     WEAPON_TYPE_MAPPING,
     DataFileBase,
 )
 
 if TYPE_CHECKING:
+    from yarl import URL
+
     from _types import ArtifactData, CharacterBases, CharacterData, WeaponData
 
 OUTPUT_DIR = pathlib.Path("./output")
 
 
+# Every ExcelBinOutput table read during generation
+SOURCE_TABLES = (
+    "AvatarCurveExcelConfigData.json",
+    "AvatarExcelConfigData.json",
+    "AvatarPromoteExcelConfigData.json",
+    "EquipAffixExcelConfigData.json",
+    "ReliquaryAffixExcelConfigData.json",
+    "ReliquaryExcelConfigData.json",
+    "ReliquaryLevelExcelConfigData.json",
+    "ReliquarySetExcelConfigData.json",
+    "WeaponCurveExcelConfigData.json",
+    "WeaponExcelConfigData.json",
+    "WeaponPromoteExcelConfigData.json",
+)
+TEXTMAP_URL = DataFileBase / ".." / "TextMap" / "TextMapEN.json"
+
+# Source rows the record iterators skipped, by table and the key that was missing
+DROPPED_RECORDS: defaultdict[str, Counter[str]] = defaultdict(Counter)
+
+
+def source_urls() -> list[URL]:
+    """URLs of every source file, for prefetching"""
+    return [DataFileBase / name for name in SOURCE_TABLES] + [TEXTMAP_URL]
+
+
+def load_table(name: str):
+    return SOURCE_CACHE.load_json(DataFileBase / name)
+
+
+def iter_table(name: str) -> Iterator[dict]:
+    """Stream the rows of an ExcelBinOutput table one at a time"""
+    with SOURCE_CACHE.fetch(DataFileBase / name).open("rb") as file:
+        yield from iter_array(file)
+
+
+def iter_textmap() -> Iterator[tuple[str, str]]:
+    with SOURCE_CACHE.fetch(TEXTMAP_URL).open("rb") as file:
+        yield from iter_object(file)
+
+
 def get_textmap() -> dict[str, str]:
-    resp = requests.get(str(DataFileBase / ".." / "TextMap" / "TextMapEN.json"))
-    data: dict[str, str] = resp.json()
-    return data
+    return dict(iter_textmap())
 
 
-TEXTMAP = get_textmap()
+# Tables whose names are looked up in the TextMap
+TEXTMAP_SOURCES = (
+    "AvatarExcelConfigData.json",
+    "WeaponExcelConfigData.json",
+    "ReliquaryExcelConfigData.json",
+    "EquipAffixExcelConfigData.json",
+)
+
+
+def get_referenced_text_hashes() -> set[str]:
+    """Every name key in the source tables, for a TextMap used without a
+    DataContext to take them from"""
+    hashes: set[str] = set()
+    for table in TEXTMAP_SOURCES:
+        hashes.update(
+            str(obj["nameTextMapHash"])
+            for obj in iter_table(table)
+            if "nameTextMapHash" in obj
+        )
+    return hashes
+
+
+class TextMap(Mapping[str, str]):
+    """Read-only view of the English TextMap that is only loaded on first lookup.
+
+    When ``projected`` is set, only the hashes referenced by the avatar, weapon,
+    reliquary and affix tables are kept in memory. ``references`` supplies
+    those hashes from data that is already loaded; without it the tables
+    are read again to find them.
+    """
+
+    def __init__(self, projected: bool = True):
+        self.projected = projected
+        self.references: Callable[[], Iterable[str]] | None = None
+        self._data: dict[str, str] | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def configure(
+        self,
+        *,
+        projected: bool | None = None,
+        references: Callable[[], Iterable[str]] | None = None,
+    ):
+        if projected is not None and projected != self.projected:
+            self.projected = projected
+            self._data = None
+        if references is not None:
+            self.references = references
+            if self.projected:
+                self._data = None
+
+    @property
+    def data(self) -> dict[str, str]:
+        if self._data is None:
+            with METRICS.timer("textmap_load"):
+                self._data = self._load()
+        return self._data
+
+    def _load(self) -> dict[str, str]:
+        if self.projected:
+            hashes = (
+                set(self.references())
+                if self.references is not None
+                else get_referenced_text_hashes()
+            )
+            return {key: value for key, value in iter_textmap() if key in hashes}
+        return get_textmap()
+
+    def __getitem__(self, key: str) -> str:
+        METRICS.count("textmap_lookups")
+        return self.data[key]
+
+    def __contains__(self, key: object) -> bool:
+        METRICS.count("textmap_lookups")
+        return key in self.data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
 
+    def __len__(self) -> int:
+        return len(self.data)
 
-def find(data: list[dict], **kv_pairs):
+
+TEXTMAP = TextMap()
+
+
+def index_by(data: Iterable[dict], key: str) -> dict[Any, dict]:
+    """Map each value of ``key`` to the first row holding it, in one pass"""
+    index: dict[Any, dict] = {}
     for item in data:
-        if all([item[k] == v for k, v in kv_pairs.items()]):
-            return item
-    return {}
+        index.setdefault(item.get(key), item)
+    return index
 
 
-def get_character_data() -> list[CharacterData]:
-    resp = requests.get(str(DataFileBase / "AvatarExcelConfigData.json"))
-    data: list[dict] = resp.json()
+def group_by(data: Iterable[dict], key: str) -> dict[Any, list[dict]]:
+    """Map each value of ``key`` to every row holding it, in source order"""
+    groups: defaultdict[Any, list[dict]] = defaultdict(list)
+    for item in data:
+        groups[item.get(key)].append(item)
+    return groups
+
 
-    output = []
-    for obj in data:
+def iter_character_data() -> Iterator[CharacterData]:
+    DROPPED_RECORDS.pop("AvatarExcelConfigData.json", None)
+    for obj in iter_table("AvatarExcelConfigData.json"):
         try:
+            curves = index_by(obj["propGrowCurves"], "type")
             min_data: CharacterData = {
                 "id": obj["id"],
                 "ascension_id": obj["avatarPromoteId"],
@@ -54,29 +190,23 @@ def get_character_data() -> list[CharacterData]:
                     "def_": obj["defenseBase"],
                 },
                 "curves": {
-                    "hp": find(obj["propGrowCurves"], type="FIGHT_PROP_BASE_HP")[
-                        "growCurve"
-                    ],
-                    "atk": find(obj["propGrowCurves"], type="FIGHT_PROP_BASE_ATTACK")[
-                        "growCurve"
-                    ],
-                    "def_": find(obj["propGrowCurves"], type="FIGHT_PROP_BASE_DEFENSE")[
-                        "growCurve"
-                    ],
+                    "hp": curves["FIGHT_PROP_BASE_HP"]["growCurve"],
+                    "atk": curves["FIGHT_PROP_BASE_ATTACK"]["growCurve"],
+                    "def_": curves["FIGHT_PROP_BASE_DEFENSE"]["growCurve"],
                 },
             }
-        except KeyError:
+        except KeyError as e:
+            DROPPED_RECORDS["AvatarExcelConfigData.json"][str(e.args[0])] += 1
             continue
         else:
-            output.append(min_data)
+            yield min_data
+
 
-    return output
+def get_character_data() -> list[CharacterData]:
+    return list(iter_character_data())
 
 
 def get_character_curves() -> list[dict[str, dict[str, int]]]:
-    resp = requests.get(str(DataFileBase / "AvatarCurveExcelConfigData.json"))
-    data: list[dict] = resp.json()
-
     return [
         {
             "hp": {
@@ -95,55 +225,48 @@ def get_character_curves() -> list[dict[str, dict[str, int]]]:
                 if curve["type"].startswith("GROW_CURVE_HP")
             },
         }
-        for lvl in data
+        for lvl in iter_table("AvatarCurveExcelConfigData.json")
     ]
 
 
 def get_ascension_values() -> dict[int, dict[int, CharacterBases]]:
-    resp = requests.get(str(DataFileBase / "AvatarPromoteExcelConfigData.json"))
-    data: list[dict] = resp.json()
-
     ascension_data: defaultdict[int, dict[int, dict[str, int]]] = defaultdict(dict)
-    for promotion in data:
-        props = promotion["addProps"]
+    for promotion in iter_table("AvatarPromoteExcelConfigData.json"):
+        props = index_by(promotion["addProps"], "propType")
         ascension_data[promotion["avatarPromoteId"]][
             promotion.get("promoteLevel", 0)
         ] = {
-            "hp": find(props, propType="FIGHT_PROP_BASE_HP").get("value", 0),
-            "atk": find(props, propType="FIGHT_PROP_BASE_ATTACK").get("value", 0),
-            "def_": find(props, propType="FIGHT_PROP_BASE_DEFENSE").get("value", 0),
+            "hp": props.get("FIGHT_PROP_BASE_HP", {}).get("value", 0),
+            "atk": props.get("FIGHT_PROP_BASE_ATTACK", {}).get("value", 0),
+            "def_": props.get("FIGHT_PROP_BASE_DEFENSE", {}).get("value", 0),
         }
     return ascension_data  # type: ignore
 
 
-def get_artifact_sets() -> dict[int, str]:
-    resp_sets = requests.get(str(DataFileBase / "ReliquarySetExcelConfigData.json"))
-    resp_affix = requests.get(str(DataFileBase / "EquipAffixExcelConfigData.json"))
-
-    raw_sets = resp_sets.json()
-    affixes = resp_affix.json()
+def get_artifact_set_text_keys() -> dict[int, str]:
+    """TextMap key of each artifact set's name, by set id"""
+    affixes = index_by(iter_table("EquipAffixExcelConfigData.json"), "id")
 
-    sets: dict[int, str] = {}
-    for _set in raw_sets:
+    keys: dict[int, str] = {}
+    for _set in iter_table("ReliquarySetExcelConfigData.json"):
         try:
-            affix_id: int = _set["EquipAffixId"]
-            equip_data: dict = next(
-                filter(lambda obj: obj.get("id") == affix_id, affixes)
-            )
-            set_name = TEXTMAP[str(equip_data["nameTextMapHash"])]
-            sets[_set["setId"]] = set_name
-        except (KeyError, StopIteration):
+            equip_data: dict = affixes[_set["EquipAffixId"]]
+            keys[_set["setId"]] = str(equip_data["nameTextMapHash"])
+        except KeyError:
             continue
 
-    return sets
+    return keys
 
 
-def get_artifact_data() -> list[ArtifactData]:
-    resp = requests.get(str(DataFileBase / "ReliquaryExcelConfigData.json"))
-    data = resp.json()
+def get_artifact_sets(text_keys: dict[int, str] | None = None) -> dict[int, str]:
+    if text_keys is None:
+        text_keys = get_artifact_set_text_keys()
+    return {set_id: TEXTMAP[key] for set_id, key in text_keys.items() if key in TEXTMAP}
 
-    output = []
-    for obj in data:
+
+def iter_artifact_data() -> Iterator[ArtifactData]:
+    DROPPED_RECORDS.pop("ReliquaryExcelConfigData.json", None)
+    for obj in iter_table("ReliquaryExcelConfigData.json"):
         try:
             min_data: ArtifactData = {
                 "id": obj["id"],
@@ -152,20 +275,20 @@ def get_artifact_data() -> list[ArtifactData]:
                 "slot": SLOT_MAPPING[obj["equipType"]],
                 "set_id": obj["setId"],
             }
-        except KeyError:
+        except KeyError as e:
+            DROPPED_RECORDS["ReliquaryExcelConfigData.json"][str(e.args[0])] += 1
             continue
         else:
-            output.append(min_data)
+            yield min_data
+
 
-    return output
+def get_artifact_data() -> list[ArtifactData]:
+    return list(iter_artifact_data())
 
 
 def get_artifact_scaling():
-    resp = requests.get(str(DataFileBase / "ReliquaryLevelExcelConfigData.json"))
-    data = resp.json()
-
     scaling = {0: {}, 1: {}, 2: {}, 3: {}, 4: {}, 5: {}}
-    for promotion in data:
+    for promotion in iter_table("ReliquaryLevelExcelConfigData.json"):
         props = promotion["addProps"]
         scaling[promotion.get("rank", 0)][promotion.get("level", 1) - 1] = {
             STAT_MAPPING[prop["propType"]]: prop["value"]
@@ -176,12 +299,31 @@ def get_artifact_scaling():
     return scaling
 
 
-def get_weapon_data() -> list[WeaponData]:
-    resp = requests.get(str(DataFileBase / "WeaponExcelConfigData.json"))
-    data = resp.json()
+def get_artifact_substats() -> dict[int, dict[str, list[float]]]:
+    """The distinct rolls of each substat by rarity, lowest roll first"""
+    substats: defaultdict[int, defaultdict[str, set[float]]] = defaultdict(
+        lambda: defaultdict(set)
+    )
+    DROPPED_RECORDS.pop("ReliquaryAffixExcelConfigData.json", None)
+    for affix in iter_table("ReliquaryAffixExcelConfigData.json"):
+        rarity = SUBSTAT_DEPOTS.get(affix.get("depotId"))
+        stat = STAT_MAPPING.get(affix.get("propType"))
+        if rarity is None or stat is None:
+            continue
+        value = affix.get("propValue")
+        if value is None:
+            DROPPED_RECORDS["ReliquaryAffixExcelConfigData.json"]["propValue"] += 1
+            continue
+        substats[rarity][stat].add(value)
+    return {
+        rarity: {stat: sorted(rolls) for stat, rolls in sorted(stats.items())}
+        for rarity, stats in sorted(substats.items())
+    }
+
 
-    weapons = []
-    for obj in data:
+def iter_weapon_data() -> Iterator[WeaponData]:
+    DROPPED_RECORDS.pop("WeaponExcelConfigData.json", None)
+    for obj in iter_table("WeaponExcelConfigData.json"):
         try:
             weapon_data: WeaponData = {
                 "id": obj["id"],
@@ -189,6 +331,7 @@ def get_weapon_data() -> list[WeaponData]:
                 "icon": obj["icon"],
                 "text_map_key": str(obj["nameTextMapHash"]),
                 "type": WEAPON_TYPE_MAPPING[obj["weaponType"]],
+                "rarity": obj["rankLevel"],
                 "stats": {
                     STAT_MAPPING.get(prop["propType"], prop["propType"]): {
                         "type": prop["propType"],
@@ -206,43 +349,38 @@ def get_weapon_data() -> list[WeaponData]:
             weapon_data["stats"]["base_atk"] = weapon_data["stats"].pop(
                 "FIGHT_PROP_BASE_ATTACK"
             )
-        except KeyError:
+        except KeyError as e:
+            DROPPED_RECORDS["WeaponExcelConfigData.json"][str(e.args[0])] += 1
             continue
         else:
-            weapons.append(weapon_data)
+            yield weapon_data
 
-    return weapons
 
+def get_weapon_data() -> list[WeaponData]:
+    return list(iter_weapon_data())
 
-def get_weapon_curves() -> list[dict[str, int]]:
-    resp = requests.get(str(DataFileBase / "WeaponCurveExcelConfigData.json"))
-    data = resp.json()
 
+def get_weapon_curves() -> list[dict[str, int]]:
     return [
         {curve_info["type"]: curve_info["value"] for curve_info in curve["curveInfos"]}
-        for curve in data
+        for curve in iter_table("WeaponCurveExcelConfigData.json")
     ]
 
 
 def get_weapon_ascension_base_atk(weapons: list[WeaponData]) -> dict[int, int]:
-    resp = requests.get(str(DataFileBase / "WeaponPromoteExcelConfigData.json"))
-    data = resp.json()
+    promotions = group_by(
+        iter_table("WeaponPromoteExcelConfigData.json"), "weaponPromoteId"
+    )
 
     values = {}
     for weapon in weapons:
         values[weapon["id"]] = {}
-        for obj in data:
-            if obj["weaponPromoteId"] != weapon["ascension_id"]:
-                continue
-
-            try:
-                values[weapon["id"]][obj.get("promoteLevel", 0)] = next(
-                    filter(
-                        lambda prop: prop["propType"] == "FIGHT_PROP_BASE_ATTACK",
-                        obj["addProps"],
-                    )
-                ).get("value", 0)
-            except StopIteration:
+        for obj in promotions.get(weapon["ascension_id"], []):
+            props = index_by(obj["addProps"], "propType")
+            if "FIGHT_PROP_BASE_ATTACK" not in props:
                 continue
+            values[weapon["id"]][obj.get("promoteLevel", 0)] = props[
+                "FIGHT_PROP_BASE_ATTACK"
+            ].get("value", 0)
 
     return values
@@ -1,28 +1,30 @@
+from __future__ import annotations
+
 import json
 import re
+import uuid
 from pathlib import Path
 from shutil import rmtree
-from typing import TYPE_CHECKING, cast
-
-from build_scaling import build_scaling
-from fetch_data import (
-    TEXTMAP,
-    get_artifact_data,
-    get_artifact_scaling,
-    get_artifact_sets,
-    get_character_data,
-    get_weapon_ascension_base_atk,
-    get_weapon_curves,
-    get_weapon_data,
-)
+from typing import TYPE_CHECKING, Any, cast
+
+from artifact_rolls import ROLLS_FILE, build_roll_tables
+from character_filter import CharacterFilter
+from fetch_data import TEXTMAP, group_by
 from generate_images import (
-    get_artifact_image,
-    get_character_image,
-    get_weapon_image,
+    artifact_image_job,
+    character_image_job,
+    fetch_images,
+    weapon_image_job,
 )
+from encoding import encode_floats
+from metrics import METRICS
+from parallel import EntityJob, run_jobs
+from state import fingerprint
 
 if TYPE_CHECKING:
     from _types import ArtifactData
+    from data_context import DataContext
+    from state import GenerationState
 
 OUTPUT_PATH = Path("./output")
 
@@ -35,11 +37,200 @@ def format_pascal_key(text: str) -> str:
     return formatted
 
 
-def generate_constants(no_file=False):
-    """Generate constants dict and copy it to file"""
-
-    character_data = get_character_data()
-    weapon_data = get_weapon_data()
+def replace_file(path: Path, content: str):
+    """Write ``content`` to a temporary file of its own and move it to ``path``,
+    so concurrent writers never share a half-written file"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with tmp_path.open("x") as file:
+        file.write(content)
+    tmp_path.replace(path)
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write ``content`` to ``path`` unless it already holds exactly that"""
+    try:
+        if path.read_text() == content:
+            return False
+    except FileNotFoundError:
+        pass
+    replace_file(path, content)
+    METRICS.record_written(path)
+    return True
+
+
+def write_character(path: Path, data: dict, previous: str | None = None) -> str | None:
+    """Write a character's module, returning its fingerprint if it changed"""
+    digest = fingerprint(data)
+    json_path = path / "data.json"
+    if digest == previous and json_path.is_file():
+        return None
+
+    replace_file(json_path, json.dumps(data, indent=2))
+
+    codegen_path = path / "index.tsx"
+    code = re.sub(
+        r"^\s*",
+        "",
+        """import avatar from "./avatar.png";
+        import data from "./data.json";
+        const toExport = { avatar, data };
+        export default toExport;
+        """,
+        flags=re.M,
+    ).strip()
+    replace_file(codegen_path, code)
+
+    METRICS.record_written(json_path, codegen_path)
+    return digest
+
+
+def write_artifact_set(
+    path: Path, set_data: dict, previous: str | None = None
+) -> str | None:
+    """Write an artifact set's module, returning its fingerprint if it changed"""
+    digest = fingerprint(set_data)
+    json_path = path / "data.json"
+    if digest == previous and json_path.is_file():
+        return None
+
+    replace_file(json_path, json.dumps(set_data, indent=2))
+
+    pieces = set_data["pieces"]
+    set_export_path = path / "index.tsx"
+    code = re.sub(
+        r"^\s*",
+        "",
+        """{0}
+        import data from "./data.json";
+        const toExport = {{ {1} }};
+        export default toExport;
+        """.format(
+            "\n".join(f"import {slot} from './{slot}.png'" for slot in pieces),
+            ", ".join((*pieces, "data")),
+        ),
+        flags=re.M,
+    ).strip()
+    replace_file(set_export_path, code)
+
+    METRICS.record_written(json_path, set_export_path)
+    return digest
+
+
+def write_weapon(path: Path, data: dict, previous: str | None = None) -> str | None:
+    """Write a weapon's module, returning its fingerprint if it changed"""
+    digest = fingerprint(data)
+    json_path = path / "data.json"
+    if digest == previous and json_path.is_file():
+        return None
+
+    replace_file(json_path, json.dumps(data, indent=2))
+
+    codegen_path = path / "index.tsx"
+    code = re.sub(
+        r"^\s*",
+        "",
+        """import icon from "./icon.png";
+        import data from "./data.json";
+        const toExport = { data, icon };
+        export default toExport;
+        """,
+        flags=re.M,
+    )
+    replace_file(codegen_path, code)
+
+    METRICS.record_written(json_path, codegen_path)
+    return digest
+
+
+def write_curve_table(
+    path: Path, curves: dict[str, list[float]], float_encoding: str = "json"
+) -> bool:
+    """Write a shared curves table that compact entities reference by name"""
+    table = {
+        name: encode_floats(values, float_encoding)
+        for name, values in sorted(curves.items())
+    }
+    return write_if_changed(path, json.dumps(table, indent=2))
+
+
+def write_lazy_modules(
+    state: GenerationState,
+    category: str,
+    entries: dict[str, dict[str, Any]],
+    icons: dict[str, dict[str, str]],
+):
+    """Write a category's manifest.ts and loaders.ts next to its index.tsx.
+
+    manifest.ts holds the light ``entries`` fields of every entity and
+    imports only its ``icons``, given relative to the entity directory, so
+    pickers can render without pulling in any data.json. loaders.ts maps
+    each key to a dynamic import of the entity module, letting the bundler
+    split every entity into its own chunk. Nothing in src imports them yet:
+    the components and utils still read the eager index.tsx barrels.
+    """
+    imports, rows, loaders = [], [], []
+    for key in sorted(entries):
+        icon_refs = []
+        for icon, file in icons.get(key, {}).items():
+            imports.append(f'import {key}_{icon} from "./{key}/{file}";')
+            icon_refs.append(f"{icon}: {key}_{icon}")
+        fields = [
+            f"{name}: {json.dumps(value)}" for name, value in entries[key].items()
+        ]
+        fields.append(f"icons: {{ {', '.join(icon_refs)} }}")
+        rows.append(f"  {key}: {{ {', '.join(fields)} }},")
+        loaders.append(f'  {key}: () => import("./{key}"),')
+
+    manifest = "\n".join(
+        [*imports, "const manifest = {", *rows, "};", "export default manifest;"]
+    )
+    loader_code = "\n".join(
+        [
+            "const loaders = {",
+            *loaders,
+            "};",
+            "export type Loaded<K extends keyof typeof loaders> = Awaited<",
+            "  ReturnType<(typeof loaders)[K]>",
+            '>["default"];',
+            "export default loaders;",
+        ]
+    )
+    for name, code in (("manifest.ts", manifest), ("loaders.ts", loader_code)):
+        if write_if_changed(OUTPUT_PATH / category / name, code + "\n"):
+            state.record(category, name)
+
+
+def record_entity(state: GenerationState, category: str):
+    """Build a run_jobs callback that records each regenerated entity"""
+
+    def on_success(job: EntityJob, digest: str | None):
+        state.mark_generated(category, job.args[0].name)
+        if digest is None:
+            state.skipped += 1
+            METRICS.count("entities_skipped")
+            return
+        state.record(category, job.args[0].name, digest)
+        METRICS.count("entities_generated")
+        print(f"Generated data for {job.name}")
+
+    return on_success
+
+
+def generate_constants(
+    ctx: DataContext,
+    no_file=False,
+    character_filter: CharacterFilter | None = None,
+):
+    """Generate constants dict and copy it to file.
+
+    Characters are chosen by ``character_filter``, by default the policy in
+    character_filter.json.
+    """
+    if character_filter is None:
+        character_filter = CharacterFilter.load()
+
+    character_data = ctx.characters
+    weapon_data = ctx.weapons
 
     constants = {
         "Characters": set(),
@@ -52,19 +243,19 @@ def generate_constants(no_file=False):
         "WeaponsCatalyst": set(),
     }
 
-    for character in character_data:
-        if character["text_map_key"] not in TEXTMAP:
-            continue
-
-        name = TEXTMAP[character["text_map_key"]]
-
-        should_skip = input(f"Skip character {name}? (y/N) ")
-        if should_skip.lower() == "y":
-            continue
-
-        constants["Characters"].add(format_pascal_key(name))
-
-    for set_id, set_name in get_artifact_sets().items():
+    result = character_filter.evaluate(
+        ctx,
+        (
+            (format_pascal_key(TEXTMAP[character["text_map_key"]]), character)
+            for character in character_data
+            if character["text_map_key"] in TEXTMAP
+        ),
+    )
+    print(result.report())
+    METRICS.count("characters_excluded", len(result.excluded))
+    constants["Characters"].update(result.included)
+
+    for set_id, set_name in ctx.artifact_sets.items():
         constants["ArtifactSets"][str(set_id)] = format_pascal_key(set_name)
         constants["ArtifactSetNames"][format_pascal_key(set_name)] = set_name
 
@@ -103,161 +294,241 @@ def generate_constants(no_file=False):
     return constants
 
 
-def generate_character_dirs(constants: dict, no_images=False):
-    data = get_character_data()
-    scaling_data = build_scaling(data)
-
+def generate_character_dirs(
+    ctx: DataContext,
+    constants: dict,
+    no_images=False,
+    jobs=1,
+    compact=False,
+    float_encoding="json",
+):
+    data = ctx.characters
+    scaling_data = ctx.character_scalings
+    state = ctx.state
+
+    included = set(constants["Characters"])
+    characters = []
     for char_data in data:
         if char_data["text_map_key"] not in TEXTMAP:
             continue
         name = TEXTMAP[char_data["text_map_key"]]
-        if "".join(filter(str.isalpha, name)) not in constants["Characters"]:
+        if "".join(filter(str.isalpha, name)) not in included:
             continue
 
         path = OUTPUT_PATH / "characters" / format_pascal_key(name)
         path.mkdir(exist_ok=True, parents=True)
+        characters.append((name, path, char_data))
+
+    changed_images: set[Path] = set()
+    if no_images is False:
+        images = fetch_images(
+            [character_image_job(path, char_data) for _, path, char_data in characters],
+            changed=changed_images,
+        )
 
+    # Entities that share an output path (the two Travelers) keep only the
+    # last one, so its fingerprint is the one recorded for the path
+    entity_jobs: dict[Path, EntityJob] = {}
+    manifest: dict[str, dict[str, Any]] = {}
+    for name, path, char_data in characters:
         if no_images is False:
-            if get_character_image(path, char_data) is False:
+            job = character_image_job(path, char_data)
+            if images[job] is False:
                 rmtree(str(path), ignore_errors=True)
+                state.forget("characters", path.name)
                 continue
+            if job.path in changed_images:
+                state.record("characters", path.name)
+
+        manifest[path.name] = {"name": name, "weapon_type": char_data["weapon_type"]}
+        scalings = scaling_data[char_data["id"]]
+        if compact:
+            # Level multipliers are looked up in curves.json by curve name
+            scalings = {"ascension_values": scalings["ascension_values"]}
+
+        data = {
+            "name": name,
+            **char_data,
+            "scalings": scalings,
+        }
+        entity_jobs[path] = EntityJob(
+            name,
+            write_character,
+            (path, data, state.previous("characters", path.name)),
+        )
 
-        json_path = path / "data.json"
-        json_path.unlink(missing_ok=True)
-        with json_path.open("x") as file:
-            data = {
-                "name": name,
-                **char_data,
-                "scalings": scaling_data[char_data["id"]],
-            }
-            json.dump(data, file, indent=2)
-
-        codegen_path = path / "index.tsx"
-        codegen_path.unlink(missing_ok=True)
-        with codegen_path.open("x") as file:
-            code = re.sub(
-                r"^\s*",
-                "",
-                """import avatar from "./avatar.png";
-                import data from "./data.json";
-                const toExport = { avatar, data };
-                export default toExport;
-                """,
-                flags=re.M,
-            ).strip()
-            file.write(code)
-
-        print(f"Generated data for {name}")
+    run_jobs(list(entity_jobs.values()), jobs, record_entity(state, "characters"))
+
+    curves_path = OUTPUT_PATH / "characters" / "curves.json"
+    if write_curve_table(curves_path, ctx.character_curve_table, float_encoding):
+        state.record("characters", curves_path.name)
 
     index_path = OUTPUT_PATH / "characters" / "index.tsx"
-    index_path.unlink(missing_ok=True)
-    with index_path.open("x") as file:
-        code = re.sub(
-            r"^\s*",
-            "",
-            """
+    code = re.sub(
+        r"^\s*",
+        "",
+        """
         {0}
         {1}
         export default characters;
         """.format(
-                "\n".join(
-                    f"import {name} from './{name}';"
-                    for name in constants["Characters"]
-                ),
-                f"const characters = {{ {', '.join(constants['Characters'])} }};",
+            "\n".join(
+                f"import {name} from './{name}';" for name in constants["Characters"]
             ),
-            flags=re.M,
-        ).strip()
-        file.write(code)
-
-
-def generate_artifact_dirs(constants: dict, no_images=False):
-    data: list[ArtifactData] = get_artifact_data()
-    scaling_data = get_artifact_scaling()
-
+            f"const characters = {{ {', '.join(constants['Characters'])} }};",
+        ),
+        flags=re.M,
+    ).strip()
+    if write_if_changed(index_path, code):
+        state.record("characters", index_path.name)
+    write_lazy_modules(
+        state,
+        "characters",
+        manifest,
+        {key: {"avatar": "avatar.png"} for key in manifest},
+    )
+
+
+def generate_artifact_dirs(ctx: DataContext, constants: dict, no_images=False, jobs=1):
+    data: list[ArtifactData] = ctx.artifacts
+    scaling_data = ctx.artifact_scaling
+    state = ctx.state
+
+    pieces_by_set = group_by(data, "set_id")  # type: ignore
+
+    # Candidate pieces for each slot of each set, in source order
+    candidates: dict[str, dict[str, list[ArtifactData]]] = {}
     for set_id, set_name in constants["ArtifactSets"].items():
         path = OUTPUT_PATH / "artifacts" / set_name
         path.mkdir(exist_ok=True, parents=True)
 
-        json_path = path / "data.json"
-        json_path.unlink(missing_ok=True)
-        with json_path.open("x") as file:
-            pieces = {}
-            for piece in filter(lambda x: x["set_id"] == int(set_id), data):
-                if TYPE_CHECKING:
-                    piece = cast(ArtifactData, piece)
-                if piece["text_map_key"] not in TEXTMAP:
-                    continue
-                if piece["slot"] in pieces:
+        slots: dict[str, list[ArtifactData]] = {}
+        for piece in pieces_by_set.get(int(set_id), []):
+            if TYPE_CHECKING:
+                piece = cast(ArtifactData, piece)
+            if piece["text_map_key"] not in TEXTMAP:
+                continue
+            slots.setdefault(piece["slot"], []).append(piece)
+        candidates[set_name] = slots
+
+    # Each slot uses its first candidate with an image; fetch the next
+    # candidate for every slot that failed until none are left
+    chosen: dict[str, dict[str, ArtifactData]] = {name: {} for name in candidates}
+    changed_images: set[Path] = set()
+    if no_images is False:
+        pending = {
+            (set_name, slot): iter(pieces)
+            for set_name, slots in candidates.items()
+            for slot, pieces in slots.items()
+        }
+        while pending:
+            image_jobs = {}
+            for key, remaining in list(pending.items()):
+                piece = next(remaining, None)
+                if piece is None:
+                    del pending[key]
                     continue
-                if no_images is False:
-                    if get_artifact_image(path, piece) is False:
-                        continue
-
-                piece_name = TEXTMAP[piece["text_map_key"]]
-                pieces[piece["slot"]] = {
-                    "name": format_pascal_key(piece_name),
-                    **piece,
-                }
-
-            set_data = {
-                "name": constants["ArtifactSetNames"][set_name],
-                "pieces": pieces,
+                job = artifact_image_job(OUTPUT_PATH / "artifacts" / key[0], piece)
+                image_jobs[job] = (key, piece)
+
+            results = fetch_images(list(image_jobs), changed=changed_images)
+            for job, success in results.items():
+                (set_name, slot), piece = image_jobs[job]
+                if success:
+                    chosen[set_name][slot] = piece
+                    del pending[(set_name, slot)]
+    else:
+        for set_name, slots in candidates.items():
+            chosen[set_name] = {slot: pieces[0] for slot, pieces in slots.items()}
+
+    # Pieces are written in source order regardless of which candidate won
+    order = {id(piece): i for i, piece in enumerate(data)}
+    entity_jobs = []
+    for set_id, set_name in constants["ArtifactSets"].items():
+        path = OUTPUT_PATH / "artifacts" / set_name
+        if any(path / f"{slot}.png" in changed_images for slot in chosen[set_name]):
+            state.record("artifacts", set_name)
+
+        pieces = {}
+        for piece in sorted(
+            chosen[set_name].values(), key=lambda piece: order[id(piece)]
+        ):
+            piece_name = TEXTMAP[piece["text_map_key"]]
+            pieces[piece["slot"]] = {
+                "name": format_pascal_key(piece_name),
+                **piece,
             }
-            json.dump(set_data, file, indent=2)
-
-        set_export_path = path / "index.tsx"
-        set_export_path.unlink(missing_ok=True)
-        with set_export_path.open("x") as file:
-            code = re.sub(
-                r"^\s*",
-                "",
-                """{0}
-                import data from "./data.json";
-                const toExport = {{ {1} }};
-                export default toExport;
-                """.format(
-                    "\n".join(f"import {slot} from './{slot}.png'" for slot in pieces),
-                    ", ".join((*pieces, "data"))
-                ),
-                flags=re.M,
-            ).strip()
-            file.write(code)
-
-        print(f"Generated data for {set_name}")
+
+        set_data = {
+            "name": constants["ArtifactSetNames"][set_name],
+            "pieces": pieces,
+        }
+        entity_jobs.append(
+            EntityJob(
+                set_name,
+                write_artifact_set,
+                (path, set_data, state.previous("artifacts", set_name)),
+            )
+        )
+
+    run_jobs(entity_jobs, jobs, record_entity(state, "artifacts"))
 
     scaling_path = OUTPUT_PATH / "artifacts" / "scaling.json"
-    scaling_path.unlink(missing_ok=True)
-    with scaling_path.open("x") as file:
-        json.dump(scaling_data, file, indent=2)
+    if write_if_changed(scaling_path, json.dumps(scaling_data, indent=2)):
+        state.record("artifacts", scaling_path.name)
+
+    rolls_path = OUTPUT_PATH / "artifacts" / ROLLS_FILE
+    tables = build_roll_tables(scaling_data, ctx.artifact_substats)
+    if write_if_changed(rolls_path, json.dumps(tables, indent=2)):
+        state.record("artifacts", rolls_path.name)
 
     index_path = OUTPUT_PATH / "artifacts" / "index.tsx"
-    index_path.unlink(missing_ok=True)
-    with index_path.open("x") as file:
-        code = re.sub(
-            r"^\s*",
-            "",
-            """
+    code = re.sub(
+        r"^\s*",
+        "",
+        """
         {0}
         {1}
         export default artifacts;
         """.format(
-                "\n".join(
-                    f"import {name} from './{name}';"
-                    for name in constants["ArtifactSets"].values()
-                ),
-                f"const artifacts = {{ {', '.join(constants['ArtifactSets'].values())} }};",
+            "\n".join(
+                f"import {name} from './{name}';"
+                for name in constants["ArtifactSets"].values()
             ),
-            flags=re.M,
-        ).strip()
-        file.write(code)
-
-
-def generate_weapon_data(constants: dict, no_images=False):
-    data = get_weapon_data()
-    curves_data = get_weapon_curves()
-    ascension_scaling = get_weapon_ascension_base_atk(data)
-
+            f"const artifacts = {{ {', '.join(constants['ArtifactSets'].values())} }};",
+        ),
+        flags=re.M,
+    ).strip()
+    if write_if_changed(index_path, code):
+        state.record("artifacts", index_path.name)
+    write_lazy_modules(
+        state,
+        "artifacts",
+        {
+            set_name: {"name": constants["ArtifactSetNames"][set_name]}
+            for set_name in constants["ArtifactSets"].values()
+        },
+        {
+            set_name: {slot: f"{slot}.png" for slot in chosen[set_name]}
+            for set_name in constants["ArtifactSets"].values()
+        },
+    )
+
+
+def generate_weapon_data(
+    ctx: DataContext,
+    constants: dict,
+    no_images=False,
+    jobs=1,
+    compact=False,
+    float_encoding="json",
+):
+    data = ctx.weapons
+    curves_data = ctx.weapon_curves
+    ascension_scaling = ctx.weapon_ascension_base_atk
+    state = ctx.state
+
+    weapons = []
     for weapon in data:
         if weapon["text_map_key"] not in TEXTMAP:
             continue
@@ -265,70 +536,80 @@ def generate_weapon_data(constants: dict, no_images=False):
 
         path = OUTPUT_PATH / "weapons" / format_pascal_key(name)
         path.mkdir(exist_ok=True, parents=True)
+        weapons.append((name, path, weapon))
+
+    changed_images: set[Path] = set()
+    if no_images is False:
+        images = fetch_images(
+            [weapon_image_job(path, weapon) for _, path, weapon in weapons],
+            changed=changed_images,
+        )
 
+    # Entities that share an output path (the two Travelers) keep only the
+    # last one, so its fingerprint is the one recorded for the path
+    entity_jobs: dict[Path, EntityJob] = {}
+    manifest: dict[str, dict[str, Any]] = {}
+    for name, path, weapon in weapons:
         if no_images is False:
-            if get_weapon_image(path, weapon) is False:
+            job = weapon_image_job(path, weapon)
+            if images[job] is False:
                 rmtree(str(path), ignore_errors=True)
+                state.forget("weapons", path.name)
                 continue
+            if job.path in changed_images:
+                state.record("weapons", path.name)
+
+        manifest[path.name] = {"name": name, "type": weapon["type"]}
+
+        scalings = {}
+        for stat, stat_data in weapon["stats"].items():
+            multipliers = []
+            for lvl in range(100):
+                multipliers.append(curves_data[lvl][stat_data["curve"]])
+            scalings[stat] = multipliers
+
+        json_data = {
+            "name": name,
+            **weapon,
+            "scalings": scalings,
+            "ascension_base_atk": ascension_scaling[weapon["id"]],
+        }
+        if compact:
+            # Scalings are looked up in curves.json by each stat's curve name
+            del json_data["scalings"]
+
+        entity_jobs[path] = EntityJob(
+            name,
+            write_weapon,
+            (path, json_data, state.previous("weapons", path.name)),
+        )
 
-        json_path = path / "data.json"
-        json_path.unlink(missing_ok=True)
-        with json_path.open("x") as file:
-            scalings = {}
-            for stat, stat_data in weapon["stats"].items():
-                multipliers = []
-                for lvl in range(100):
-                    multipliers.append(curves_data[lvl][stat_data["curve"]])
-                scalings[stat] = multipliers
-
-            json_data = {
-                "name": name,
-                **weapon,
-                "scalings": scalings,
-                "ascension_base_atk": ascension_scaling[weapon["id"]],
-            }
-            json.dump(json_data, file, indent=2)
-
-        codegen_path = path / "index.tsx"
-        codegen_path.unlink(missing_ok=True)
-        with codegen_path.open("x") as file:
-            code = re.sub(
-                r"^\s*",
-                "",
-                """import icon from "./icon.png";
-                import data from "./data.json";
-                const toExport = { data, icon };
-                export default toExport;
-                """,
-                flags=re.M,
-            )
-            file.write(code)
+    run_jobs(list(entity_jobs.values()), jobs, record_entity(state, "weapons"))
 
-        print(f"Generated data for {name}")
+    curves_path = OUTPUT_PATH / "weapons" / "curves.json"
+    if write_curve_table(curves_path, ctx.weapon_curve_table, float_encoding):
+        state.record("weapons", curves_path.name)
 
-    modules = [
-        mod
-        for mod in (OUTPUT_PATH / "weapons").iterdir()
-        if not mod.name.endswith(".tsx")
-    ]
+    modules = sorted(mod for mod in (OUTPUT_PATH / "weapons").iterdir() if mod.is_dir())
 
     index_path = OUTPUT_PATH / "weapons" / "index.tsx"
-    index_path.unlink(missing_ok=True)
-    with index_path.open("x") as file:
-        code = re.sub(
-            r"^\s*",
-            "",
-            """
+    code = re.sub(
+        r"^\s*",
+        "",
+        """
             {0}
             const weapons = {{ {1} }};
             export default weapons;
             """.format(
-                "\n".join(
-                    f"import {module.name} from './{module.name}';"
-                    for module in modules
-                ),
-                ", ".join(mod.name for mod in modules),
+            "\n".join(
+                f"import {module.name} from './{module.name}';" for module in modules
             ),
-            flags=re.M,
-        )
-        file.write(code)
+            ", ".join(mod.name for mod in modules),
+        ),
+        flags=re.M,
+    )
+    if write_if_changed(index_path, code):
+        state.record("weapons", index_path.name)
+    write_lazy_modules(
+        state, "weapons", manifest, {key: {"icon": "icon.png"} for key in manifest}
+    )
@@ -1,50 +1,204 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple, TypedDict
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from constants import TexturesBase
+from metrics import METRICS
 
 if TYPE_CHECKING:
     from _types import ArtifactData, CharacterData, WeaponData
 
+MAX_WORKERS = 16
+TIMEOUT = 30
+MANIFEST_PATH = Path("./output/images.json")
 
-def get_character_image(path: Path, character: CharacterData) -> bool:
-    resp = requests.get(str(TexturesBase / (character["icon"] + ".png")))
-    if resp.status_code != 200:
-        return False
 
-    image_path = path / "avatar.png"
-    image_path.unlink(missing_ok=True)
-    with image_path.open("b+w") as file:
-        file.write(resp.content)
-    print(f"Wrote {image_path}")
-    return True
+class ImageJob(NamedTuple):
+    url: str
+    path: Path
 
 
-def get_artifact_image(path: Path, artifact: ArtifactData) -> bool:
-    resp = requests.get(str(TexturesBase / (artifact["icon"] + ".png")))
-    if resp.status_code != 200:
-        return False
+class ManifestEntry(TypedDict):
+    url: str
+    etag: str | None
+    last_modified: str | None
+    sha256: str
+    size: int
 
-    image_path = path / f"{artifact['slot']}.png"
-    image_path.unlink(missing_ok=True)
-    with image_path.open("b+w") as file:
-        file.write(resp.content)
-    print(f"Wrote {image_path}")
-    return True
 
+class ImageManifest:
+    """Source URL, validators and content hash of every downloaded image,
+    keyed by the path it was written to"""
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = path
+        self.entries: dict[str, ManifestEntry] = {}
+        # Paths written during this run
+        self.written: set[Path] = set()
+        try:
+            with path.open() as file:
+                entries = json.load(file)
+            # Manifests written before entries were keyed by path lack "url"
+            self.entries = {
+                key: entry for key, entry in entries.items() if "url" in entry
+            }
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def save(self):
+        content = json.dumps(self.entries, indent=2, sort_keys=True)
+        if self.path.is_file() and self.path.read_text() == content:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(content)
+        tmp_path.replace(self.path)
+
+    def is_current(self, job: ImageJob) -> bool:
+        """Whether the file on disk is the one recorded for this job's URL"""
+
+        entry = self.entries.get(str(job.path))
+        if entry is None or entry.get("url") != job.url or not job.path.is_file():
+            return False
+        if job.path.stat().st_size != entry["size"]:
+            return False
+        return file_digest(job.path) == entry["sha256"]
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@cache
+def get_session() -> requests.Session:
+    """Shared keep-alive session, retrying transient failures with backoff"""
+
+    retry = Retry(
+        total=4,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-def get_weapon_image(path: Path, weapon: WeaponData) -> bool:
-    resp = requests.get(str(TexturesBase / (weapon["icon"] + ".png")))
+
+def character_image_job(path: Path, character: CharacterData) -> ImageJob:
+    return ImageJob(
+        str(TexturesBase / (character["icon"] + ".png")), path / "avatar.png"
+    )
+
+
+def artifact_image_job(path: Path, artifact: ArtifactData) -> ImageJob:
+    return ImageJob(
+        str(TexturesBase / (artifact["icon"] + ".png")),
+        path / f"{artifact['slot']}.png",
+    )
+
+
+def weapon_image_job(path: Path, weapon: WeaponData) -> ImageJob:
+    return ImageJob(str(TexturesBase / (weapon["icon"] + ".png")), path / "icon.png")
+
+
+def download_image(job: ImageJob, manifest: ImageManifest) -> bool:
+    headers = {}
+    current = manifest.is_current(job)
+    if current:
+        entry = manifest.entries[str(job.path)]
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    resp = get_session().get(job.url, headers=headers, timeout=TIMEOUT)
+    if resp.status_code == 304 and current:
+        METRICS.count("image_cache_hits")
+        return True
     if resp.status_code != 200:
         return False
+    METRICS.count("images_downloaded")
+    METRICS.count("bytes_downloaded", len(resp.content))
 
-    image_path = path / "icon.png"
-    image_path.unlink(missing_ok=True)
-    with image_path.open("b+w") as file:
+    digest = hashlib.sha256(resp.content).hexdigest()
+    manifest.entries[str(job.path)] = {
+        "url": job.url,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "sha256": digest,
+        "size": len(resp.content),
+    }
+    if current and digest == entry["sha256"]:
+        METRICS.count("image_cache_hits")
+        return True
+
+    # Write to a temporary file first so readers never see a partial image
+    tmp_path = job.path.with_name(f".{job.path.name}.{uuid.uuid4().hex}.tmp")
+    with tmp_path.open("b+x") as file:
         file.write(resp.content)
-    print(f"Wrote {image_path}")
+    tmp_path.replace(job.path)
+    manifest.written.add(job.path)
+    METRICS.record_written(job.path)
+    print(f"Wrote {job.path}")
     return True
+
+
+def fetch_images(
+    jobs: list[ImageJob],
+    max_workers: int = MAX_WORKERS,
+    changed: set[Path] | None = None,
+) -> dict[ImageJob, bool]:
+    """Download every job concurrently, returning whether each one succeeded.
+
+    Images that are unchanged upstream, or whose content matches the file
+    already on disk, are left untouched. Paths that were written are added
+    to ``changed`` when it is given. When several jobs share a path only the
+    last one is downloaded, and the others report its result.
+    """
+
+    manifest = ImageManifest()
+    by_path = {job.path: job for job in jobs}
+    results: dict[ImageJob, bool] = {}
+    failures: dict[ImageJob, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(download_image, job, manifest): job
+            for job in by_path.values()
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results[job] = future.result()
+            except (requests.RequestException, OSError) as exc:
+                results[job] = False
+                failures[job] = str(exc)
+            else:
+                if results[job] is False:
+                    failures[job] = "not found"
+    for job in jobs:
+        results[job] = results[by_path[job.path]]
+
+    manifest.save()
+    if changed is not None:
+        changed.update(manifest.written)
+
+    if failures:
+        print(f"Failed to fetch {len(failures)} of {len(by_path)} images:")
+        for job, reason in failures.items():
+            print(f"  {job.url} -> {job.path}: {reason}")
+
+    return results
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from decimal import Decimal
+from functools import cache
+from pathlib import Path
+from typing import IO, Any
+
+from jsonstream import JSONStreamReader
+from stats import SLOTS, STAT_KEYS
+
+CONSTANTS_PATH = Path("../src/constants.json")
+GOOD_VERSION = 2
+# Sections in the order they are written
+SECTIONS = ("characters", "weapons", "artifacts")
+WEAPON_GROUPS = (
+    "WeaponsSword",
+    "WeaponsClaymore",
+    "WeaponsPolearm",
+    "WeaponsBow",
+    "WeaponsCatalyst",
+)
+
+Record = dict[str, Any]
+
+
+class GOODError(ValueError):
+    pass
+
+
+@cache
+def _upper_chars(content: str) -> str:
+    # Same filter as getUpperCaseChars, which keeps digits and "_" too
+    return "".join(char for char in content if char.upper() == char)
+
+
+def _js_number(value: float) -> str:
+    """Format a number the way JavaScript's Number.prototype.toString does.
+
+    Both languages print the shortest digits that round-trip, but JavaScript
+    only switches to exponent form below 1e-6 or from 1e21, and writes the
+    exponent without padding and with an explicit sign (1e-7, 1e+21).
+    """
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == 0:
+        return "0"
+    sign = "-" if value < 0 else ""
+    _, digit_tuple, exponent = Decimal(repr(abs(value))).as_tuple()
+    digits = "".join(map(str, digit_tuple)).rstrip("0")
+    # Position of the decimal point relative to the start of the digits
+    point = len(digit_tuple) + int(exponent)
+    if len(digits) <= point <= 21:
+        return sign + digits + "0" * (point - len(digits))
+    if 0 < point <= 21:
+        return f"{sign}{digits[:point]}.{digits[point:]}"
+    if -6 < point <= 0:
+        return f"{sign}0.{'0' * -point}{digits}"
+    mantissa = digits if len(digits) == 1 else f"{digits[0]}.{digits[1:]}"
+    return f"{sign}{mantissa}e{point - 1:+d}"
+
+
+def artifact_id(artifact: Record) -> str:
+    """Python port of artifactUtil.artifactID"""
+    substat_id = "".join(
+        f"{_upper_chars(sub['key'])}{_js_number(sub['value'])}"
+        for sub in artifact["substats"]
+    )
+    return (
+        f"{_upper_chars(artifact['setKey'])}{artifact['rarity']}{artifact['level']}"
+        f"{_upper_chars(artifact['mainStatKey'])}{substat_id}"
+    )
+
+
+class GOODConstants:
+    """Hashed sets of the keys a GOOD database may reference"""
+
+    def __init__(self, constants: dict[str, Any]):
+        self.characters = frozenset(constants["Characters"])
+        self.weapons = frozenset(
+            key for group in WEAPON_GROUPS for key in constants[group]
+        )
+        self.artifact_sets = frozenset(constants["ArtifactSetNames"])
+        self.stats = frozenset(STAT_KEYS)
+        self.slots = frozenset(SLOTS)
+
+    @classmethod
+    def load(cls, path: Path = CONSTANTS_PATH) -> GOODConstants:
+        with path.open(encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def location(self, location: str) -> str:
+        return location if location in self.characters else ""
+
+    def normalise_character(self, character: Record) -> Record:
+        if character.get("key") not in self.characters:
+            raise GOODError(f"Unknown character {character.get('key')!r}")
+        talent = character.get("talent", {})
+        return {
+            "key": character["key"],
+            "level": int(character.get("level", 1)),
+            "constellation": int(character.get("constellation", 0)),
+            "ascension": int(character.get("ascension", 0)),
+            "talent": {
+                name: int(talent.get(name, 1)) for name in ("auto", "skill", "burst")
+            },
+        }
+
+    def normalise_weapon(self, weapon: Record) -> Record:
+        if weapon.get("key") not in self.weapons:
+            raise GOODError(f"Unknown weapon {weapon.get('key')!r}")
+        return {
+            "key": weapon["key"],
+            "level": int(weapon.get("level", 1)),
+            "ascension": int(weapon.get("ascension", 0)),
+            "refinement": int(weapon.get("refinement", 1)),
+            "location": self.location(weapon.get("location", "")),
+            "lock": bool(weapon.get("lock", False)),
+        }
+
+    def normalise_artifact(self, artifact: Record) -> Record:
+        if artifact.get("setKey") not in self.artifact_sets:
+            raise GOODError(f"Unknown artifact set {artifact.get('setKey')!r}")
+        if artifact.get("slotKey") not in self.slots:
+            raise GOODError(f"Unknown artifact slot {artifact.get('slotKey')!r}")
+        if artifact.get("mainStatKey") not in self.stats:
+            raise GOODError(f"Unknown main stat {artifact.get('mainStatKey')!r}")
+
+        substats = []
+        for substat in artifact.get("substats", []):
+            # Exporters pad unrolled substats with an empty key
+            if not substat.get("key"):
+                continue
+            if substat["key"] not in self.stats:
+                raise GOODError(f"Unknown substat {substat['key']!r}")
+            substats.append({"key": substat["key"], "value": substat["value"]})
+
+        return {
+            "setKey": artifact["setKey"],
+            "slotKey": artifact["slotKey"],
+            "level": int(artifact.get("level", 0)),
+            "rarity": int(artifact["rarity"]),
+            "mainStatKey": artifact["mainStatKey"],
+            "location": self.location(artifact.get("location", "")),
+            "lock": bool(artifact.get("lock", False)),
+            "substats": substats,
+        }
+
+
+class GOODReader:
+    """Streams and normalises the records of one or more GOOD files.
+
+    Each section is read with a separate pass over the inputs, so only one
+    record is decoded at a time regardless of file size. Characters are
+    deduplicated by key and artifacts by artifact_id, keeping the first
+    occurrence; weapons can legitimately repeat and are all kept. Invalid
+    records are skipped and counted in ``report``.
+    """
+
+    def __init__(self, paths: Iterable[Path], constants: GOODConstants):
+        self.paths = list(paths)
+        self.constants = constants
+        self.report: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+
+    def _iter_raw(self, section: str) -> Iterator[Record]:
+        for path in self.paths:
+            with path.open("rb") as file:
+                reader = JSONStreamReader(file)
+                for key in reader.iter_keys():
+                    if key == "format":
+                        if reader.value() != "GOOD":
+                            raise GOODError(f"{path} is not a GOOD database")
+                    elif key == section:
+                        yield from reader.iter_array()
+                    else:
+                        reader.skip()
+
+    def iter_section(self, section: str) -> Iterator[Record]:
+        normalise = getattr(self.constants, f"normalise_{section[:-1]}")
+        # Digests keep the seen set small for very large merged exports
+        seen: set[bytes] = set()
+        for raw in self._iter_raw(section):
+            self.report[f"{section} read"] += 1
+            try:
+                record = normalise(raw)
+            except (GOODError, KeyError, TypeError, ValueError) as e:
+                self.report[f"{section} invalid"] += 1
+                self.errors[str(e)] += 1
+                continue
+
+            if section != "weapons":
+                identity = (
+                    record["key"] if section == "characters" else artifact_id(record)
+                )
+                digest = hashlib.blake2b(identity.encode(), digest_size=16).digest()
+                if digest in seen:
+                    self.report[f"{section} duplicate"] += 1
+                    continue
+                seen.add(digest)
+
+            self.report[f"{section} written"] += 1
+            yield record
+
+
+class GOODWriter:
+    """Writes a GOOD database one record at a time"""
+
+    def __init__(self, fp: IO[str], source: str = "genshin-builds-manager"):
+        self.fp = fp
+        self.fp.write(
+            f'{{"format": "GOOD", "version": {GOOD_VERSION}, '
+            f'"source": {json.dumps(source)}'
+        )
+
+    def write_section(self, section: str, records: Iterable[Record]) -> int:
+        self.fp.write(f', "{section}": [')
+        count = 0
+        for record in records:
+            self.fp.write(",\n  " if count else "\n  ")
+            json.dump(record, self.fp, separators=(",", ":"))
+            count += 1
+        self.fp.write("\n]" if count else "]")
+        return count
+
+    def close(self):
+        self.fp.write("}\n")
+
+
+def merge_good(
+    inputs: Iterable[Path], output: Path, constants: GOODConstants
+) -> GOODReader:
+    """Normalise and deduplicate GOOD files into a single database"""
+    reader = GOODReader(inputs, constants)
+    tmp_path = output.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as file:
+        writer = GOODWriter(file)
+        for section in SECTIONS:
+            writer.write_section(section, reader.iter_section(section))
+        writer.close()
+    tmp_path.replace(output)
+    return reader
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Validate, normalise and merge GOOD databases"
+    )
+    parser.add_argument("inputs", nargs="+", type=Path)
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument("--constants", type=Path, default=CONSTANTS_PATH)
+    args = parser.parse_args()
+
+    reader = merge_good(args.inputs, args.output, GOODConstants.load(args.constants))
+    for name, count in sorted(reader.report.items()):
+        print(f"{name}: {count}")
+    for error, count in reader.errors.most_common(10):
+        print(f"Skipped {count}x: {error}")
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import codecs
+import json
+from collections.abc import Iterator
+from typing import IO, Any
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_DELIMITERS = frozenset(",:]} \t\r\n")
+
+
+class JSONStreamReader:
+    """Incrementally decodes JSON values from a text or binary file object.
+
+    Only the structural characters of the outermost container are handled
+    here; each element is decoded with ``json.JSONDecoder.raw_decode``, so at
+    most one element plus one chunk is held in memory at a time.
+    """
+
+    def __init__(self, fp: IO, chunk_size: int = CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        while True:
+            raw = self.fp.read(self.chunk_size)
+            chunk = (
+                self._utf8.decode(raw, final=not raw) if isinstance(raw, bytes) else raw
+            )
+            if not raw:
+                self.eof = True
+            # A chunk can end partway through a multi-byte character
+            if chunk or self.eof:
+                break
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or "" at EOF"""
+
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(
+                f"Expected {char!r}, found {found!r}", self.buf, self.pos
+            )
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut off by the end of the buffer may continue in the
+            # next chunk, so only accept values followed by a delimiter
+            if (end == len(self.buf) or self.buf[end] not in _DELIMITERS) and (
+                self._fill()
+            ):
+                continue
+            self.pos = end
+            return value
+
+    def _separator(self, close: str) -> bool:
+        char = self.peek()
+        if char == ",":
+            self.pos += 1
+            return True
+        self.expect(close)
+        return False
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if not self._separator("]"):
+                return
+
+    def iter_keys(self) -> Iterator[str]:
+        """Yield each key of an object, leaving the reader at its value.
+
+        The caller must consume the value (with value, iter_array, iter_keys
+        or skip) before advancing, which allows nested containers to be
+        streamed as well.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if not self._separator("}"):
+                return
+
+    def iter_object(self) -> Iterator[tuple[str, Any]]:
+        for key in self.iter_keys():
+            yield key, self.value()
+
+    def skip(self):
+        """Consume the next value without holding a whole container in memory"""
+        char = self.peek()
+        if char == "[":
+            for _ in self.iter_array():
+                pass
+        elif char == "{":
+            for _ in self.iter_keys():
+                self.skip()
+        else:
+            self.value()
+
+
+def iter_array(fp: IO) -> Iterator[Any]:
+    """Yield each element of a top-level JSON array"""
+    return JSONStreamReader(fp).iter_array()
+
+
+def iter_object(fp: IO) -> Iterator[tuple[str, Any]]:
+    """Yield each key/value pair of a top-level JSON object"""
+    return JSONStreamReader(fp).iter_object()
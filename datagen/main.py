@@ -1,6 +1,26 @@
 from argparse import ArgumentParser
+from pathlib import Path
 
-from copy_data import copy_artifact_data, copy_character_data, copy_weapon_data
+from bundle import BUNDLE_PATH, write_bundle
+from cache import SOURCE_CACHE
+from character_filter import CHARACTER_FILTER_PATH, CharacterFilter
+from copy_data import (
+    BASE_OUTPUT,
+    copy_artifact_data,
+    copy_character_data,
+    copy_weapon_data,
+)
+from data_context import DataContext
+from diff_data import diff_generation
+from encoding import FLOAT_ENCODINGS
+from export_sqlite import DATABASE_PATH, write_database
+from metrics import METRICS, PROFILE_DIR, Profiler
+from prefetch import MAX_CONCURRENCY, MAX_RATE, AsyncFetcher
+from process_images import IMAGE_FORMATS, ImageOptions, process_images
+from schema import validate_sources
+from state import GenerationState
+from stats import StatCalculator
+from fetch_data import TEXTMAP, source_urls
 from generate_data import (
     generate_artifact_dirs,
     generate_character_dirs,
@@ -13,27 +33,196 @@ def main():
     parser = ArgumentParser()
     parser.add_argument("--no-images", action="store_true")
     parser.add_argument("--no-copy", action="store_true")
+    parser.add_argument(
+        "--dry-run-copy",
+        action="store_true",
+        help="List the files copying would add, change or remove in src/data",
+    )
     parser.add_argument("--no-write-constants", action="store_true")
+    parser.add_argument(
+        "--offline", action="store_true", help="Only use cached source data"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate every cached source file with upstream",
+    )
+    parser.add_argument(
+        "--fixtures", type=Path, help="Read source data from a local directory"
+    )
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help="Source files downloaded at once",
+    )
+    parser.add_argument(
+        "--fetch-rate",
+        type=float,
+        default=MAX_RATE,
+        help="Most source requests started per second, 0 for no limit",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate every entity even if its source data is unchanged",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to generate entities",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("expanded", "compact"),
+        default="compact",
+        help="compact stores growth curves once in curves.json instead of per entity",
+    )
+    parser.add_argument(
+        "--float-encoding",
+        choices=FLOAT_ENCODINGS,
+        default="json",
+        help="Encoding of the arrays in curves.json",
+    )
+    parser.add_argument(
+        "--process-images",
+        action="store_true",
+        help="Recompress downloaded icons and pack each category into a sprite atlas",
+    )
+    parser.add_argument("--image-format", choices=IMAGE_FORMATS, default="webp")
+    parser.add_argument(
+        "--icon-size",
+        type=int,
+        help="Downscale processed icons so their longest edge is at most this",
+    )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help=f"Also pack the generated stat tables into {BUNDLE_PATH}",
+    )
+    parser.add_argument(
+        "--sqlite",
+        action="store_true",
+        help=f"Also export the generated data to {DATABASE_PATH}",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Write cProfile, tracemalloc and metrics reports to {PROFILE_DIR}",
+    )
+    parser.add_argument(
+        "--character-filter",
+        type=Path,
+        default=CHARACTER_FILTER_PATH,
+        help="JSON policy choosing which characters are generated",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Stop if any source record does not match _types.py instead of"
+        " dropping it",
+    )
+    parser.add_argument(
+        "--full-textmap",
+        action="store_true",
+        help="Keep the whole TextMap in memory instead of only referenced names",
+    )
 
     args = parser.parse_args()
+    SOURCE_CACHE.configure(
+        offline=args.offline or None,
+        fixtures=args.fixtures,
+        max_age=0 if args.refresh else None,
+    )
+    TEXTMAP.configure(projected=not args.full_textmap)
+
+    profiler = Profiler(METRICS) if args.profile else None
+    if profiler is not None:
+        profiler.start()
+
+    with METRICS.stage("prefetch_sources"):
+        fetched = AsyncFetcher(
+            concurrency=args.fetch_concurrency, rate=args.fetch_rate
+        ).run(source_urls())
+        if fetched:
+            print(f"Fetched {len(fetched)} source files")
+
+    state = GenerationState(force=args.force)
+    ctx = DataContext(state)
+
+    with METRICS.stage("validate_sources"):
+        validation = validate_sources(ctx)
+        print(validation.report())
+        if validation.errors and args.strict:
+            raise SystemExit("Source data does not match _types.py")
 
     print("Generating constants")
-    constants = generate_constants(args.no_write_constants)
+    with METRICS.stage("generate_constants"):
+        constants = generate_constants(
+            ctx, args.no_write_constants, CharacterFilter.load(args.character_filter)
+        )
 
     print("Generating character data")
-    generate_character_dirs(constants, no_images=args.no_images)
+    with METRICS.stage("generate_character_dirs"):
+        generate_character_dirs(
+            ctx,
+            constants,
+            no_images=args.no_images,
+            jobs=args.jobs,
+            compact=args.format == "compact",
+            float_encoding=args.float_encoding,
+        )
     print("Generating artifact data")
-    generate_artifact_dirs(constants, no_images=args.no_images)
+    with METRICS.stage("generate_artifact_dirs"):
+        generate_artifact_dirs(ctx, constants, no_images=args.no_images, jobs=args.jobs)
     print("Generating weapon data")
-    generate_weapon_data(constants, no_images=args.no_images)
+    with METRICS.stage("generate_weapon_data"):
+        generate_weapon_data(
+            ctx,
+            constants,
+            no_images=args.no_images,
+            jobs=args.jobs,
+            compact=args.format == "compact",
+            float_encoding=args.float_encoding,
+        )
+    if args.process_images:
+        print("Processing images")
+        with METRICS.stage("process_images"):
+            process_images(
+                state, ImageOptions(format=args.image_format, size=args.icon_size)
+            )
+    if args.bundle:
+        with METRICS.stage("write_bundle"):
+            if write_bundle(StatCalculator(BASE_OUTPUT)):
+                print(f"Wrote {BUNDLE_PATH}")
+    if args.sqlite:
+        with METRICS.stage("write_database"):
+            count = write_database()
+            print(f"Wrote {count} rows to {DATABASE_PATH}")
+    print(f"Skipped {state.skipped} unchanged entities")
+    with METRICS.stage("diff_generation"):
+        print(diff_generation(state, validation.dropped).report())
+    state.save()
 
     if not args.no_copy:
-        print("Copying character data")
-        copy_character_data()
-        print("Copying artifact data")
-        copy_artifact_data()
-        print("Copying weapon data")
-        copy_weapon_data()
+        with METRICS.stage("copy_data"):
+            for category, copy in (
+                ("characters", copy_character_data),
+                ("artifacts", copy_artifact_data),
+                ("weapons", copy_weapon_data),
+            ):
+                print(f"Copying {category[:-1]} data")
+                copy(state.changed(category), dry_run=args.dry_run_copy)
+                if not args.dry_run_copy:
+                    state.mark_copied(category)
+            state.save()
+
+    print(ctx.report())
+    print(METRICS.report())
+    if profiler is not None:
+        profiler.stop()
+        print(f"Wrote profile to {PROFILE_DIR}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+# Stage that work done outside of any stage is recorded under
+SETUP_STAGE = "setup"
+PROFILE_DIR = Path("./output/profile")
+# Entries kept in the text reports written by --profile
+PROFILE_TOP = 50
+TRACEMALLOC_FRAMES = 10
+
+
+class Metrics:
+    """Wall time and counters for each stage of a generation run.
+
+    Counters such as ``bytes_downloaded`` or ``files_written`` are added to
+    whichever stage is running. Every source fetch is also recorded on its
+    own. Counting is thread-safe, and counters from worker processes are
+    merged in by run_jobs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.stages: dict[str, Counter[str]] = {}
+        self.seconds: dict[str, float] = {}
+        self.fetches: list[dict[str, Any]] = []
+        self.current = SETUP_STAGE
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        previous, self.current = self.current, name
+        self.stages.setdefault(name, Counter())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0) + (
+                time.perf_counter() - start
+            )
+            self.current = previous
+
+    def count(self, counter: str, amount: float = 1):
+        with self._lock:
+            self.stages.setdefault(self.current, Counter())[counter] += amount
+
+    def record_written(self, *paths: Path):
+        """Count files that were just written and their total size"""
+        self.count("files_written", len(paths))
+        self.count("bytes_written", sum(path.stat().st_size for path in paths))
+
+    def merge(self, counters: dict[str, float]):
+        with self._lock:
+            self.stages.setdefault(self.current, Counter()).update(counters)
+
+    def totals(self) -> Counter[str]:
+        totals: Counter[str] = Counter()
+        for counters in self.stages.values():
+            totals.update(counters)
+        return totals
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Add the time spent in the block to the ``<name>_seconds`` counter"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.count(f"{name}_seconds", time.perf_counter() - start)
+
+    def record_fetch(self, url: str, source: str, seconds: float, size: int = 0):
+        """Record one source fetch; ``source`` says where its content came from"""
+        with self._lock:
+            self.fetches.append(
+                {
+                    "stage": self.current,
+                    "url": url,
+                    "source": source,
+                    "seconds": seconds,
+                    "bytes": size,
+                }
+            )
+        self.count("fetches")
+        self.count(f"fetch_{source}")
+        self.count("fetch_seconds", seconds)
+        if source == "download":
+            self.count("bytes_downloaded", size)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "stages": {
+                name: {"seconds": self.seconds.get(name, 0), **counters}
+                for name, counters in self.stages.items()
+            },
+            "totals": dict(self.totals()),
+            "fetches": self.fetches,
+        }
+
+    def report(self) -> str:
+        lines = ["Stage metrics:"]
+        for name, counters in self.stages.items():
+            details = ", ".join(
+                f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in sorted(counters.items())
+            )
+            lines.append(f"  {name}: {self.seconds.get(name, 0):.2f}s {details}")
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
+
+
+class Profiler:
+    """cProfile and tracemalloc over a whole run, written out with the metrics.
+
+    Only the main process is profiled; work done by ``--jobs`` workers shows
+    up as time spent waiting on the pool.
+    """
+
+    def __init__(self, metrics: Metrics, path: Path = PROFILE_DIR):
+        self.metrics = metrics
+        self.path = path
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.profile.dump_stats(self.path / "profile.pstats")
+        report = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=report)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        (self.path / "profile.txt").write_text(report.getvalue())
+
+        lines = [
+            f"Current traced memory: {current / 1024 / 1024:.1f} MiB",
+            f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB",
+            "",
+            f"Top {PROFILE_TOP} allocation sites still held at the end of the run:",
+        ]
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:PROFILE_TOP])
+        (self.path / "tracemalloc.txt").write_text("\n".join(lines) + "\n")
+
+        summary = self.metrics.summary()
+        summary["memory"] = {"traced_bytes": current, "traced_peak_bytes": peak}
+        with (self.path / "metrics.json").open("w") as file:
+            json.dump(summary, file, indent=2)
@@ -0,0 +1,502 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import random
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from good import GOODConstants, GOODReader
+from stats import (
+    SLOTS,
+    STAT_INDEX,
+    STAT_KEYS,
+    Build,
+    Record,
+    StatCalculator,
+    _entity_dirs,
+    final_stats,
+)
+
+# Artifact stats that feed each final stat
+STAT_SOURCES = {"hp": ("hp", "hp_"), "atk": ("atk", "atk_"), "def": ("def", "def_")}
+# Shards per worker, so uneven shards still keep every process busy
+SHARDS_PER_JOB = 4
+# Combinations scored per vectorised batch in the last two slots
+LEAF_BLOCK = 1 << 16
+
+MAIN_STATS = {
+    "flower": ("hp",),
+    "plume": ("atk",),
+    "sands": ("hp_", "atk_", "def_", "eleMas", "enerRech_"),
+    "goblet": ("hp_", "atk_", "def_", "eleMas") + STAT_KEYS[11:],
+    "circlet": ("hp_", "atk_", "def_", "eleMas", "critRate_", "critDMG_", "heal_"),
+}
+# Highest single roll of each substat on a 5 star artifact
+SUBSTAT_ROLLS = {
+    "hp": 298.75,
+    "hp_": 5.83,
+    "atk": 19.45,
+    "atk_": 5.83,
+    "def": 23.15,
+    "def_": 7.29,
+    "eleMas": 23.31,
+    "enerRech_": 6.48,
+    "critRate_": 3.89,
+    "critDMG_": 7.77,
+}
+
+
+class LinearObjective:
+    """Weighted sum of final stats; weights must not be negative"""
+
+    def __init__(self, weights: dict[str, float]):
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Objective weights must not be negative")
+        if not set(weights) <= STAT_INDEX.keys():
+            raise ValueError(f"Unknown stats in {sorted(weights)}")
+        self.weights = weights
+        self.stats = tuple(weights)
+
+    def __call__(self, stats: dict[str, np.ndarray]) -> np.ndarray:
+        return sum(weight * stats[stat] for stat, weight in self.weights.items())
+
+
+class CritObjective:
+    """Total of ``stat`` times the average crit multiplier"""
+
+    def __init__(self, stat: str = "atk", crit_rate: float = 5, crit_dmg: float = 50):
+        self.stat = stat
+        self.crit_rate = crit_rate
+        self.crit_dmg = crit_dmg
+        self.stats = (stat, "critRate_", "critDMG_")
+
+    def __call__(self, stats: dict[str, np.ndarray]) -> np.ndarray:
+        rate = np.clip(stats["critRate_"] + self.crit_rate, 0, 100) / 100
+        total = stats[f"base_{self.stat}"] + stats[self.stat]
+        return total * (1 + rate * (stats["critDMG_"] + self.crit_dmg) / 100)
+
+
+OBJECTIVES = {
+    "atk": lambda: LinearObjective({"atk": 1}),
+    "hp": lambda: LinearObjective({"hp": 1}),
+    "eleMas": lambda: LinearObjective({"eleMas": 1}),
+    "crit": CritObjective,
+    "crit-hp": lambda: CritObjective("hp"),
+    "crit-def": lambda: CritObjective("def"),
+}
+
+
+class OptimizedBuild(NamedTuple):
+    score: float
+    artifacts: dict[str, Record]
+    stats: dict[str, float]
+
+
+class SearchSpace(NamedTuple):
+    """Everything a search worker needs, kept picklable for process pools"""
+
+    vectors: list[np.ndarray]  # per slot, (artifact, stat) values
+    classes: list[np.ndarray]  # per slot, index of a required set or -1
+    requirements: np.ndarray  # minimum pieces of each required set
+    base: np.ndarray  # character hp/atk/def_ base stats with weapon ATK
+    baseline: np.ndarray  # stat totals from the weapon alone
+    objective: LinearObjective | CritObjective
+    top_k: int
+
+
+def _score(space: SearchSpace, totals: np.ndarray) -> np.ndarray:
+    rows = len(totals)
+    stats = final_stats(
+        np.broadcast_to(space.base, (rows, len(space.base))),
+        totals + space.baseline,
+    )
+    return space.objective(stats)
+
+
+def _search(
+    space: SearchSpace, first: np.ndarray
+) -> tuple[list[tuple[float, tuple[int, ...]]], int, int]:
+    """Branch and bound over the slots, with the first slot limited to ``first``.
+
+    Candidates in each slot are visited in order of an upper bound: the
+    objective with the componentwise best remaining artifacts added. The
+    objectives are non-decreasing in every stat, so once that bound cannot
+    beat the current k-th best score the rest of the slot is skipped.
+    Returns the top-k heap, the number of complete builds scored and the
+    number of search tree nodes, partial or complete, that were scored.
+    """
+    depth_count = len(space.vectors)
+    # remaining[d] is the componentwise max of every slot from d onwards
+    remaining = [np.zeros(len(STAT_KEYS)) for _ in range(depth_count + 1)]
+    for depth in reversed(range(depth_count)):
+        remaining[depth] = remaining[depth + 1] + space.vectors[depth].max(axis=0)
+    required = len(space.requirements)
+
+    heap: list[tuple[float, tuple[int, ...]]] = []
+    evaluated = 0
+    visited = 0
+
+    def threshold() -> float:
+        return heap[0][0] if len(heap) >= space.top_k else -np.inf
+
+    def offer(score: float, chosen: tuple[int, ...]):
+        if len(heap) < space.top_k:
+            heapq.heappush(heap, (score, chosen))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, chosen))
+
+    last = space.vectors[-1]
+    last_counts = np.zeros((len(last), required), dtype=np.intp)
+    constrained = space.classes[-1] >= 0
+    last_counts[constrained, space.classes[-1][constrained]] = 1
+
+    def leaves(totals: np.ndarray, counts: np.ndarray, chosen: list[tuple[int, ...]]):
+        """Score every pairing of the given partial builds with the last slot"""
+        nonlocal evaluated, visited
+        scores = _score(
+            space, (totals[:, None, :] + last[None, :, :]).reshape(-1, len(STAT_KEYS))
+        ).reshape(len(totals), len(last))
+        if required:
+            complete = counts[:, None, :] + last_counts[None, :, :]
+            scores[~(complete >= space.requirements).all(axis=2)] = -np.inf
+        evaluated += scores.size
+        visited += scores.size
+
+        flat = np.flatnonzero(scores > threshold())
+        if len(flat) > space.top_k:
+            flat = flat[np.argpartition(-scores.ravel()[flat], space.top_k)]
+            flat = flat[: space.top_k]
+        for row, column in zip(*np.unravel_index(flat, scores.shape)):
+            offer(float(scores[row, column]), chosen[row] + (int(column),))
+
+    def visit(
+        depth: int,
+        totals: np.ndarray,
+        counts: np.ndarray,
+        chosen: list[tuple[int, ...]],
+    ):
+        """Expand a batch of partial builds by one slot, best bound first"""
+        nonlocal visited
+        candidates = first if depth == 0 else np.arange(len(space.vectors[depth]))
+        vectors = space.vectors[depth][candidates]
+        classes = space.classes[depth][candidates]
+
+        # (partial build, candidate) pairs, flattened
+        totals = (totals[:, None, :] + vectors[None, :, :]).reshape(-1, len(STAT_KEYS))
+        counts = np.repeat(counts, len(candidates), axis=0)
+        constrained = np.tile(classes >= 0, len(chosen))
+        counts[constrained, np.tile(classes, len(chosen))[constrained]] += 1
+        deficit = np.maximum(space.requirements - counts, 0).sum(axis=1)
+
+        bounds = _score(space, totals + remaining[depth + 1])
+        visited += len(bounds)
+        order = np.argsort(-bounds, kind="stable")
+        order = order[deficit[order] <= depth_count - depth - 1]
+
+        block = max(1, LEAF_BLOCK // len(space.vectors[depth + 1]))
+        for start in range(0, len(order), block):
+            rows = order[start : start + block]
+            rows = rows[bounds[rows] > threshold()]
+            if not len(rows):
+                break
+            prefixes = [
+                chosen[row // len(candidates)]
+                + (int(candidates[row % len(candidates)]),)
+                for row in rows
+            ]
+            # The last two slots are scored together, as one product
+            if depth == depth_count - 2:
+                leaves(totals[rows], counts[rows], prefixes)
+            else:
+                visit(depth + 1, totals[rows], counts[rows], prefixes)
+
+    empty = (np.zeros((1, len(STAT_KEYS))), np.zeros((1, required), dtype=np.intp))
+    if depth_count == 1:
+        leaves(*empty, [()])
+    else:
+        visit(0, *empty, [()])
+    return heap, evaluated, visited
+
+
+def _search_shard(
+    args: tuple[SearchSpace, np.ndarray],
+) -> tuple[list[tuple[float, tuple[int, ...]]], int, int]:
+    return _search(*args)
+
+
+def dominance_filter(
+    vectors: np.ndarray, classes: np.ndarray, top_k: int, chunk_size: int = 256
+) -> np.ndarray:
+    """Indices of the artifacts dominated by fewer than ``top_k`` others.
+
+    An artifact dominates another in the same slot if it is at least as good
+    in every relevant stat and swapping it in cannot break a set constraint,
+    i.e. it has the same set class or the other piece counts for no required
+    set. Identical artifacts are ordered by index.
+    """
+    count = len(vectors)
+    keep = []
+    for start in range(0, count, chunk_size):
+        rows = np.arange(start, min(start + chunk_size, count))
+        at_least = (vectors[None, :, :] >= vectors[rows, None, :]).all(axis=2)
+        better = (vectors[None, :, :] > vectors[rows, None, :]).any(axis=2)
+        earlier = np.arange(count)[None, :] < rows[:, None]
+        swappable = (classes[None, :] == classes[rows, None]) | (
+            classes[rows, None] < 0
+        )
+        dominators = at_least & (better | earlier) & swappable
+        keep.extend(rows[dominators.sum(axis=1) < top_k])
+    return np.array(keep, dtype=np.intp)
+
+
+class ArtifactOptimizer:
+    """Finds the top-k artifact combinations for a character and weapon.
+
+    The search space is every choice of one artifact per slot. It is reduced
+    by per-slot dominance pruning over the stats the objective depends on,
+    then explored with branch and bound (see _search). ``sets`` gives the
+    minimum number of pieces required from each set, e.g. 4 of one set or 2
+    each of two sets.
+    """
+
+    def __init__(
+        self,
+        calculator: StatCalculator,
+        build: Build,
+        objective: LinearObjective | CritObjective,
+        top_k: int = 10,
+        sets: dict[str, int] | None = None,
+    ):
+        self.calculator = calculator
+        self.build = build
+        self.objective = objective
+        self.top_k = top_k
+        self.sets = sets or {}
+        self.evaluated = 0
+        self.visited = 0
+        self.candidates = 0
+
+        known_sets = {p.name for p in _entity_dirs(calculator.data_dir / "artifacts")}
+        for key, pieces in self.sets.items():
+            if key not in known_sets:
+                raise ValueError(f"Unknown artifact set {key!r}")
+            if not 0 < pieces <= len(SLOTS):
+                raise ValueError(f"Invalid piece count {pieces} for {key}")
+        if sum(self.sets.values()) > len(SLOTS):
+            raise ValueError("Set constraints need more pieces than there are slots")
+
+        self.columns = sorted(
+            {
+                STAT_INDEX[source]
+                for stat in objective.stats
+                for source in STAT_SOURCES.get(stat, (stat,))
+            }
+        )
+
+    def _space(self, slots: list[list[Record]]) -> tuple[SearchSpace, list[list[int]]]:
+        base, totals, _ = self.calculator.build_totals(
+            [{**self.build, "artifacts": {}}]
+        )
+        set_index = {key: i for i, key in enumerate(self.sets)}
+        vectors, classes, indices = [], [], []
+        for artifacts in slots:
+            slot_vectors = self.calculator.artifact_vectors(artifacts)
+            slot_classes = np.array(
+                [set_index.get(a["setKey"], -1) for a in artifacts], dtype=np.intp
+            )
+            keep = dominance_filter(
+                slot_vectors[:, self.columns], slot_classes, self.top_k
+            )
+            vectors.append(slot_vectors[keep])
+            classes.append(slot_classes[keep])
+            indices.append(keep.tolist())
+
+        space = SearchSpace(
+            vectors,
+            classes,
+            np.array(list(self.sets.values()), dtype=np.intp),
+            base[0],
+            totals[0],
+            self.objective,
+            self.top_k,
+        )
+        return space, indices
+
+    def optimize(
+        self, artifacts: Sequence[Record], jobs: int = 1
+    ) -> list[OptimizedBuild]:
+        by_slot = {
+            slot: [a for a in artifacts if a["slotKey"] == slot] for slot in SLOTS
+        }
+        # Slots without any artifacts are left empty. Slots with the most
+        # varied main stats are searched first, as their componentwise
+        # maximum is the loosest part of the bound.
+        used = sorted(
+            (slot for slot in SLOTS if by_slot[slot]),
+            key=lambda slot: len({a["mainStatKey"] for a in by_slot[slot]}),
+            reverse=True,
+        )
+        slots = [by_slot[slot] for slot in used]
+        if not slots:
+            return []
+
+        space, indices = self._space(slots)
+        self.candidates = int(np.prod([len(v) for v in space.vectors], dtype=float))
+        first = np.arange(len(space.vectors[0]))
+        # A single slot is scored in one batch, so there is nothing to shard
+        if jobs <= 1 or len(space.vectors) == 1:
+            heap, self.evaluated, self.visited = _search(space, first)
+        else:
+            shards = np.array_split(first, min(len(first), jobs * SHARDS_PER_JOB))
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(
+                    executor.map(_search_shard, [(space, shard) for shard in shards])
+                )
+            heap = heapq.nlargest(
+                self.top_k, (entry for result, _, _ in results for entry in result)
+            )
+            self.evaluated = sum(evaluated for _, evaluated, _ in results)
+            self.visited = sum(visited for _, _, visited in results)
+
+        builds = []
+        for score, chosen in sorted(heap, reverse=True):
+            totals = sum(v[i] for v, i in zip(space.vectors, chosen))
+            stats = final_stats(space.base[None, :], (totals + space.baseline)[None, :])
+            pieces = {
+                slot: slots[depth][indices[depth][i]]
+                for depth, (slot, i) in enumerate(zip(used, chosen))
+            }
+            builds.append(
+                OptimizedBuild(
+                    score,
+                    {slot: pieces[slot] for slot in SLOTS if slot in pieces},
+                    {stat: float(values[0]) for stat, values in stats.items()},
+                )
+            )
+        return builds
+
+
+def random_artifacts(count: int, sets: Sequence[str], seed: int = 0) -> list[Record]:
+    """Plausible max level 5 star artifacts, for benchmarking"""
+    rng = random.Random(seed)
+    artifacts = []
+    for _ in range(count):
+        slot = rng.choice(SLOTS)
+        main = rng.choice(MAIN_STATS[slot])
+        substats = rng.sample([k for k in SUBSTAT_ROLLS if k != main], 4)
+        artifacts.append(
+            {
+                "setKey": rng.choice(sets),
+                "slotKey": slot,
+                "level": 20,
+                "rarity": 5,
+                "mainStatKey": main,
+                "location": "",
+                "lock": False,
+                "substats": [
+                    {
+                        "key": key,
+                        "value": round(
+                            SUBSTAT_ROLLS[key]
+                            * rng.uniform(0.7, 1)
+                            * rng.randint(1, 3),
+                            1,
+                        ),
+                    }
+                    for key in substats
+                ],
+            }
+        )
+    return artifacts
+
+
+def benchmark(
+    optimizer: ArtifactOptimizer, artifacts: Sequence[Record], jobs: int = 1
+) -> list[OptimizedBuild]:
+    start = time.perf_counter()
+    builds = optimizer.optimize(artifacts, jobs)
+    elapsed = time.perf_counter() - start
+
+    slot_counts = [sum(a["slotKey"] == slot for a in artifacts) for slot in SLOTS]
+    full = np.prod([count for count in slot_counts if count], dtype=float)
+    print(
+        f"Search space: {len(artifacts)} artifacts, {full:.3g} combinations,"
+        f" {optimizer.candidates:.3g} after dominance pruning"
+    )
+    print(
+        f"Visited {optimizer.visited:,} nodes and scored"
+        f" {optimizer.evaluated:,} complete builds in {elapsed:.2f}s"
+    )
+    print(f"{optimizer.visited / elapsed:,.0f} nodes visited/s")
+    return builds
+
+
+def _parse_sets(values: list[str]) -> dict[str, int]:
+    sets = {}
+    for value in values:
+        key, _, pieces = value.partition(":")
+        sets[key] = int(pieces or 4)
+    return sets
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the best artifact combinations")
+    parser.add_argument("database", type=Path, nargs="?", help="GOOD database")
+    parser.add_argument("--character", required=True)
+    parser.add_argument("--level", type=int, default=90)
+    parser.add_argument("--ascension", type=int, default=6)
+    parser.add_argument("--weapon", help="weapon key, level 90 ascension 6")
+    parser.add_argument(
+        "--objective",
+        choices=sorted(OBJECTIVES),
+        default="crit",
+        help="stat to maximise",
+    )
+    parser.add_argument(
+        "--set", action="append", default=[], help="SetKey[:pieces], repeatable"
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument(
+        "--random",
+        type=int,
+        metavar="N",
+        help="benchmark on N random artifacts instead of a database",
+    )
+    args = parser.parse_args()
+
+    calculator = StatCalculator()
+    if args.random:
+        sets = [p.name for p in _entity_dirs(calculator.data_dir / "artifacts")]
+        artifacts = random_artifacts(args.random, sets)
+    elif args.database:
+        reader = GOODReader([args.database], GOODConstants.load())
+        artifacts = list(reader.iter_section("artifacts"))
+    else:
+        parser.error("Either a database or --random is required")
+
+    build: Build = {
+        "character": {
+            "key": args.character,
+            "level": args.level,
+            "ascension": args.ascension,
+        },
+        "artifacts": {},
+    }
+    if args.weapon:
+        build["weapon"] = {"key": args.weapon, "level": 90, "ascension": 6}
+
+    optimizer = ArtifactOptimizer(
+        calculator, build, OBJECTIVES[args.objective](), args.top, _parse_sets(args.set)
+    )
+    for result in benchmark(optimizer, artifacts, args.jobs):
+        pieces = ", ".join(
+            f"{a['setKey']} {a['mainStatKey']}" for a in result.artifacts.values()
+        )
+        print(f"{result.score:,.1f}: {pieces}")
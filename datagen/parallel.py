@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, NamedTuple
+
+from metrics import METRICS
+
+
+class EntityJob(NamedTuple):
+    name: str
+    func: Callable[..., Any]
+    args: tuple
+
+
+class GenerationError(Exception):
+    def __init__(self, failures: list[tuple[EntityJob, BaseException]]):
+        self.failures = failures
+        super().__init__(
+            f"Failed to generate {len(failures)} entities:\n"
+            + "\n".join(
+                f"  {job.name}: {type(exc).__name__}: {exc}" for job, exc in failures
+            )
+        )
+
+
+def _run_with_metrics(func: Callable[..., Any], args: tuple) -> tuple[Any, Counter]:
+    """Run a job in a worker process, returning the metrics it counted"""
+    METRICS.reset()
+    result = func(*args)
+    return result, METRICS.totals()
+
+
+def run_jobs(
+    jobs: list[EntityJob],
+    max_workers: int = 1,
+    on_success: Callable[[EntityJob, Any], Any] | None = None,
+):
+    """Run independent entity jobs, across worker processes if ``max_workers`` > 1.
+
+    ``on_success`` is called with each job and its return value in submission
+    order regardless of the order jobs finish in, so output stays deterministic.
+    Every job is run even if some fail; the failures are then raised together
+    as a GenerationError.
+    """
+
+    failures: list[tuple[EntityJob, BaseException]] = []
+
+    def finish(job: EntityJob, result: Any, exc: BaseException | None):
+        if exc is not None:
+            failures.append((job, exc))
+        elif on_success is not None:
+            on_success(job, result)
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                result = job.func(*job.args)
+            except Exception as exc:
+                finish(job, None, exc)
+            else:
+                finish(job, result, None)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures: list[Future] = [
+                executor.submit(_run_with_metrics, job.func, job.args) for job in jobs
+            ]
+            for job, future in zip(jobs, futures):
+                exc = future.exception()
+                if exc is not None:
+                    finish(job, None, exc)
+                    continue
+                result, counters = future.result()
+                METRICS.merge(counters)
+                finish(job, result, None)
+
+    if failures:
+        raise GenerationError(failures)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import time
+from collections.abc import Iterable
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from cache import (
+    BACKOFF,
+    CHUNK_SIZE,
+    RETRIES,
+    RETRY_STATUSES,
+    SOURCE_CACHE,
+    SourceCache,
+)
+from metrics import METRICS
+
+if TYPE_CHECKING:
+    from yarl import URL
+
+MAX_CONCURRENCY = 8
+# Request starts per second after the initial burst, 0 for no limit
+MAX_RATE = 10.0
+TIMEOUT = aiohttp.ClientTimeout(total=600, connect=10, sock_read=60)
+MAX_BACKOFF = 30.0
+
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header, in either of its forms"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket allowing ``burst`` requests at once, refilled at ``rate``/s"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._updated is not None:
+                elapsed = now - self._updated
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is the wait until this request's token refills
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class AsyncFetcher:
+    """Downloads source files into a SourceCache concurrently.
+
+    Every URL shares one pooled keep-alive client. At most ``concurrency``
+    requests are in flight, and after an initial burst of that many, request
+    starts are limited to ``rate`` per second. Responses are streamed to disk
+    and decompressed on the fly (gzip, and brotli when the Brotli package is
+    installed). Failed requests, 429s and 5xx responses are retried with
+    exponential backoff and jitter, honouring Retry-After. Fetches through the
+    cache afterwards are served from disk.
+    """
+
+    def __init__(
+        self,
+        cache: SourceCache = SOURCE_CACHE,
+        *,
+        concurrency: int = MAX_CONCURRENCY,
+        rate: float = MAX_RATE,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        timeout: aiohttp.ClientTimeout = TIMEOUT,
+    ):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    async def _download(self, session: aiohttp.ClientSession, url: URL) -> str:
+        key = str(url)
+        headers = self.cache.request_headers(key)
+        start = time.perf_counter()
+        async with session.get(key, headers=headers) as resp:
+            if resp.status == 304 and headers:
+                self.cache.mark_revalidated(key)
+                size = self.cache.index[key].get("size", 0)
+                METRICS.record_fetch(
+                    key, "revalidated", time.perf_counter() - start, size
+                )
+                return "revalidated"
+            if resp.status in RETRY_STATUSES:
+                raise RetryableError(
+                    f"{key} returned {resp.status}",
+                    _retry_after(resp.headers.get("Retry-After")),
+                )
+            resp.raise_for_status()
+
+            tmp_path = self.cache.download_path(key)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with tmp_path.open("wb") as file:
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        file.write(chunk)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            self.cache.store(key, tmp_path, digest.hexdigest(), size, resp.headers)
+        METRICS.record_fetch(key, "download", time.perf_counter() - start, size)
+        return "download"
+
+    async def _fetch(
+        self,
+        session: aiohttp.ClientSession,
+        limiter: RateLimiter,
+        slots: asyncio.Semaphore,
+        url: URL,
+    ) -> str:
+        for attempt in range(self.retries + 1):
+            async with slots:
+                await limiter.wait()
+                try:
+                    return await self._download(session, url)
+                except (
+                    RetryableError,
+                    aiohttp.ClientConnectionError,
+                    aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError,
+                ) as e:
+                    if attempt == self.retries:
+                        raise
+                    delay = getattr(e, "retry_after", None)
+                    if delay is None:
+                        delay = min(MAX_BACKOFF, self.backoff * 2**attempt)
+                        delay *= random.uniform(0.5, 1.5)
+                    print(f"Retrying {url} in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def fetch_all(self, urls: Iterable[URL]) -> dict[str, str]:
+        """Fetch every URL the cache cannot already serve, returning each source"""
+        pending = list(
+            dict.fromkeys(url for url in urls if self.cache.needs_fetch(url))
+        )
+        if not pending:
+            return {}
+        limiter = RateLimiter(self.rate, burst=self.concurrency)
+        slots = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout, auto_decompress=True
+        ) as session:
+            results = await asyncio.gather(
+                *(self._fetch(session, limiter, slots, url) for url in pending)
+            )
+        return {str(url): source for url, source in zip(pending, results)}
+
+    def run(self, urls: Iterable[URL]) -> dict[str, str]:
+        return asyncio.run(self.fetch_all(urls))
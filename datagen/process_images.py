@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from PIL import Image
+
+from metrics import METRICS
+from state import GenerationState, fingerprint
+
+OUTPUT_PATH = Path("./output")
+PROCESSED_PATH = Path("./output/processed_images.json")
+CATEGORIES = ("characters", "weapons", "artifacts")
+IMAGE_FORMATS = ("webp", "png")
+# Recompressed icons are written next to their source as e.g. avatar.min.webp
+PROCESSED_SUFFIX = ".min"
+ATLAS_NAME = "atlas"
+WEBP_QUALITY = 90
+WEBP_MAX_SIZE = 16383
+MAX_WORKERS = 8
+
+
+class ImageOptions(NamedTuple):
+    format: str = "webp"
+    # Longest edge icons are downscaled to, None keeps the source size
+    size: int | None = None
+    quality: int = WEBP_QUALITY
+
+
+def source_images(category_path: Path) -> list[Path]:
+    """Downloaded PNGs of every entity in a category"""
+    return sorted(
+        path
+        for path in category_path.glob("*/*.png")
+        if PROCESSED_SUFFIX not in path.suffixes
+    )
+
+
+def source_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def load_icon(path: Path, options: ImageOptions) -> Image.Image:
+    image = Image.open(path).convert("RGBA")
+    if options.size and max(image.size) > options.size:
+        image.thumbnail((options.size, options.size), Image.Resampling.LANCZOS)
+    return image
+
+
+def save_image(image: Image.Image, path: Path, options: ImageOptions):
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    if options.format == "webp":
+        image.save(tmp_path, "WEBP", quality=options.quality)
+    else:
+        image.save(tmp_path, "PNG", optimize=True)
+    tmp_path.replace(path)
+
+
+def save_text(content: str, path: Path):
+    # Replace rather than rewrite, as the old file may be hardlinked elsewhere
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(content)
+    tmp_path.replace(path)
+
+
+def processed_path(source: Path, options: ImageOptions) -> Path:
+    return source.with_name(f"{source.stem}{PROCESSED_SUFFIX}.{options.format}")
+
+
+def _remove_other_formats(path: Path, options: ImageOptions):
+    for image_format in IMAGE_FORMATS:
+        if image_format != options.format:
+            path.with_suffix(f".{image_format}").unlink(missing_ok=True)
+
+
+class ProcessedImages:
+    """Digests of the inputs every processed file was last built from.
+
+    Keyed by output path, each digest covers the source content and the
+    options, so unchanged icons and atlases are not decoded again.
+    """
+
+    def __init__(self, path: Path = PROCESSED_PATH):
+        self.path = path
+        self.entries: dict[str, str] = {}
+        try:
+            with path.open() as file:
+                self.entries = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def is_current(self, path: Path, digest: str) -> bool:
+        return self.entries.get(str(path)) == digest and path.is_file()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as file:
+            json.dump(self.entries, file, indent=2, sort_keys=True)
+        tmp_path.replace(self.path)
+
+
+def _process_icon(source: Path, dest: Path, options: ImageOptions) -> int:
+    save_image(load_icon(source, options), dest, options)
+    return dest.stat().st_size
+
+
+def pack_shelves(
+    sizes: list[tuple[int, int]],
+) -> tuple[list[tuple[int, int]], int, int]:
+    """Place rectangles on shelves, tallest first, in a roughly square sheet.
+
+    Returns the top left corner of each rectangle, in input order, and the
+    width and height of the sheet.
+    """
+    area = sum(width * height for width, height in sizes)
+    sheet_width = max(max(w for w, _ in sizes), math.ceil(math.sqrt(area)))
+    positions = [(0, 0)] * len(sizes)
+    x = y = shelf_height = width = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x + w > sheet_width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        positions[i] = (x, y)
+        x += w
+        width = max(width, x)
+        shelf_height = max(shelf_height, h)
+    return positions, width, y + shelf_height
+
+
+def write_atlas(
+    category_path: Path, sources: list[Path], options: ImageOptions, digest: str
+) -> list[Path]:
+    """Pack a category's icons into one sprite sheet with a coordinate map.
+
+    Sprites are keyed by ``Entity/stem`` and placed with pack_shelves.
+    """
+    icons = [load_icon(source, options) for source in sources]
+    positions, width, height = pack_shelves([icon.size for icon in icons])
+    if options.format == "webp" and max(width, height) > WEBP_MAX_SIZE:
+        raise ValueError(
+            f"The {category_path.name} atlas would be {width}x{height}, larger"
+            f" than WebP allows; lower --icon-size"
+        )
+
+    atlas = Image.new("RGBA", (width, height))
+    sprites = {}
+    for source, icon, (x, y) in zip(sources, icons, positions):
+        atlas.paste(icon, (x, y))
+        sprites[f"{source.parent.name}/{source.stem}"] = {
+            "x": x,
+            "y": y,
+            "width": icon.width,
+            "height": icon.height,
+        }
+
+    image_path = category_path / f"{ATLAS_NAME}.{options.format}"
+    save_image(atlas, image_path, options)
+    _remove_other_formats(image_path, options)
+
+    map_path = category_path / f"{ATLAS_NAME}.json"
+    save_text(
+        json.dumps(
+            {
+                "width": atlas.width,
+                "height": atlas.height,
+                "digest": digest,
+                "sprites": sprites,
+            },
+            indent=2,
+        ),
+        map_path,
+    )
+
+    module_path = category_path / f"{ATLAS_NAME}.ts"
+    save_text(
+        f'import image from "./{image_path.name}";\n'
+        f'import map from "./{map_path.name}";\n'
+        "const atlas = { ...map, image };\n"
+        "export default atlas;\n",
+        module_path,
+    )
+    METRICS.record_written(image_path, map_path, module_path)
+    return [image_path, map_path, module_path]
+
+
+def process_category(
+    category: str,
+    state: GenerationState,
+    options: ImageOptions,
+    processed: ProcessedImages,
+):
+    """Recompress a category's icons and rebuild its atlas if any input changed"""
+    category_path = OUTPUT_PATH / category
+    sources = source_images(category_path)
+    if not sources:
+        return
+
+    digests = {}
+    pending = []
+    for source in sources:
+        dest = processed_path(source, options)
+        digests[source] = fingerprint(source_digest(source), options)
+        if processed.is_current(dest, digests[source]):
+            METRICS.count("images_unchanged")
+        else:
+            pending.append((source, dest))
+
+    with ThreadPoolExecutor(MAX_WORKERS) as executor:
+        sizes = executor.map(lambda job: _process_icon(*job, options), pending)
+        for (source, dest), size in zip(pending, sizes):
+            _remove_other_formats(dest, options)
+            processed.entries[str(dest)] = digests[source]
+            state.record(category, source.parent.name)
+            METRICS.record_written(dest)
+            METRICS.count("images_processed")
+            METRICS.count("image_bytes_saved", source.stat().st_size - size)
+
+    atlas_path = category_path / f"{ATLAS_NAME}.{options.format}"
+    atlas_digest = fingerprint(sorted((str(s), d) for s, d in digests.items()))
+    if not processed.is_current(atlas_path, atlas_digest):
+        for path in write_atlas(category_path, sources, options, atlas_digest):
+            state.record(category, path.name)
+        processed.entries[str(atlas_path)] = atlas_digest
+        print(f"Packed {len(sources)} {category} icons into {atlas_path.name}")
+
+
+def process_images(
+    state: GenerationState,
+    options: ImageOptions = ImageOptions(),
+    categories: tuple[str, ...] = CATEGORIES,
+):
+    processed = ProcessedImages()
+    try:
+        for category in categories:
+            process_category(category, state, options, processed)
+    finally:
+        processed.save()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import shutil
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cache import SOURCE_CACHE
+from constants import TexturesBase
+from data_context import DataContext
+from fetch_data import source_urls
+from generate_images import MAX_WORKERS, TIMEOUT, get_session
+
+FIXTURES_PATH = Path("./fixtures")
+
+
+def record_sources(fixtures: Path) -> int:
+    """Copy every source table and the TextMap into ``fixtures``.
+
+    Files come through SOURCE_CACHE, so a warm cache is recorded without
+    touching the network. Returns the total size in bytes.
+    """
+    size = 0
+    for url in source_urls():
+        # Same layout SourceCache.fixture_path reads back
+        path = fixtures / url.parent.name / url.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(SOURCE_CACHE.fetch(url), path)
+        size += path.stat().st_size
+        print(f"Recorded {path}")
+    return size
+
+
+def _record_image(icon: str, path: Path) -> bool:
+    resp = get_session().get(str(TexturesBase / f"{icon}.png"), timeout=TIMEOUT)
+    if resp.status_code != 200:
+        return False
+    path.write_bytes(resp.content)
+    return True
+
+
+def record_images(fixtures: Path) -> tuple[int, int]:
+    """Download the texture of every entity in the recorded sources.
+
+    Returns the number of textures recorded and the number that failed.
+    """
+    ctx = DataContext()
+    icons = sorted(
+        {
+            record["icon"]
+            for records in (ctx.characters, ctx.artifacts, ctx.weapons)
+            for record in records
+        }
+    )
+    ui = fixtures / "ui"
+    ui.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(MAX_WORKERS) as executor:
+        results = list(
+            executor.map(lambda icon: _record_image(icon, ui / f"{icon}.png"), icons)
+        )
+    return sum(results), len(results) - sum(results)
+
+
+def main():
+    parser = ArgumentParser(
+        description="Record the upstream source files as fixtures for bench.py"
+    )
+    parser.add_argument("fixtures", type=Path, nargs="?", default=FIXTURES_PATH)
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="Also record the textures, for bench.py --serve --images",
+    )
+    args = parser.parse_args()
+
+    size = record_sources(args.fixtures)
+    print(f"Recorded {size / 1024 / 1024:.1f} MiB of source data")
+    if args.images:
+        # Read entities back from what was just recorded
+        SOURCE_CACHE.configure(fixtures=args.fixtures)
+        recorded, failed = record_images(args.fixtures)
+        print(f"Recorded {recorded} textures, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
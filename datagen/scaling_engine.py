@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from _types import CharacterBases, CharacterData, WeaponData
+    from data_context import DataContext
+
+# Order of the last axis of every character stat array
+CHARACTER_STATS = ("hp", "atk", "def_")
+MAX_ASCENSION = 6
+
+
+def _curve_array(curves: dict[str, list[float]]) -> tuple[np.ndarray, dict[str, int]]:
+    names = sorted(curves)
+    index = {name: i for i, name in enumerate(names)}
+    return np.array([curves[name] for name in names], dtype=np.float64), index
+
+
+def artifact_main_stat_array(
+    artifact_scaling: dict[int, dict[int, dict[str, float]]],
+) -> tuple[list[str], np.ndarray]:
+    """Stat names and a dense ``(rank, level, stat)`` array of main stat values.
+
+    Accepts the output of get_artifact_scaling or a loaded scaling.json, whose
+    keys are strings. Stats that cannot roll at a rank/level are NaN.
+    """
+    stats = sorted(
+        {
+            stat
+            for levels in artifact_scaling.values()
+            for values in levels.values()
+            for stat in values
+        }
+    )
+    if not stats:
+        return stats, np.empty((0, 0, 0))
+
+    stat_index = {stat: i for i, stat in enumerate(stats)}
+    max_rank = max(int(rank) for rank in artifact_scaling)
+    max_level = max(int(lvl) for levels in artifact_scaling.values() for lvl in levels)
+    array = np.full((max_rank + 1, max_level + 1, len(stats)), np.nan)
+    for rank, levels in artifact_scaling.items():
+        for lvl, values in levels.items():
+            for stat, value in values.items():
+                array[int(rank), int(lvl), stat_index[stat]] = value
+    return stats, array
+
+
+class ScalingEngine:
+    """Dense array form of the growth tables for batched stat computation.
+
+    Curves are held as ``(curve, level)`` arrays, so the multipliers of many
+    entities are gathered with a single fancy index instead of per-level dict
+    lookups. Character and weapon levels are 1-based and artifact levels
+    0-based, matching GOOD and the app.
+    """
+
+    def __init__(
+        self,
+        character_curves: dict[str, list[float]],
+        weapon_curves: dict[str, list[float]],
+        artifact_scaling: dict[int, dict[int, dict[str, float]]] | None = None,
+    ):
+        self.character_curves, self.character_curve_index = _curve_array(
+            character_curves
+        )
+        self.weapon_curves, self.weapon_curve_index = _curve_array(weapon_curves)
+
+        # (rank, level, stat) main stat values, NaN where a stat cannot roll
+        self.artifact_stats, self.artifact_main_stats = artifact_main_stat_array(
+            artifact_scaling or {}
+        )
+
+    @classmethod
+    def from_context(cls, ctx: DataContext) -> ScalingEngine:
+        return cls(
+            ctx.character_curve_table, ctx.weapon_curve_table, ctx.artifact_scaling
+        )
+
+    @property
+    def max_level(self) -> int:
+        return self.character_curves.shape[1]
+
+    def character_multipliers(self, characters: list[CharacterData]) -> np.ndarray:
+        """``(character, level, stat)`` growth multipliers"""
+        indices = np.array(
+            [
+                [self.character_curve_index[c["curves"][k]] for k in CHARACTER_STATS]
+                for c in characters
+            ],
+            dtype=np.intp,
+        ).reshape(-1, len(CHARACTER_STATS))
+        return self.character_curves[indices].transpose(0, 2, 1)
+
+    def character_table(
+        self,
+        characters: list[CharacterData],
+        ascension_values: dict[int, dict[int, CharacterBases]],
+    ) -> np.ndarray:
+        """``(character, level, ascension, stat)`` base stats for a whole roster"""
+        bases = np.array(
+            [[c["base"][k] for k in CHARACTER_STATS] for c in characters],
+            dtype=np.float64,
+        ).reshape(-1, len(CHARACTER_STATS))
+        ascensions = np.array(
+            [
+                [
+                    [
+                        ascension_values[c["ascension_id"]][asc][k]
+                        for k in CHARACTER_STATS
+                    ]
+                    for asc in range(MAX_ASCENSION + 1)
+                ]
+                for c in characters
+            ],
+            dtype=np.float64,
+        ).reshape(-1, MAX_ASCENSION + 1, len(CHARACTER_STATS))
+        multipliers = self.character_multipliers(characters)
+        return (
+            bases[:, None, None, :] * multipliers[:, :, None, :]
+            + ascensions[:, None, :, :]
+        )
+
+    def weapon_multipliers(self, weapons: list[WeaponData], stat: str) -> np.ndarray:
+        """``(weapon, level)`` multipliers of ``stat``, NaN for weapons without it"""
+        indices = np.array(
+            [
+                (
+                    self.weapon_curve_index.get(w["stats"][stat]["curve"], -1)
+                    if stat in w["stats"]
+                    else -1
+                )
+                for w in weapons
+            ],
+            dtype=np.intp,
+        )
+        multipliers = self.weapon_curves[indices]
+        multipliers[indices < 0] = np.nan
+        return multipliers
+
+    def weapon_stat_table(self, weapons: list[WeaponData], stat: str) -> np.ndarray:
+        """``(weapon, level)`` scaled values of ``stat`` without ascension bonuses"""
+        bases = np.array(
+            [
+                w["stats"][stat]["base_value"] if stat in w["stats"] else np.nan
+                for w in weapons
+            ],
+            dtype=np.float64,
+        )
+        return bases[:, None] * self.weapon_multipliers(weapons, stat)
+
+    def weapon_atk_table(
+        self, weapons: list[WeaponData], ascension_base_atk: dict[int, dict[int, float]]
+    ) -> np.ndarray:
+        """``(weapon, level, ascension)`` base ATK for every weapon"""
+        ascensions = np.array(
+            [
+                [
+                    ascension_base_atk.get(w["id"], {}).get(asc, 0)
+                    for asc in range(MAX_ASCENSION + 1)
+                ]
+                for w in weapons
+            ],
+            dtype=np.float64,
+        ).reshape(-1, MAX_ASCENSION + 1)
+        return (
+            self.weapon_stat_table(weapons, "base_atk")[:, :, None]
+            + ascensions[:, None, :]
+        )
+
+    def character_stats(
+        self,
+        table: np.ndarray,
+        indices: np.ndarray,
+        levels: np.ndarray,
+        ascensions: np.ndarray,
+    ) -> np.ndarray:
+        """Gather ``(query, stat)`` base stats from a character_table"""
+        return table[indices, np.asarray(levels) - 1, ascensions]
+
+    def artifact_main_stat(
+        self, rarities: np.ndarray, levels: np.ndarray, stats: list[str]
+    ) -> np.ndarray:
+        """Main stat values for many artifacts at once, in source units"""
+        stat_index = {stat: i for i, stat in enumerate(self.artifact_stats)}
+        columns = np.array([stat_index[stat] for stat in stats], dtype=np.intp)
+        return self.artifact_main_stats[rarities, levels, columns]
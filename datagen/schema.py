@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from functools import cache
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    NamedTuple,
+    get_args,
+    get_origin,
+    get_type_hints,
+    is_typeddict,
+)
+
+from _types import ArtifactData, CharacterData, WeaponData
+from fetch_data import DROPPED_RECORDS
+
+if TYPE_CHECKING:
+    from data_context import DataContext
+
+# Appends a message to the list for every way the value breaks the type
+Checker = Callable[[Any, str, list[str]], None]
+
+# Stop reporting a category after this many errors
+MAX_ERRORS = 20
+
+
+def _check_any(value: Any, path: str, errors: list[str]):
+    pass
+
+
+def _check_type(*types: type) -> Checker:
+    names = " or ".join(t.__name__ for t in types)
+
+    def check(value: Any, path: str, errors: list[str]):
+        if isinstance(value, bool) or not isinstance(value, types):
+            errors.append(f"{path}: expected {names}, got {type(value).__name__}")
+
+    return check
+
+
+def _check_typeddict(schema: type) -> Checker:
+    fields = {
+        key: checker_for(hint)
+        for key, hint in get_type_hints(schema).items()  # type: ignore[arg-type]
+    }
+    # Sorted so errors come out in the same order on every run
+    required = sorted(schema.__required_keys__)  # type: ignore[attr-defined]
+
+    def check(value: Any, path: str, errors: list[str]):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected {schema.__name__}, got {value!r}")
+            return
+        for key in required:
+            if key not in value:
+                errors.append(f"{path}: missing {key!r}")
+        for key, check_field in fields.items():
+            if key in value:
+                check_field(value[key], f"{path}.{key}", errors)
+
+    return check
+
+
+def _check_list(item_hint: Any) -> Checker:
+    check_item = checker_for(item_hint)
+
+    def check(value: Any, path: str, errors: list[str]):
+        if not isinstance(value, list):
+            errors.append(f"{path}: expected a list, got {type(value).__name__}")
+            return
+        for i, item in enumerate(value):
+            check_item(item, f"{path}[{i}]", errors)
+
+    return check
+
+
+def _check_dict(key_hint: Any, value_hint: Any) -> Checker:
+    check_value = checker_for(value_hint)
+
+    def check(value: Any, path: str, errors: list[str]):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected a dict, got {type(value).__name__}")
+            return
+        for key, item in value.items():
+            # Integer keys become strings once written to JSON
+            if key_hint is int and not isinstance(key, int):
+                if not str(key).isdigit():
+                    errors.append(f"{path}: expected integer keys, got {key!r}")
+            check_value(item, f"{path}[{key!r}]", errors)
+
+    return check
+
+
+@cache
+def checker_for(hint: Any) -> Checker:
+    """Build a checker for a type from _types.py, once per type.
+
+    JSON numbers satisfy both int and float, as upstream stores several
+    integer fields as floats. Keys a TypedDict does not declare are allowed.
+    """
+    if is_typeddict(hint):
+        return _check_typeddict(hint)
+    origin = get_origin(hint)
+    if origin is list:
+        return _check_list(*get_args(hint))
+    if origin is dict:
+        return _check_dict(*get_args(hint))
+    if hint is int or hint is float:
+        return _check_type(int, float)
+    if hint is str:
+        return _check_type(str)
+    return _check_any
+
+
+def validate(record: Any, schema: type, path: str = "record") -> list[str]:
+    """Every way ``record`` does not match the TypedDict ``schema``"""
+    errors: list[str] = []
+    checker_for(schema)(record, path, errors)
+    return errors
+
+
+class ValidationResult(NamedTuple):
+    checked: int
+    # Schema violations by category
+    errors: dict[str, list[str]]
+    # Ids of the records with violations, by category
+    invalid: dict[str, list[Any]]
+    # Source rows dropped for a missing key, by table and key
+    dropped: dict[str, dict[str, int]]
+
+    def report(self) -> str:
+        lines = [f"Validated {self.checked} source records"]
+        for category, errors in self.errors.items():
+            lines.append(f"  Dropped {len(self.invalid[category])} invalid {category}:")
+            lines.extend(f"    {error}" for error in errors[:MAX_ERRORS])
+            if len(errors) > MAX_ERRORS:
+                lines.append(f"    ... and {len(errors) - MAX_ERRORS} more")
+        for table, keys in self.dropped.items():
+            counts = ", ".join(f"{key} ({count})" for key, count in keys.items())
+            lines.append(
+                f"  Dropped {sum(keys.values())} rows of {table} missing {counts}"
+            )
+        return "\n".join(lines)
+
+
+def _validate_category(
+    records: Iterable[dict], schema: type, category: str
+) -> tuple[list[Any], list[str]]:
+    """Ids of the invalid records and every error found in them"""
+    invalid: list[Any] = []
+    errors: list[str] = []
+    for record in records:
+        record_errors = validate(record, schema, f"{category}[{record.get('id')}]")
+        if record_errors:
+            invalid.append(record.get("id"))
+            errors.extend(record_errors)
+    return invalid, errors
+
+
+def validate_sources(ctx: DataContext) -> ValidationResult:
+    """Check every minimised source record against its TypedDict.
+
+    Records that do not match are dropped with ctx.drop_invalid, so later
+    stages only see valid ones.
+    """
+    checked = 0
+    errors: dict[str, list[str]] = {}
+    invalid: dict[str, list[Any]] = {}
+    for category, records, schema in (
+        ("characters", ctx.characters, CharacterData),
+        ("artifacts", ctx.artifacts, ArtifactData),
+        ("weapons", ctx.weapons, WeaponData),
+    ):
+        category_invalid, category_errors = _validate_category(
+            records, schema, category
+        )
+        checked += len(records)
+        if category_invalid:
+            ctx.drop_invalid(category, category_invalid)
+            invalid[category] = category_invalid
+            errors[category] = category_errors
+    # Substat rolls are not checked against a schema, but rows missing a
+    # value are dropped while loading them and belong in the report
+    ctx.preload("artifact_substats")
+    dropped = {
+        table: dict(keys.most_common())
+        for table, keys in sorted(DROPPED_RECORDS.items())
+        if keys
+    }
+    return ValidationResult(checked, errors, invalid, dropped)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+STATE_PATH = Path("./output/state.json")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-serialisable generation inputs"""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class GenerationState:
+    """Fingerprints of every generated entity from previous runs.
+
+    Entities are keyed by category (``characters``, ``artifacts``, ``weapons``)
+    and output directory name. Entries that were regenerated but not yet
+    copied into ``src/data`` are tracked as pending so that a ``--no-copy``
+    run is picked up by the next copy.
+    """
+
+    def __init__(self, path: Path = STATE_PATH, force: bool = False):
+        self.path = path
+        self.force = force
+        self.fingerprints: dict[str, dict[str, str]] = {}
+        self.pending: dict[str, set[str]] = {}
+        # Entities this run generated or found unchanged
+        self.current: dict[str, set[str]] = {}
+        self.skipped = 0
+        try:
+            with path.open() as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.fingerprints = data.get("fingerprints", {})
+        self.pending = {k: set(v) for k, v in data.get("pending", {}).items()}
+
+    def previous(self, category: str, name: str) -> str | None:
+        """Fingerprint from the last run, or None if it should be regenerated"""
+        if self.force:
+            return None
+        return self.fingerprints.get(category, {}).get(name)
+
+    def record(self, category: str, name: str, digest: str | None = None):
+        """Store a regenerated entity's fingerprint and queue it for copying"""
+        if digest is not None:
+            self.fingerprints.setdefault(category, {})[name] = digest
+        self.pending.setdefault(category, set()).add(name)
+
+    def mark_generated(self, category: str, name: str):
+        self.current.setdefault(category, set()).add(name)
+
+    def generated(self, category: str) -> dict[str, str]:
+        """Fingerprints of the entities this run generated or found unchanged"""
+        fingerprints = self.fingerprints.get(category, {})
+        return {
+            name: fingerprints[name]
+            for name in sorted(self.current.get(category, set()))
+            if name in fingerprints
+        }
+
+    def forget(self, category: str, name: str):
+        self.fingerprints.get(category, {}).pop(name, None)
+        self.pending.get(category, set()).discard(name)
+        self.current.get(category, set()).discard(name)
+
+    def changed(self, category: str) -> set[str]:
+        return set(self.pending.get(category, set()))
+
+    def mark_copied(self, category: str):
+        self.pending.pop(category, None)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as file:
+            json.dump(
+                {
+                    "fingerprints": self.fingerprints,
+                    "pending": {k: sorted(v) for k, v in self.pending.items()},
+                },
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+        tmp_path.replace(self.path)
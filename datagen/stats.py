@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from copy_data import BASE_DATA
+from encoding import decode_floats
+from scaling_engine import CHARACTER_STATS, MAX_ASCENSION, artifact_main_stat_array
+
+# GOOD stat keys, in the column order of evaluate_builds
+STAT_KEYS = (
+    "hp",
+    "hp_",
+    "atk",
+    "atk_",
+    "def",
+    "def_",
+    "eleMas",
+    "enerRech_",
+    "heal_",
+    "critRate_",
+    "critDMG_",
+    "physical_dmg_",
+    "anemo_dmg_",
+    "geo_dmg_",
+    "electro_dmg_",
+    "hydro_dmg_",
+    "pyro_dmg_",
+    "cryo_dmg_",
+    "dendro_dmg_",
+)
+STAT_INDEX = {stat: i for i, stat in enumerate(STAT_KEYS)}
+PERCENT_STATS = {"hp_": "hp", "atk_": "atk", "def_": "def_"}
+SLOTS = ("flower", "plume", "sands", "goblet", "circlet")
+
+# A GOOD build: {"character": ICharacter?, "weapon": IWeapon?, "artifacts": {...}}
+Build = dict[str, Any]
+Record = dict[str, Any]
+
+
+def _load_json(path: Path) -> Any:
+    with path.open(encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _load_curves(path: Path) -> dict[str, list[float]]:
+    if not path.exists():
+        return {}
+    return {name: decode_floats(curve) for name, curve in _load_json(path).items()}
+
+
+def _entity_dirs(path: Path) -> list[Path]:
+    return sorted(p for p in path.iterdir() if (p / "data.json").exists())
+
+
+class StatCalculator:
+    """Batched port of the app's stat math over a generated data directory.
+
+    Mirrors ``getCharacterBaseStats``, ``getWeaponBaseAtk``,
+    ``getWeaponSubstat`` and ``getMainStat`` from ``src/utils``, and the
+    totals shown by ``StatsTable``, so a whole build library can be scored
+    without the UI. Both the expanded and compact data formats are read.
+    """
+
+    def __init__(self, data_dir: Path = BASE_DATA):
+        self.data_dir = data_dir
+        self._load_characters(data_dir / "characters")
+        self._load_weapons(data_dir / "weapons")
+        self.artifact_stats, self.artifact_main_stats = artifact_main_stat_array(
+            _load_json(data_dir / "artifacts" / "scaling.json")
+        )
+
+    def _load_characters(self, path: Path):
+        curves = _load_curves(path / "curves.json")
+        self.character_index: dict[str, int] = {}
+        bases, multipliers, ascensions = [], [], []
+        for i, directory in enumerate(_entity_dirs(path)):
+            data = _load_json(directory / "data.json")
+            scalings = data["scalings"]
+            self.character_index[directory.name] = i
+            bases.append([data["base"][k] for k in CHARACTER_STATS])
+            if "level_multipliers" in scalings:
+                multipliers.append(
+                    [
+                        [lvl[k] for k in CHARACTER_STATS]
+                        for lvl in scalings["level_multipliers"]
+                    ]
+                )
+            else:
+                multipliers.append(
+                    list(zip(*(curves[data["curves"][k]] for k in CHARACTER_STATS)))
+                )
+            ascensions.append(
+                [
+                    [scalings["ascension_values"][str(asc)][k] for k in CHARACTER_STATS]
+                    for asc in range(MAX_ASCENSION + 1)
+                ]
+            )
+
+        # (character, level, ascension, stat) base stats, as in character_table
+        bases = np.array(bases, dtype=np.float64).reshape(-1, len(CHARACTER_STATS))
+        self.character_table = (
+            bases[:, None, None, :]
+            * np.array(multipliers, dtype=np.float64)[:, :, None, :]
+            + np.array(ascensions, dtype=np.float64)[:, None, :, :]
+        )
+
+    def _load_weapons(self, path: Path):
+        curves = _load_curves(path / "curves.json")
+        self.weapon_index: dict[str, int] = {}
+        atk, ascensions, substat_keys, substats = [], [], [], []
+        for i, directory in enumerate(_entity_dirs(path)):
+            data = _load_json(directory / "data.json")
+            self.weapon_index[directory.name] = i
+
+            scaled = {}
+            for stat, values in data["stats"].items():
+                if stat in data.get("scalings", {}):
+                    multipliers = data["scalings"][stat]
+                else:
+                    multipliers = curves[values["curve"]]
+                scaled[stat] = [values["base_value"] * m for m in multipliers]
+
+            atk.append(scaled.pop("base_atk"))
+            ascensions.append(
+                [
+                    data["ascension_base_atk"].get(str(asc), np.nan)
+                    for asc in range(MAX_ASCENSION + 1)
+                ]
+            )
+            # Weapons roll at most one substat besides their base ATK
+            substat = next(iter(scaled), None)
+            substat_keys.append(STAT_INDEX.get(substat, -1))
+            substats.append(scaled.get(substat, [np.nan] * len(atk[-1])))
+
+        # (weapon, level, ascension) base ATK; NaN past a weapon's max ascension
+        self.weapon_atk_table = (
+            np.array(atk, dtype=np.float64)[:, :, None]
+            + np.array(ascensions, dtype=np.float64)[:, None, :]
+        )
+        self.weapon_substat_keys = np.array(substat_keys, dtype=np.intp)
+        self.weapon_substats = np.array(substats, dtype=np.float64)
+
+    def character_base_stats(
+        self,
+        keys: Sequence[str],
+        levels: Sequence[int],
+        ascensions: Sequence[int],
+    ) -> np.ndarray:
+        """``(query, stat)`` hp/atk/def_ base stats, without weapon ATK"""
+        indices = np.array([self.character_index[k] for k in keys], dtype=np.intp)
+        return self.character_table[
+            indices, np.asarray(levels, dtype=np.intp) - 1, ascensions
+        ]
+
+    def weapon_base_atk(
+        self,
+        keys: Sequence[str],
+        levels: Sequence[int],
+        ascensions: Sequence[int],
+    ) -> np.ndarray:
+        indices = np.array([self.weapon_index[k] for k in keys], dtype=np.intp)
+        return self.weapon_atk_table[
+            indices, np.asarray(levels, dtype=np.intp) - 1, ascensions
+        ]
+
+    def artifact_main_stat(
+        self,
+        rarities: Sequence[int],
+        levels: Sequence[int],
+        stats: Sequence[str],
+    ) -> np.ndarray:
+        """Main stat values in display units, i.e. percentages scaled by 100"""
+        stat_index = {stat: i for i, stat in enumerate(self.artifact_stats)}
+        columns = np.array([stat_index[stat] for stat in stats], dtype=np.intp)
+        values = self.artifact_main_stats[
+            np.asarray(rarities, dtype=np.intp),
+            np.asarray(levels, dtype=np.intp),
+            columns,
+        ]
+        return np.where(values < 1, values * 100, values)
+
+    def artifact_vectors(self, artifacts: Sequence[Record]) -> np.ndarray:
+        """``(artifact, stat)`` main stat and substat values in display units"""
+        vectors = np.zeros((len(artifacts), len(STAT_KEYS)))
+        if not artifacts:
+            return vectors
+        vectors[
+            np.arange(len(artifacts)),
+            [STAT_INDEX[a["mainStatKey"]] for a in artifacts],
+        ] = self.artifact_main_stat(
+            [a["rarity"] for a in artifacts],
+            [a["level"] for a in artifacts],
+            [a["mainStatKey"] for a in artifacts],
+        )
+        rows, keys, values = [], [], []
+        for i, artifact in enumerate(artifacts):
+            for substat in artifact["substats"]:
+                if substat["key"] in STAT_INDEX:
+                    rows.append(i)
+                    keys.append(STAT_INDEX[substat["key"]])
+                    values.append(substat["value"])
+        np.add.at(vectors, (rows, keys), values)
+        return vectors
+
+    def build_totals(
+        self, builds: Sequence[Build]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Base stats, stat totals and character presence of many builds.
+
+        Returns the ``(build, hp/atk/def_)`` base stats with weapon ATK, the
+        ``(build, stat)`` sums of artifact and weapon stats, and a mask of
+        builds with a character, ready for final_stats.
+        """
+        count = len(builds)
+        characters = [b.get("character") for b in builds]
+        weapons = [b.get("weapon") for b in builds]
+        has_character = np.array([c is not None for c in characters], dtype=bool)
+        has_weapon = np.array([w is not None for w in weapons], dtype=bool)
+
+        base = np.full((count, len(CHARACTER_STATS)), np.nan)
+        rows = np.flatnonzero(has_character)
+        if len(rows):
+            base[rows] = self.character_base_stats(
+                [characters[i]["key"] for i in rows],
+                [characters[i]["level"] for i in rows],
+                [characters[i]["ascension"] for i in rows],
+            )
+
+        rows = np.flatnonzero(has_weapon)
+        weapon_rows = np.array(
+            [self.weapon_index[weapons[i]["key"]] for i in rows], dtype=np.intp
+        )
+        weapon_levels = np.array([weapons[i]["level"] for i in rows], dtype=np.intp)
+        if len(rows):
+            base[rows, 1] += self.weapon_base_atk(
+                [weapons[i]["key"] for i in rows],
+                weapon_levels,
+                [weapons[i]["ascension"] for i in rows],
+            )
+
+        # (build, stat) sums of every artifact main stat and substat
+        totals = np.zeros((count, len(STAT_KEYS)))
+        owners, artifacts = [], []
+        for i, build in enumerate(builds):
+            for slot in SLOTS:
+                artifact = build.get("artifacts", {}).get(slot)
+                if artifact:
+                    owners.append(i)
+                    artifacts.append(artifact)
+        np.add.at(totals, owners, self.artifact_vectors(artifacts))
+
+        # Weapon substats only count when both a weapon and character are set
+        equipped = has_character[rows]
+        substat_keys = self.weapon_substat_keys[weapon_rows[equipped]]
+        substats = self.weapon_substats[
+            weapon_rows[equipped], weapon_levels[equipped] - 1
+        ]
+        valid = substat_keys >= 0
+        substats = np.where(substats < 1, substats * 100, substats)
+        np.add.at(totals, (rows[equipped][valid], substat_keys[valid]), substats[valid])
+
+        return base, totals, has_character
+
+    def evaluate_builds(self, builds: Sequence[Build]) -> dict[str, np.ndarray]:
+        """Score many builds at once, see final_stats"""
+        return final_stats(*self.build_totals(builds))
+
+
+def final_stats(
+    base: np.ndarray, totals: np.ndarray, has_character: np.ndarray | None = None
+) -> dict[str, np.ndarray]:
+    """The values StatsTable shows, from the outputs of build_totals.
+
+    Returns one array per stat, indexed like the rows of ``totals``.
+    ``base_hp``, ``base_atk`` and ``base_def`` are the character base stats
+    (with weapon ATK), NaN for builds without a character. Every GOOD stat key
+    holds the bonus StatsTable displays for it, with ``hp``, ``atk`` and
+    ``def`` including the bonus from their percent stats.
+    """
+    if has_character is None:
+        has_character = np.ones(len(totals), dtype=bool)
+    results = {
+        "base_hp": base[:, 0],
+        "base_atk": base[:, 1],
+        "base_def": base[:, 2],
+    }
+    for stat in STAT_KEYS:
+        results[stat] = totals[:, STAT_INDEX[stat]]
+
+    # Percent stats scale the character base, or 1 without a character
+    for percent, flat in (("hp_", "hp"), ("atk_", "atk"), ("def_", "def")):
+        base_value = np.where(
+            has_character, base[:, CHARACTER_STATS.index(PERCENT_STATS[percent])], 1
+        )
+        results[flat] = results[flat] + results[percent] / 100 * base_value
+    return results
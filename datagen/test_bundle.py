@@ -0,0 +1,127 @@
+"""Bundle encoding round-trips and the errors DataBundle raises on bad files."""
+
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from bundle import (
+    BUNDLE_MAGIC,
+    HEADER,
+    INDEX_ENTRY,
+    BundleError,
+    DataBundle,
+    encode_bundle,
+)
+
+ARRAYS = {
+    "characters/Albedo": np.arange(100 * 7 * 3, dtype=float).reshape(100, 7, 3),
+    "weapons/AquilaFavonia/base_atk": np.linspace(0, 674, 700).reshape(100, 7),
+    "weapons/AquilaFavonia/physical_dmg_": np.linspace(9, 41.3, 100),
+    "curves/characters/GROW_CURVE_HP_S5": np.array([1.0, 1.083, np.nan]),
+}
+
+
+@pytest.fixture
+def bundle_bytes() -> bytes:
+    return encode_bundle(ARRAYS)
+
+
+def _write(tmp_path: Path, data: bytes) -> Path:
+    path = tmp_path / "data.bundle"
+    path.write_bytes(data)
+    return path
+
+
+def _data_end(data: bytes) -> int:
+    """End of the last array, past which only alignment padding follows"""
+    _, _, count, _ = HEADER.unpack_from(data)
+    return max(
+        offset + size * 4
+        for _, offset, size, *_ in (
+            INDEX_ENTRY.unpack_from(data, HEADER.size + i * INDEX_ENTRY.size)
+            for i in range(count)
+        )
+    )
+
+
+def _check_array(bundle: DataBundle, name: str, expected: np.ndarray):
+    # A separate function, so the view is released before the bundle closes
+    array = bundle.array(name)
+    assert array.shape == expected.shape
+    assert array.dtype == np.float32
+    np.testing.assert_array_equal(array, expected.astype(np.float32))
+    # Arrays are 64-byte aligned, read-only views of the mapping
+    assert array.ctypes.data % 64 == 0
+    assert not array.flags.writeable
+
+
+def test_round_trip(tmp_path: Path, bundle_bytes: bytes):
+    with DataBundle(_write(tmp_path, bundle_bytes)) as bundle:
+        assert sorted(bundle.names()) == sorted(ARRAYS)
+        assert sorted(bundle.names("weapons/")) == [
+            "weapons/AquilaFavonia/base_atk",
+            "weapons/AquilaFavonia/physical_dmg_",
+        ]
+        for name, expected in ARRAYS.items():
+            _check_array(bundle, name, expected)
+        assert "characters/Albedo" in bundle
+        assert bundle.character_base_stat("Albedo", 2, 1, "atk") == 3 * 7 + 3 + 1
+        with pytest.raises(KeyError):
+            bundle.array("characters/Nobody")
+
+
+def test_encoding_is_deterministic():
+    reordered = dict(reversed(ARRAYS.items()))
+
+    assert encode_bundle(reordered) == encode_bundle(ARRAYS)
+
+
+@pytest.mark.parametrize(
+    "name, array",
+    [("x" * 65, np.zeros(1)), ("deep", np.zeros((1, 1, 1, 1, 1)))],
+    ids=["long-name", "five-dims"],
+)
+def test_unstorable_arrays(name: str, array: np.ndarray):
+    with pytest.raises(BundleError):
+        encode_bundle({name: array})
+
+
+def test_empty_file(tmp_path: Path):
+    with pytest.raises(BundleError, match="empty or truncated"):
+        DataBundle(_write(tmp_path, b""))
+
+
+def test_every_truncation_is_detected(tmp_path: Path, bundle_bytes: bytes):
+    end = _data_end(bundle_bytes)
+    lengths = sorted(
+        {*range(0, HEADER.size + 2 * INDEX_ENTRY.size), *range(0, end, 97)}
+    )
+    for length in [*lengths, end - 1]:
+        with pytest.raises(BundleError):
+            DataBundle(_write(tmp_path, bundle_bytes[:length]))
+
+
+def test_padding_after_the_last_array_is_optional(tmp_path: Path, bundle_bytes: bytes):
+    path = _write(tmp_path, bundle_bytes[: _data_end(bundle_bytes)])
+
+    with DataBundle(path) as bundle:
+        np.testing.assert_array_equal(
+            bundle.array("weapons/AquilaFavonia/physical_dmg_"),
+            ARRAYS["weapons/AquilaFavonia/physical_dmg_"].astype(np.float32),
+        )
+
+
+def test_wrong_magic_and_version(tmp_path: Path, bundle_bytes: bytes):
+    data = bytearray(bundle_bytes)
+    data[: len(BUNDLE_MAGIC)] = b"NOTDATA\0"
+    with pytest.raises(BundleError, match="not a data bundle"):
+        DataBundle(_write(tmp_path, bytes(data)))
+
+    data = bytearray(bundle_bytes)
+    struct.pack_into("<I", data, len(BUNDLE_MAGIC), 99)
+    with pytest.raises(BundleError, match="version 99"):
+        DataBundle(_write(tmp_path, bytes(data)))
@@ -0,0 +1,126 @@
+"""plan_sync and apply_sync on small generated and app trees."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+import copy_data
+from copy_data import SyncPlan, apply_sync, copy_data as sync, plan_sync
+
+
+def _write(path: Path, content: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+def _tree(path: Path) -> dict[str, str]:
+    return {
+        str(p.relative_to(path)): p.read_text()
+        for p in sorted(path.rglob("*"))
+        if p.is_file()
+    }
+
+
+@pytest.fixture
+def trees(tmp_path: Path) -> tuple[Path, Path]:
+    """A generated ``output/characters`` and the app's copy of it"""
+    source = tmp_path / "output" / "characters"
+    dest = tmp_path / "src" / "data" / "characters"
+    _write(source / "Albedo" / "data.json", "albedo v2")
+    _write(source / "Albedo" / "index.tsx", "index")
+    _write(source / "Diluc" / "data.json", "diluc")
+    _write(source / "Amber" / "data.json", "amber")
+    _write(source / "index.tsx", "barrel v2")
+
+    _write(dest / "Albedo" / "data.json", "albedo v1")
+    _write(dest / "Albedo" / "index.tsx", "index")
+    _write(dest / "Albedo" / "stale.png", "stale")
+    _write(dest / "Amber" / "data.json", "amber")
+    _write(dest / "Retired" / "data.json", "kept")
+    _write(dest / "index.tsx", "barrel v1")
+    return source, dest
+
+
+def test_plan_sync(trees: tuple[Path, Path]):
+    source, dest = trees
+
+    plan = plan_sync(source, dest)
+
+    assert sorted(plan.added) == [Path("Diluc/data.json")]
+    assert sorted(plan.changed) == [Path("Albedo/data.json"), Path("index.tsx")]
+    assert plan.removed == [Path("Albedo/stale.png")]
+    assert plan.unchanged == 2
+    assert plan.report().splitlines()[-1] == (
+        "1 added, 2 changed, 1 removed, 2 unchanged"
+    )
+
+
+def test_plan_sync_limited_to_names(trees: tuple[Path, Path]):
+    source, dest = trees
+
+    plan = plan_sync(source, dest, ["Diluc", "Missing"])
+
+    assert plan == SyncPlan([Path("Diluc/data.json")], [], [], 0)
+
+
+@pytest.mark.parametrize("link", [True, False], ids=["link", "copy"])
+def test_apply_sync(trees: tuple[Path, Path], link: bool):
+    source, dest = trees
+
+    apply_sync(plan_sync(source, dest), source, dest, link=link)
+
+    # Entries missing from the source altogether are left alone
+    assert _tree(dest) == {**_tree(source), "Retired/data.json": "kept"}
+    assert plan_sync(source, dest) == SyncPlan([], [], [], 5)
+    if link:
+        assert os.path.samefile(
+            source / "Diluc" / "data.json", dest / "Diluc" / "data.json"
+        )
+
+
+def test_apply_sync_stages_next_to_source(
+    trees: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+):
+    source, dest = trees
+    staged_in = []
+    mkdtemp = copy_data.tempfile.mkdtemp
+
+    def record_mkdtemp(**kwargs):
+        staged_in.append(Path(kwargs["dir"]))
+        return mkdtemp(**kwargs)
+
+    monkeypatch.setattr(copy_data.tempfile, "mkdtemp", record_mkdtemp)
+    apply_sync(plan_sync(source, dest), source, dest)
+
+    # Outside the app tree a dev server watches, and cleaned up afterwards
+    assert staged_in == [source.parent]
+    assert [p.name for p in source.parent.iterdir()] == ["characters"]
+
+
+def test_removing_the_last_file_removes_empty_dirs(tmp_path: Path):
+    source = tmp_path / "output"
+    dest = tmp_path / "data"
+    (source / "Albedo").mkdir(parents=True)
+    _write(dest / "Albedo" / "icons" / "old.png", "old")
+
+    apply_sync(plan_sync(source, dest), source, dest)
+
+    assert not (dest / "Albedo").exists()
+    assert dest.is_dir()
+
+
+def test_dry_run_leaves_dest_untouched(
+    trees: tuple[Path, Path], capsys: pytest.CaptureFixture
+):
+    source, dest = trees
+    before = _tree(dest)
+
+    plan = sync(source, dest, dry_run=True)
+
+    assert _tree(dest) == before
+    assert "+ Diluc/data.json" in capsys.readouterr().out
+    assert plan.added == [Path("Diluc/data.json")]
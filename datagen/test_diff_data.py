@@ -0,0 +1,159 @@
+"""Stat flattening and the report diff_generation prints after each run."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import diff_data
+from diff_data import (
+    IGNORED_PATHS,
+    GenerationSnapshot,
+    _format_delta,
+    diff_generation,
+    flatten_stats,
+)
+from state import GenerationState, fingerprint
+
+
+def _write_json(path: Path, data: Any):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def _character(hp: float) -> dict[str, Any]:
+    return {
+        "name": "Albedo",
+        "id": 10000038,
+        "base": {"hp": hp, "atk": 19.5, "def_": 68.2},
+        "scalings": {
+            "ascension_values": {"1": {"hp": 300.0}},
+            "level_multipliers": [[1.0, 1.0, 1.0], [1.08, 1.08, 1.08]],
+        },
+    }
+
+
+class Run:
+    """Writes one generation's output and diffs it against the last one"""
+
+    def __init__(self, tmp_path: Path):
+        self.output = tmp_path / "output"
+        self.snapshot_path = tmp_path / "generation.json"
+        self.state = GenerationState(tmp_path / "state.json")
+
+    def entity(self, category: str, name: str, data: dict[str, Any]):
+        _write_json(self.output / category / name / "data.json", data)
+        self.state.record(category, name, fingerprint(data))
+        self.state.mark_generated(category, name)
+
+    def diff(self, dropped: dict[str, dict[str, int]] | None = None):
+        result = diff_generation(
+            self.state, dropped or {}, GenerationSnapshot(self.snapshot_path)
+        )
+        self.state.current.clear()
+        return result
+
+
+@pytest.fixture
+def run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Run:
+    run = Run(tmp_path)
+    monkeypatch.setattr(diff_data, "OUTPUT_PATH", run.output)
+    return run
+
+
+def test_flatten_stats_skips_ignored_paths():
+    stats = flatten_stats(_character(1029.5), ignored=IGNORED_PATHS["characters"])
+
+    assert stats == {
+        "id": 10000038,
+        "base.hp": 1029.5,
+        "base.atk": 19.5,
+        "base.def_": 68.2,
+        "scalings.ascension_values.1.hp": 300.0,
+    }
+    weapon = {"stats": {"base_atk": {"base_value": 47.5}}, "scalings": [[1.0]]}
+    assert flatten_stats(weapon, ignored=IGNORED_PATHS["weapons"]) == {
+        "stats.base_atk.base_value": 47.5
+    }
+    # Booleans and strings are not stats
+    assert flatten_stats({"a": [True, "x", 2]}) == {"a.2": 2}
+
+
+@pytest.mark.parametrize(
+    "old, new, expected",
+    [
+        # Integers past 1e6 stay exact rather than switching to exponent form
+        (10000005, 10000007, "id 10000005 -> 10000007 (+2)"),
+        (1029.5, 1000.0, "id 1029.5 -> 1000 (-29.5)"),
+        (None, 0.05, "id added (0.05)"),
+        (47, None, "id removed (47)"),
+    ],
+)
+def test_format_delta(old, new, expected: str):
+    assert _format_delta("id", old, new) == expected
+
+
+def test_first_run_only_records(run: Run):
+    run.entity("characters", "Albedo", _character(1029.5))
+
+    result = run.diff()
+
+    assert not result.compared
+    assert result.report() == (
+        "Recorded 1 entities to compare the next generation with"
+    )
+    assert run.snapshot_path.exists()
+
+
+def test_unchanged_run(run: Run):
+    run.entity("characters", "Albedo", _character(1029.5))
+    run.diff()
+    # The output is not read again while the fingerprint matches
+    (run.output / "characters" / "Albedo" / "data.json").unlink()
+    run.state.mark_generated("characters", "Albedo")
+
+    result = run.diff()
+
+    assert not result
+    assert result.categories["characters"].unchanged == 1
+    assert result.report() == "No changes since the previous generation"
+
+
+def test_changed_added_removed_and_dropped(run: Run):
+    run.entity("characters", "Albedo", _character(1029.5))
+    run.entity("weapons", "Dull", {"stats": {"base_atk": {"base_value": 23.0}}})
+    run.diff({"WeaponExcelConfigData.json": {"weaponType": 1}})
+
+    changed = _character(1000.0)
+    changed["scalings"]["level_multipliers"][1] = [1.1, 1.1, 1.1]
+    run.entity("characters", "Albedo", changed)
+    run.entity("characters", "Diluc", _character(1011.0))
+    result = run.diff({"AvatarExcelConfigData.json": {"skillDepotId": 2}})
+
+    assert result.categories["characters"].changed == {
+        "Albedo": {"base.hp": (1029.5, 1000.0)}
+    }
+    assert result.report().splitlines() == [
+        "Changes since the previous generation:",
+        "  characters: 1 added, 0 removed, 1 changed, 0 unchanged",
+        "    Added: Diluc",
+        "    Albedo: base.hp 1029.5 -> 1000 (-29.5)",
+        "  artifacts: 0 added, 0 removed, 0 changed, 0 unchanged",
+        "  weapons: 0 added, 1 removed, 0 changed, 0 unchanged",
+        "    Removed: Dull",
+        "  Dropped rows of AvatarExcelConfigData.json: 0 -> 2",
+        "  Dropped rows of WeaponExcelConfigData.json: 1 -> 0",
+    ]
+
+
+def test_only_text_changed(run: Run):
+    run.entity("characters", "Albedo", _character(1029.5))
+    run.diff()
+    run.entity("characters", "Albedo", {**_character(1029.5), "name": "Albedo "})
+
+    result = run.diff()
+
+    assert "    Albedo: non-numeric fields" in result.report().splitlines()
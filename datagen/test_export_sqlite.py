@@ -0,0 +1,216 @@
+"""write_database over a small generated data directory."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from encoding import encode_floats
+from export_sqlite import write_database
+
+CURVE = [1.0, 1.5, 2.25]
+TABLES = {
+    "characters": 2,
+    "weapons": 1,
+    "weapon_stats": 2,
+    "artifact_sets": 2,
+    "artifact_pieces": 4,
+    "artifact_main_stats": 4,
+    "curves": 6,
+    # Two characters with two ascensions of three stats, one weapon with two
+    "ascension_values": 14,
+}
+
+
+def _write_json(path: Path, data: Any):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def _character(key: str, id: int) -> dict[str, Any]:
+    return {
+        "name": key,
+        "id": id,
+        "ascension_id": id % 100,
+        "icon": f"UI_AvatarIcon_{key}",
+        "weapon_type": "Sword",
+        "base": {"hp": 1000.0, "atk": 20.0, "def_": 60.0},
+        "curves": dict.fromkeys(("hp", "atk", "def_"), "GROW_CURVE_HP_S5"),
+        "scalings": {
+            "ascension_values": {
+                str(asc): {"hp": 300.0 * asc, "atk": 6.0 * asc, "def_": 20.0 * asc}
+                for asc in range(2)
+            }
+        },
+    }
+
+
+def _piece(slot: str, id: int, set_id: int) -> dict[str, Any]:
+    return {
+        "name": f"Piece{id}",
+        "id": id,
+        "set_id": set_id,
+        "icon": f"UI_RelicIcon_{id}",
+        "slot": slot,
+    }
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Path:
+    path = tmp_path / "output"
+    _write_json(
+        path / "characters" / "curves.json",
+        {"GROW_CURVE_HP_S5": encode_floats(CURVE, "float32")},
+    )
+    _write_json(
+        path / "characters" / "Albedo" / "data.json", _character("Albedo", 10000038)
+    )
+    (path / "characters" / "Albedo" / "avatar.png").write_bytes(b"png")
+    _write_json(
+        path / "characters" / "Diluc" / "data.json", _character("Diluc", 10000016)
+    )
+
+    _write_json(path / "weapons" / "curves.json", {"GROW_CURVE_ATTACK_301": CURVE})
+    _write_json(
+        path / "weapons" / "AquilaFavonia" / "data.json",
+        {
+            "name": "Aquila Favonia",
+            "id": 11501,
+            "ascension_id": 1501,
+            "icon": "UI_EquipIcon_Sword_Dvalin",
+            "type": "Sword",
+            "rarity": 5,
+            "stats": {
+                "base_atk": {
+                    "type": "FIGHT_PROP_BASE_ATTACK",
+                    "base_value": 47.5,
+                    "curve": "GROW_CURVE_ATTACK_301",
+                },
+                "physical_dmg_": {
+                    "type": "FIGHT_PROP_PHYSICAL_ADD_HURT",
+                    "base_value": 0.09,
+                    "curve": "GROW_CURVE_ATTACK_301",
+                },
+            },
+            "ascension_base_atk": {"0": 0, "1": 31.1},
+        },
+    )
+
+    _write_json(
+        path / "artifacts" / "GladiatorsFinale" / "data.json",
+        {
+            "name": "Gladiator's Finale",
+            "pieces": {
+                "flower": _piece("flower", 75514, 15001),
+                "plume": _piece("plume", 75524, 15001),
+            },
+        },
+    )
+    _write_json(
+        path / "artifacts" / "Mixed" / "data.json",
+        {
+            "name": "Mixed",
+            "pieces": {
+                # Pieces from two set ids leave the set's id empty
+                "flower": _piece("flower", 70001, 15002),
+                "plume": _piece("plume", 70002, 15003),
+            },
+        },
+    )
+    _write_json(
+        path / "artifacts" / "scaling.json",
+        {"5": {"0": {"hp": 717.0, "atk": 47.0}, "20": {"hp": 4780.0, "atk": 311.0}}},
+    )
+    return path
+
+
+def _query(path: Path, sql: str) -> list[tuple]:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(sql).fetchall()
+    finally:
+        connection.close()
+
+
+def test_row_counts(tmp_path: Path, data_dir: Path):
+    path = tmp_path / "data.sqlite"
+
+    count = write_database(data_dir, path)
+
+    assert count == sum(TABLES.values())
+    for table, rows in TABLES.items():
+        assert _query(path, f"SELECT COUNT(*) FROM {table}") == [(rows,)], table
+    assert not path.with_suffix(".tmp").exists()
+
+
+def test_foreign_keys_and_indexes(tmp_path: Path, data_dir: Path):
+    path = tmp_path / "data.sqlite"
+    write_database(data_dir, path)
+
+    assert _query(path, "PRAGMA foreign_key_check") == []
+    indexes = {
+        name
+        for (name,) in _query(
+            path,
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL",
+        )
+    }
+    assert indexes == {
+        "characters_weapon_type",
+        "weapons_type",
+        "weapon_stats_stat",
+        "artifact_pieces_set_id",
+        "artifact_pieces_slot",
+        "artifact_main_stats_stat",
+    }
+
+
+def test_values(tmp_path: Path, data_dir: Path):
+    path = tmp_path / "data.sqlite"
+    write_database(data_dir, path)
+
+    assert _query(path, "SELECT key, image FROM characters ORDER BY key") == [
+        ("Albedo", "Albedo/avatar.png"),
+        ("Diluc", None),
+    ]
+    # float32 and plain curves both decode to per-level rows from level 1
+    assert _query(
+        path, "SELECT category, level, value FROM curves ORDER BY category, level"
+    ) == [
+        ("characters", 1, 1.0),
+        ("characters", 2, 1.5),
+        ("characters", 3, 2.25),
+        ("weapons", 1, 1.0),
+        ("weapons", 2, 1.5),
+        ("weapons", 3, 2.25),
+    ]
+    assert _query(path, "SELECT stat, prop_type FROM weapon_stats ORDER BY stat") == [
+        ("base_atk", "FIGHT_PROP_BASE_ATTACK"),
+        ("physical_dmg_", "FIGHT_PROP_PHYSICAL_ADD_HURT"),
+    ]
+    assert _query(path, "SELECT key, set_id FROM artifact_sets ORDER BY key") == [
+        ("GladiatorsFinale", 15001),
+        ("Mixed", None),
+    ]
+    assert _query(
+        path,
+        "SELECT value FROM ascension_values"
+        " WHERE category = 'weapons' AND ascension = 1",
+    ) == [(31.1,)]
+    assert _query(
+        path, "SELECT value FROM artifact_main_stats WHERE level = 20 AND stat = 'atk'"
+    ) == [(311.0,)]
+
+
+def test_rewrite_replaces_database(tmp_path: Path, data_dir: Path):
+    path = tmp_path / "data.sqlite"
+    write_database(data_dir, path)
+    (data_dir / "characters" / "Diluc" / "data.json").unlink()
+
+    write_database(data_dir, path)
+
+    assert _query(path, "SELECT key FROM characters") == [("Albedo",)]
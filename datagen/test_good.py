@@ -0,0 +1,207 @@
+"""GOOD import and export against the app's artifactUtil.
+
+Expected strings come from running the TypeScript side under Node, so
+_js_number and artifact_id fail here if they stop matching the app.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from good import (
+    GOODConstants,
+    GOODError,
+    GOODReader,
+    GOODWriter,
+    _js_number,
+    artifact_id,
+    merge_good,
+)
+
+CONSTANTS = {
+    "Characters": ["Albedo", "Diluc"],
+    "ArtifactSets": {"15001": "GladiatorsFinale"},
+    "ArtifactSetNames": {"GladiatorsFinale": "Gladiator's Finale"},
+    "WeaponsSword": ["AquilaFavonia"],
+    "WeaponsClaymore": ["Rainslasher"],
+    "WeaponsPolearm": [],
+    "WeaponsBow": [],
+    "WeaponsCatalyst": [],
+}
+ALBEDO = {
+    "key": "Albedo",
+    "level": 90,
+    "constellation": 0,
+    "ascension": 6,
+    "talent": {"auto": 1, "skill": 9, "burst": 6},
+}
+AQUILA = {
+    "key": "AquilaFavonia",
+    "level": 90,
+    "ascension": 6,
+    "refinement": 1,
+    "location": "Albedo",
+    "lock": True,
+}
+GLADIATOR_GOBLET = {
+    "setKey": "GladiatorsFinale",
+    "slotKey": "goblet",
+    "level": 20,
+    "rarity": 5,
+    "mainStatKey": "atk_",
+    "location": "",
+    "lock": False,
+    "substats": [
+        {"key": "critRate_", "value": 3.9},
+        {"key": "critDMG_", "value": 21.8},
+        {"key": "eleMas", "value": 23},
+        {"key": "atk", "value": 1e-7},
+    ],
+}
+
+
+@pytest.fixture
+def constants() -> GOODConstants:
+    return GOODConstants(CONSTANTS)
+
+
+def _write_good(path: Path, **sections: list[dict[str, Any]]) -> Path:
+    path.write_text(json.dumps({"format": "GOOD", "version": 2, **sections}))
+    return path
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (0, "0"),
+        (-0.0, "0"),
+        (1, "1"),
+        (-1, "-1"),
+        (100.0, "100"),
+        (0.1, "0.1"),
+        (3.9, "3.9"),
+        (0.058, "0.058"),
+        (1 / 3, "0.3333333333333333"),
+        (299.99999999999994, "299.99999999999994"),
+        (123456789.0, "123456789"),
+        (2.0**53, "9007199254740992"),
+        (1e-6, "0.000001"),
+        (0.000001234, "0.000001234"),
+        (1e-7, "1e-7"),
+        (1.5e-7, "1.5e-7"),
+        (-4.5e-9, "-4.5e-9"),
+        (1.23e-18, "1.23e-18"),
+        (5e-324, "5e-324"),
+        (1e20, "100000000000000000000"),
+        (1e21, "1e+21"),
+        (1.2345e21, "1.2345e+21"),
+        (1.7976931348623157e308, "1.7976931348623157e+308"),
+        (float("nan"), "NaN"),
+        (float("inf"), "Infinity"),
+        (float("-inf"), "-Infinity"),
+    ],
+)
+def test_js_number_matches_number_to_string(value: float, expected: str):
+    assert _js_number(value) == expected
+
+
+def test_artifact_id_matches_artifact_util():
+    assert artifact_id(GLADIATOR_GOBLET) == "GF520_R_3.9DMG_21.8M231e-7"
+
+
+def test_writer_output_is_valid_json():
+    fp = io.StringIO()
+    writer = GOODWriter(fp, source="test")
+    assert writer.write_section("characters", [ALBEDO]) == 1
+    assert writer.write_section("weapons", []) == 0
+    assert writer.write_section("artifacts", [GLADIATOR_GOBLET] * 2) == 2
+    writer.close()
+
+    assert json.loads(fp.getvalue()) == {
+        "format": "GOOD",
+        "version": 2,
+        "source": "test",
+        "characters": [ALBEDO],
+        "weapons": [],
+        "artifacts": [GLADIATOR_GOBLET, GLADIATOR_GOBLET],
+    }
+
+
+def test_merge_round_trips_normalised_records(tmp_path: Path, constants):
+    source = _write_good(
+        tmp_path / "a.json",
+        characters=[ALBEDO],
+        weapons=[AQUILA],
+        artifacts=[GLADIATOR_GOBLET],
+    )
+    merged = tmp_path / "merged.json"
+    merge_good([source], merged, constants)
+    again = tmp_path / "again.json"
+    merge_good([merged], again, constants)
+
+    data = json.loads(merged.read_text())
+    assert data["format"] == "GOOD"
+    assert data["characters"] == [ALBEDO]
+    assert data["weapons"] == [AQUILA]
+    assert data["artifacts"] == [GLADIATOR_GOBLET]
+    assert again.read_text() == merged.read_text()
+    assert not merged.with_suffix(".tmp").exists()
+
+
+def test_merge_deduplicates_and_skips_invalid(tmp_path: Path, constants):
+    unknown_set = {**GLADIATOR_GOBLET, "setKey": "Unknown"}
+    padded = {
+        **GLADIATOR_GOBLET,
+        "substats": [*GLADIATOR_GOBLET["substats"], {"key": "", "value": 0}],
+    }
+    first = _write_good(
+        tmp_path / "first.json",
+        characters=[ALBEDO, {"key": "Nobody"}],
+        weapons=[AQUILA],
+        artifacts=[GLADIATOR_GOBLET, unknown_set],
+    )
+    second = _write_good(
+        tmp_path / "second.json",
+        characters=[{**ALBEDO, "level": 80}],
+        weapons=[{**AQUILA, "location": "Nobody"}],
+        artifacts=[padded],
+    )
+    merged = tmp_path / "merged.json"
+    reader = merge_good([first, second], merged, constants)
+
+    data = json.loads(merged.read_text())
+    # The first occurrence of a character or artifact wins
+    assert data["characters"] == [ALBEDO]
+    # Weapons can legitimately repeat; unknown locations are cleared
+    assert data["weapons"] == [AQUILA, {**AQUILA, "location": ""}]
+    # The padded substat is dropped, making it a duplicate of the first
+    assert data["artifacts"] == [GLADIATOR_GOBLET]
+    assert reader.report == {
+        "characters read": 3,
+        "characters invalid": 1,
+        "characters duplicate": 1,
+        "characters written": 1,
+        "weapons read": 2,
+        "weapons written": 2,
+        "artifacts read": 3,
+        "artifacts invalid": 1,
+        "artifacts duplicate": 1,
+        "artifacts written": 1,
+    }
+    assert reader.errors == {
+        "Unknown character 'Nobody'": 1,
+        "Unknown artifact set 'Unknown'": 1,
+    }
+
+
+def test_other_formats_are_rejected(tmp_path: Path, constants):
+    path = tmp_path / "other.json"
+    path.write_text(json.dumps({"format": "EXPORT", "characters": [ALBEDO]}))
+
+    with pytest.raises(GOODError):
+        list(GOODReader([path], constants).iter_section("characters"))
@@ -0,0 +1,121 @@
+"""JSONStreamReader against json.loads, with every chunk size.
+
+A document is only ever seen one chunk at a time, so each test reads it with
+chunk sizes from a single byte upwards: numbers, strings, escapes and
+multi-byte characters all end up split across chunk boundaries somewhere.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from typing import Any
+
+import pytest
+
+from jsonstream import JSONStreamReader, iter_array, iter_object
+
+RECORDS = [
+    {"id": 10000038, "name": "Albedo", "base": {"hp": 1029.5855712890625}},
+    {"id": 10000007, "name": "Traveler", "curve": [1.0, 1.083, -2.5e-07, 1e21]},
+    {"text": 'quote " and \\ backslash\n', "unicode": "é中\U0001f600"},
+    {"escaped": "\\u00e9  ", "empty": {}, "none": [], "flags": [True, False, None]},
+    123456789012345678,
+    0.000001,
+    "",
+]
+DOCUMENT = json.dumps(RECORDS, ensure_ascii=False)
+CHUNK_SIZES = [1, 2, 3, 5, 7, 16, 64, len(DOCUMENT.encode())]
+
+
+def _binary(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def _read_array(text: str, chunk_size: int, binary: bool = True) -> list[Any]:
+    fp = _binary(text) if binary else io.StringIO(text)
+    return list(JSONStreamReader(fp, chunk_size).iter_array())
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("binary", [True, False], ids=["bytes", "text"])
+def test_array_matches_json_loads(chunk_size: int, binary: bool):
+    assert _read_array(DOCUMENT, chunk_size, binary) == json.loads(DOCUMENT)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_numbers_split_across_chunks(chunk_size: int):
+    # Each number is a valid prefix of itself, so one cut off by the end of
+    # a chunk must not be returned before the rest arrives
+    numbers = [1, 12, 123456, -98765.4321, 6.25e-3, 1.5e300, 0]
+    document = "[" + " , ".join(map(repr, numbers)) + "]"
+
+    assert _read_array(document, chunk_size) == numbers
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4])
+def test_multibyte_characters_split_across_chunks(chunk_size: int):
+    document = json.dumps(["é", "中文", "\U0001f600"], ensure_ascii=False)
+
+    assert _read_array(document, chunk_size) == ["é", "中文", "\U0001f600"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 64])
+def test_byte_order_mark_is_skipped(chunk_size: int):
+    fp = io.BytesIO(b"\xef\xbb\xbf" + DOCUMENT.encode())
+
+    assert list(JSONStreamReader(fp, chunk_size).iter_array()) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_iter_keys_with_skip(chunk_size: int):
+    document = json.dumps(
+        {
+            "format": "GOOD",
+            "skipped": {"nested": [RECORDS, {"deep": [[[]]]}], "after": "x"},
+            "records": RECORDS,
+            "tail": [1, 2, 3],
+        }
+    )
+    reader = JSONStreamReader(_binary(document), chunk_size)
+    seen = {}
+    for key in reader.iter_keys():
+        if key == "records":
+            seen[key] = list(reader.iter_array())
+        elif key == "format":
+            seen[key] = reader.value()
+        else:
+            reader.skip()
+
+    assert seen == {"format": "GOOD", "records": RECORDS}
+    assert reader.peek() == ""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_iter_object(chunk_size: int):
+    data = {"a": 1, "b": [2, 3], "c": {"d": None}, "": "empty key"}
+    reader = JSONStreamReader(_binary(json.dumps(data, indent=2)), chunk_size)
+
+    assert dict(reader.iter_object()) == data
+
+
+@pytest.mark.parametrize("document", ["[]", " [ ] ", "{}", "\n{\n}\n"])
+def test_empty_containers(document: str):
+    if document.strip().startswith("["):
+        assert list(iter_array(_binary(document))) == []
+    else:
+        assert list(iter_object(_binary(document))) == []
+
+
+@pytest.mark.parametrize(
+    "document", ['[{"id": 1}, {"id": 2', "[1, 2", "[1 2]", "[1,]", '{"a": 1}', ""]
+)
+def test_malformed_arrays_raise(document: str):
+    with pytest.raises(json.JSONDecodeError):
+        list(JSONStreamReader(_binary(document), 2).iter_array())
+
+
+@pytest.mark.parametrize("document", ['{"a": 1', '{"a" 1}', '{"a": 1,}', "[1]"])
+def test_malformed_objects_raise(document: str):
+    with pytest.raises(json.JSONDecodeError):
+        list(JSONStreamReader(_binary(document), 2).iter_object())
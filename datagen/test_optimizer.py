@@ -0,0 +1,182 @@
+"""ArtifactOptimizer against a brute force over every combination.
+
+The search only prunes what it can prove cannot reach the top k, so on an
+inventory small enough to enumerate, its scores must match the best k of
+StatCalculator.evaluate_builds over the full product of the slots.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from optimizer import (
+    MAIN_STATS,
+    ArtifactOptimizer,
+    CritObjective,
+    LinearObjective,
+    random_artifacts,
+)
+from stats import SLOTS, StatCalculator
+
+MAX_LEVEL = 100
+SETS = ["GladiatorsFinale", "EmblemOfSeveredFate", "ViridescentVenerer"]
+BUILD: dict[str, Any] = {
+    "character": {"key": "Xiao", "level": 90, "ascension": 6},
+    "weapon": {"key": "PrimordialJadeWingedSpear", "level": 90, "ascension": 6},
+    "artifacts": {},
+}
+
+
+def _write_json(path: Path, data: Any):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture(scope="module")
+def calculator(tmp_path_factory) -> StatCalculator:
+    """Compact data for one character, one weapon and the artifact sets"""
+    path = tmp_path_factory.mktemp("data")
+    curve = [1 + 0.08 * level for level in range(MAX_LEVEL)]
+    _write_json(path / "characters" / "curves.json", {"GROW_CURVE_S5": curve})
+    _write_json(
+        path / "characters" / "Xiao" / "data.json",
+        {
+            "name": "Xiao",
+            "base": {"hp": 991.0, "atk": 27.1, "def_": 62.2},
+            "curves": dict.fromkeys(("hp", "atk", "def_"), "GROW_CURVE_S5"),
+            "scalings": {
+                "ascension_values": {
+                    str(asc): {"hp": 450.0 * asc, "atk": 12.1 * asc, "def_": 28.4 * asc}
+                    for asc in range(7)
+                }
+            },
+        },
+    )
+    _write_json(path / "weapons" / "curves.json", {"GROW_CURVE_W": curve})
+    _write_json(
+        path / "weapons" / "PrimordialJadeWingedSpear" / "data.json",
+        {
+            "name": "PrimordialJadeWingedSpear",
+            "stats": {
+                "base_atk": {"base_value": 48.0, "curve": "GROW_CURVE_W"},
+                "critRate_": {"base_value": 4.8, "curve": "GROW_CURVE_W"},
+            },
+            "ascension_base_atk": {str(asc): 31.1 * asc for asc in range(7)},
+        },
+    )
+    main_stats = {stat for stats in MAIN_STATS.values() for stat in stats}
+    _write_json(
+        path / "artifacts" / "scaling.json",
+        {
+            "5": {
+                str(level): {
+                    stat: (717.0 if stat in ("hp", "atk") else 7.0) * (1 + level / 5)
+                    for stat in main_stats
+                }
+                for level in range(21)
+            }
+        },
+    )
+    for key in SETS:
+        _write_json(path / "artifacts" / key / "data.json", {"name": key})
+    return StatCalculator(path)
+
+
+def _brute_force(
+    calculator: StatCalculator,
+    artifacts: list[dict],
+    objective,
+    sets: dict[str, int],
+    top_k: int,
+) -> np.ndarray:
+    by_slot = [[a for a in artifacts if a["slotKey"] == slot] for slot in SLOTS]
+    combos = list(itertools.product(*(slot for slot in by_slot if slot)))
+    builds = [
+        {**BUILD, "artifacts": {a["slotKey"]: a for a in combo}} for combo in combos
+    ]
+    scores = objective(calculator.evaluate_builds(builds))
+    allowed = np.array(
+        [
+            all(
+                sum(a["setKey"] == key for a in combo) >= pieces
+                for key, pieces in sets.items()
+            )
+            for combo in combos
+        ]
+    )
+    scores = np.where(allowed, scores, -np.inf)
+    best = np.sort(scores)[::-1][:top_k]
+    return best[np.isfinite(best)]
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize(
+    "objective, sets",
+    [
+        (CritObjective(), {}),
+        (CritObjective("hp"), {"GladiatorsFinale": 4}),
+        (
+            LinearObjective({"eleMas": 1, "atk": 0.5}),
+            {"GladiatorsFinale": 2, "EmblemOfSeveredFate": 2},
+        ),
+    ],
+    ids=["crit", "crit-hp-4pc", "linear-2pc-2pc"],
+)
+def test_top_k_matches_brute_force(calculator, seed: int, objective, sets):
+    artifacts = random_artifacts(35, SETS, seed=seed)
+    optimizer = ArtifactOptimizer(calculator, BUILD, objective, 5, sets)
+
+    builds = optimizer.optimize(artifacts)
+
+    expected = _brute_force(calculator, artifacts, objective, sets, 5)
+    assert np.allclose([build.score for build in builds], expected)
+    assert optimizer.evaluated <= optimizer.candidates
+    for build in builds:
+        chosen = {**BUILD, "artifacts": build.artifacts}
+        assert objective(calculator.evaluate_builds([chosen]))[0] == pytest.approx(
+            build.score
+        )
+        for key, pieces in sets.items():
+            assert sum(a["setKey"] == key for a in build.artifacts.values()) >= pieces
+
+
+def test_sharded_search_matches_single_process(calculator):
+    artifacts = random_artifacts(40, SETS, seed=2)
+    optimizer = ArtifactOptimizer(calculator, BUILD, CritObjective(), 5)
+
+    single = optimizer.optimize(artifacts)
+    sharded = optimizer.optimize(artifacts, jobs=2)
+
+    assert [build.score for build in sharded] == [build.score for build in single]
+
+
+def test_empty_slots_are_skipped(calculator):
+    artifacts = [a for a in random_artifacts(40, SETS) if a["slotKey"] == "sands"]
+    optimizer = ArtifactOptimizer(calculator, BUILD, CritObjective(), 3)
+
+    builds = optimizer.optimize(artifacts)
+
+    expected = _brute_force(calculator, artifacts, CritObjective(), {}, 3)
+    assert np.allclose([build.score for build in builds], expected)
+    assert all(list(build.artifacts) == ["sands"] for build in builds)
+    assert optimizer.optimize([]) == []
+
+
+@pytest.mark.parametrize(
+    "sets",
+    [{"Unknown": 4}, {"GladiatorsFinale": 0}, {"GladiatorsFinale": 4, SETS[1]: 2}],
+)
+def test_invalid_set_constraints(calculator, sets: dict[str, int]):
+    with pytest.raises(ValueError):
+        ArtifactOptimizer(calculator, BUILD, CritObjective(), 5, sets)
+
+
+def test_negative_weights_are_rejected():
+    with pytest.raises(ValueError):
+        LinearObjective({"atk": -1})
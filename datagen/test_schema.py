@@ -0,0 +1,162 @@
+"""Source record validation and the report of what validate_sources dropped."""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from _types import ArtifactData, CharacterData, WeaponData
+from data_context import DataContext
+from fetch_data import TEXTMAP
+from schema import MAX_ERRORS, ValidationResult, validate, validate_sources
+from state import GenerationState
+
+
+def _character(id: int, **fields: Any) -> dict[str, Any]:
+    return {
+        "id": id,
+        "ascension_id": id % 100,
+        "icon": "UI_AvatarIcon_Albedo",
+        "text_map_key": "4108620722",
+        "base": {"hp": 1029.5, "atk": 19.5, "def_": 68.2},
+        "curves": dict.fromkeys(("hp", "atk", "def_"), "GROW_CURVE_HP_S5"),
+        "weapon_type": "Sword",
+        **fields,
+    }
+
+
+def _weapon(id: int, **fields: Any) -> dict[str, Any]:
+    return {
+        "id": id,
+        "ascension_id": id % 1000,
+        "icon": "UI_EquipIcon_Sword_Dvalin",
+        "text_map_key": "3378007",
+        "type": "Sword",
+        "rarity": 5,
+        "stats": {
+            "base_atk": {
+                "type": "FIGHT_PROP_BASE_ATTACK",
+                "base_value": 47.5,
+                "curve": "GROW_CURVE_ATTACK_301",
+            }
+        },
+        **fields,
+    }
+
+
+ARTIFACT = {
+    "id": 75514,
+    "icon": "UI_RelicIcon_15001_4",
+    "text_map_key": "1160889444",
+    "slot": "flower",
+    "set_id": 15001,
+}
+
+
+@pytest.fixture
+def dropped(monkeypatch: pytest.MonkeyPatch) -> defaultdict[str, Counter[str]]:
+    """Rows the loaders dropped, isolated from the shared module state"""
+    dropped: defaultdict[str, Counter[str]] = defaultdict(Counter)
+    monkeypatch.setattr("schema.DROPPED_RECORDS", dropped)
+    return dropped
+
+
+@pytest.fixture
+def ctx(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, dropped: defaultdict
+) -> DataContext:
+    """A DataContext whose source views are already loaded"""
+    # The context points the shared TextMap at its own views
+    monkeypatch.setattr(TEXTMAP, "references", TEXTMAP.references)
+    monkeypatch.setattr(TEXTMAP, "_data", TEXTMAP._data)
+    ctx = DataContext(GenerationState(tmp_path / "state.json"))
+    ctx._views.update(
+        characters=[
+            _character(10000038),
+            _character(10000016, base={"hp": "x", "atk": 1.0, "def_": 1.0}),
+        ],
+        artifacts=[ARTIFACT],
+        weapons=[_weapon(11501), _weapon(11502, rarity=None), _weapon(11503)],
+        artifact_substats={},
+    )
+    return ctx
+
+
+def test_valid_records():
+    assert validate(_character(10000038), CharacterData) == []
+    assert validate(_weapon(11501), WeaponData) == []
+    # Integer fields stored as floats and undeclared keys are accepted
+    assert validate({**ARTIFACT, "set_id": 15001.0, "extra": 1}, ArtifactData) == []
+
+
+@pytest.mark.parametrize(
+    "record, errors",
+    [
+        ({**ARTIFACT, "slot": None}, ["record.slot: expected str, got NoneType"]),
+        ({**ARTIFACT, "id": True}, ["record.id: expected int or float, got bool"]),
+        (
+            {k: v for k, v in ARTIFACT.items() if k != "icon"},
+            ["record: missing 'icon'"],
+        ),
+        ("flower", ["record: expected ArtifactData, got 'flower'"]),
+    ],
+)
+def test_artifact_errors(record: Any, errors: list[str]):
+    assert validate(record, ArtifactData) == errors
+
+
+def test_nested_errors():
+    weapon = _weapon(11501, stats={"base_atk": {"type": 1, "curve": "C"}})
+
+    assert validate(weapon, WeaponData, "weapons[11501]") == [
+        "weapons[11501].stats['base_atk']: missing 'base_value'",
+        "weapons[11501].stats['base_atk'].type: expected str, got int",
+    ]
+
+
+def test_validate_sources_drops_invalid_records(ctx: DataContext):
+    result = validate_sources(ctx)
+
+    assert result.checked == 6
+    assert result.invalid == {"characters": [10000016], "weapons": [11502]}
+    assert result.errors == {
+        "characters": ["characters[10000016].base.hp: expected int or float, got str"],
+        "weapons": ["weapons[11502].rarity: expected int or float, got NoneType"],
+    }
+    assert [c["id"] for c in ctx.characters] == [10000038]
+    assert [w["id"] for w in ctx.weapons] == [11501, 11503]
+    assert ctx.artifacts == [ARTIFACT]
+
+
+def test_validate_sources_reports_dropped_rows(
+    ctx: DataContext, dropped: defaultdict[str, Counter[str]]
+):
+    dropped["ReliquaryAffixExcelConfigData.json"]["propValue"] += 2
+    # Tables a loader cleared without dropping anything are left out
+    dropped["WeaponExcelConfigData.json"].clear()
+
+    result = validate_sources(ctx)
+
+    assert result.dropped == {"ReliquaryAffixExcelConfigData.json": {"propValue": 2}}
+    assert result.report().splitlines() == [
+        "Validated 6 source records",
+        "  Dropped 1 invalid characters:",
+        "    characters[10000016].base.hp: expected int or float, got str",
+        "  Dropped 1 invalid weapons:",
+        "    weapons[11502].rarity: expected int or float, got NoneType",
+        "  Dropped 2 rows of ReliquaryAffixExcelConfigData.json missing propValue (2)",
+    ]
+
+
+def test_report_truncates_long_error_lists():
+    errors = [f"error {i}" for i in range(MAX_ERRORS + 5)]
+    result = ValidationResult(30, {"weapons": errors}, {"weapons": [1, 2]}, {})
+
+    lines = result.report().splitlines()
+
+    assert lines[1] == "  Dropped 2 invalid weapons:"
+    assert len(lines) == 2 + MAX_ERRORS + 1
+    assert lines[-1] == "    ... and 5 more"
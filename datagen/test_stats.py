@@ -0,0 +1,414 @@
+"""StatCalculator against ports of the app's stat math in src/utils.
+
+Each helper below mirrors one TypeScript function line for line, so a change
+to either side that breaks parity fails here. Both data layouts are covered:
+expanded, with per-entity multipliers, and compact, with shared curves.json
+tables stored as plain arrays or base64 float32.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import math
+import struct
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from encoding import encode_floats
+from stats import StatCalculator
+
+MAX_LEVEL = 100
+CHARACTER_CURVES = {
+    "GROW_CURVE_HP_S5": [1 + 0.0831 * i for i in range(MAX_LEVEL)],
+    "GROW_CURVE_ATTACK_S5": [1 + 0.0917 * i for i in range(MAX_LEVEL)],
+}
+WEAPON_CURVES = {
+    "GROW_CURVE_ATTACK_301": [1 + 0.0729 * i for i in range(MAX_LEVEL)],
+    "GROW_CURVE_CRITICAL_301": [1 + 0.0451 * i for i in range(MAX_LEVEL)],
+}
+CHARACTERS = {
+    "Albedo": {
+        "base": {"hp": 1029.5855712890625, "atk": 19.551, "def_": 68.2061996},
+        "curves": {
+            "hp": "GROW_CURVE_HP_S5",
+            "atk": "GROW_CURVE_ATTACK_S5",
+            "def_": "GROW_CURVE_HP_S5",
+        },
+        "ascension_values": {
+            str(asc): {"hp": 333.7 * asc, "atk": 6.3 * asc, "def_": 22.1 * asc}
+            for asc in range(7)
+        },
+    },
+}
+WEAPONS = {
+    "TheBlackSword": {
+        "stats": {
+            "base_atk": {"base_value": 42.4, "curve": "GROW_CURVE_ATTACK_301"},
+            "critRate_": {"base_value": 0.06, "curve": "GROW_CURVE_CRITICAL_301"},
+        },
+        "ascension_base_atk": {str(asc): 31.1 * asc for asc in range(7)},
+    },
+    "FavoniusSword": {
+        "stats": {
+            "base_atk": {"base_value": 41.1, "curve": "GROW_CURVE_ATTACK_301"},
+            "enerRech_": {"base_value": 0.133, "curve": "GROW_CURVE_CRITICAL_301"},
+        },
+        "ascension_base_atk": {str(asc): 31.1 * asc for asc in range(7)},
+    },
+    "SacrificialBow": {
+        "stats": {
+            "base_atk": {"base_value": 44.3, "curve": "GROW_CURVE_ATTACK_301"},
+            "atk_": {"base_value": 0.06, "curve": "GROW_CURVE_CRITICAL_301"},
+        },
+        "ascension_base_atk": {str(asc): 31.1 * asc for asc in range(7)},
+    },
+}
+ARTIFACT_SCALING = {
+    str(rarity): {
+        str(level): {
+            "hp": 717.0 * rarity / 5 + 203.2 * level,
+            "atk": 47.0 * rarity / 5 + 13.2 * level,
+            "hp_": 0.07 + 0.0198 * level,
+            "atk_": 0.07 + 0.0198 * level,
+            "def_": 0.087 + 0.0248 * level,
+            "critRate_": 0.047 + 0.0132 * level,
+            "pyro_dmg_": 0.07 + 0.0198 * level,
+            "eleMas": 28.0 + 7.9 * level,
+        }
+        for level in range(21)
+    }
+    for rarity in (4, 5)
+}
+
+
+def _write_json(path: Path, data: Any):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def _write_data_dir(path: Path, layout: str, float_encoding: str) -> Path:
+    for category, curves in (
+        ("characters", CHARACTER_CURVES),
+        ("weapons", WEAPON_CURVES),
+    ):
+        _write_json(
+            path / category / "curves.json",
+            {name: encode_floats(v, float_encoding) for name, v in curves.items()},
+        )
+
+    for key, character in CHARACTERS.items():
+        scalings: dict[str, Any] = {"ascension_values": character["ascension_values"]}
+        if layout == "expanded":
+            scalings["level_multipliers"] = [
+                {
+                    stat: CHARACTER_CURVES[curve][level]
+                    for stat, curve in character["curves"].items()
+                }
+                for level in range(MAX_LEVEL)
+            ]
+        data = {
+            "name": key,
+            "base": character["base"],
+            "curves": character["curves"],
+            "scalings": scalings,
+        }
+        _write_json(path / "characters" / key / "data.json", data)
+
+    for key, weapon in WEAPONS.items():
+        data = {"name": key, **weapon}
+        if layout == "expanded":
+            data["scalings"] = {
+                stat: WEAPON_CURVES[values["curve"]]
+                for stat, values in weapon["stats"].items()
+            }
+        _write_json(path / "weapons" / key / "data.json", data)
+
+    _write_json(path / "artifacts" / "scaling.json", ARTIFACT_SCALING)
+    return path
+
+
+@pytest.fixture(
+    params=[("expanded", "json"), ("compact", "json"), ("compact", "float32")],
+    ids=["expanded", "compact", "compact-float32"],
+)
+def data_dir(request, tmp_path: Path) -> Path:
+    return _write_data_dir(tmp_path, *request.param)
+
+
+# Ports of src/utils, reading the same files the app imports
+
+
+class AppData:
+    def __init__(self, data_dir: Path):
+        def load(path: Path) -> Any:
+            return json.loads(path.read_text(encoding="utf-8"))
+
+        self.character_curves = load(data_dir / "characters" / "curves.json")
+        self.weapon_curves = load(data_dir / "weapons" / "curves.json")
+        self.characters = {
+            p.name: load(p / "data.json")
+            for p in (data_dir / "characters").iterdir()
+            if p.is_dir()
+        }
+        self.weapons = {
+            p.name: load(p / "data.json")
+            for p in (data_dir / "weapons").iterdir()
+            if p.is_dir()
+        }
+        self.artifact_scaling = load(data_dir / "artifacts" / "scaling.json")
+
+    # curveUtil.ts
+    @staticmethod
+    def decode_curve(curve: list[float] | str) -> list[float]:
+        if not isinstance(curve, str):
+            return curve
+        data = base64.b64decode(curve)
+        return list(struct.unpack(f"<{len(data) // 4}f", data))
+
+    def get_character_curve_value(self, name: str, level: int) -> float:
+        return self.decode_curve(self.character_curves[name])[level - 1]
+
+    def get_weapon_curve_value(self, name: str, level: int) -> float:
+        return self.decode_curve(self.weapon_curves[name])[level - 1]
+
+    # weaponUtil.ts
+    def get_stat_scaling(self, data: dict, stat: str, level: int) -> float:
+        scalings = data.get("scalings")
+        if scalings is not None and stat in scalings:
+            return scalings[stat][level - 1]
+        return self.get_weapon_curve_value(data["stats"][stat]["curve"], level)
+
+    def get_weapon_base_atk(self, weapon: dict) -> float:
+        data = self.weapons[weapon["key"]]
+        return (
+            data["stats"]["base_atk"]["base_value"]
+            * self.get_stat_scaling(data, "base_atk", weapon["level"])
+            + data["ascension_base_atk"][str(weapon["ascension"])]
+        )
+
+    def get_weapon_substat(self, weapon: dict, stat: str) -> float | None:
+        data = self.weapons[weapon["key"]]
+        substat = data["stats"].get(stat)
+        if substat:
+            return substat["base_value"] * self.get_stat_scaling(
+                data, stat, weapon["level"]
+            )
+        return None
+
+    # characterUtil.ts
+    def get_character_base_stats(
+        self, character: dict | None, weapon: dict | None = None
+    ) -> dict[str, float]:
+        if not character:
+            return {}
+        data = self.characters[character["key"]]
+        scalings = data["scalings"]
+        if "level_multipliers" in scalings:
+            level_mults = scalings["level_multipliers"][character["level"] - 1]
+        else:
+            level_mults = {
+                stat: self.get_character_curve_value(
+                    data["curves"][stat], character["level"]
+                )
+                for stat in ("hp", "atk", "def_")
+            }
+        ascension_scaled = scalings["ascension_values"][str(character["ascension"])]
+        bases = {
+            stat: data["base"][stat] * level_mults[stat] + ascension_scaled[stat]
+            for stat in ("hp", "atk", "def_")
+        }
+        if weapon:
+            bases["atk"] += self.get_weapon_base_atk(weapon)
+        return bases
+
+    # artifactUtil.ts
+    def get_main_stat(self, artifact: dict) -> float:
+        main_stat = self.artifact_scaling[str(artifact["rarity"])][
+            str(artifact["level"])
+        ][artifact["mainStatKey"]]
+        return main_stat * 100 if main_stat < 1.0 else main_stat
+
+    # statsTable.tsx
+    def get_stat_sum(
+        self,
+        artifacts: list[dict],
+        stat: str,
+        character: dict | None = None,
+        weapon: dict | None = None,
+    ) -> float:
+        total = 0.0
+        for arti in artifacts:
+            if arti["mainStatKey"] == stat and stat not in ("hp_", "atk_", "def_"):
+                total += self.get_main_stat(arti)
+            for substat in arti["substats"]:
+                if substat["key"] == stat:
+                    total += substat["value"]
+        if weapon and character:
+            weapon_stat = self.get_weapon_substat(weapon, stat) or 0
+            total += weapon_stat * 100 if weapon_stat < 1 else weapon_stat
+        return total
+
+    def get_bonus_from_percent(
+        self,
+        artifacts: list[dict],
+        stat: str,
+        character: dict | None = None,
+        weapon: dict | None = None,
+    ) -> float:
+        base = self.get_character_base_stats(character, weapon)
+        total_percent = 0.0
+        for arti in artifacts:
+            if arti["mainStatKey"] == stat:
+                total_percent += self.get_main_stat(arti)
+            for substat in arti["substats"]:
+                if substat["key"] == stat:
+                    total_percent += substat["value"]
+        if weapon and character:
+            total_percent += (self.get_weapon_substat(weapon, stat) or 0) * 100
+        base_key = {"hp_": "hp", "atk_": "atk", "def_": "def_"}[stat]
+        return total_percent / 100 * base.get(base_key, 1)
+
+    def stats_table(self, build: dict) -> dict[str, float]:
+        """Every value StatsTable renders, before toFixed"""
+        artifacts = [a for a in build.get("artifacts", {}).values() if a]
+        character, weapon = build.get("character"), build.get("weapon")
+        values = {
+            stat: self.get_stat_sum(artifacts, stat, character, weapon)
+            for stat in ("critRate_", "critDMG_", "eleMas", "enerRech_", "heal_")
+        }
+        values["atk"] = self.get_stat_sum(
+            artifacts, "atk"
+        ) + self.get_bonus_from_percent(artifacts, "atk_", character, weapon)
+        values["hp"] = self.get_stat_sum(
+            artifacts, "hp", character, weapon
+        ) + self.get_bonus_from_percent(artifacts, "hp_", character, weapon)
+        values["def"] = self.get_stat_sum(
+            artifacts, "def"
+        ) + self.get_bonus_from_percent(artifacts, "def_", character, weapon)
+        values["pyro_dmg_"] = self.get_stat_sum(
+            artifacts, "pyro_dmg_", character, weapon
+        )
+        return values
+
+
+def _artifact(slot: str, main: str, rarity: int, level: int, **substats) -> dict:
+    return {
+        "setKey": "Gladiator",
+        "slotKey": slot,
+        "rarity": rarity,
+        "level": level,
+        "mainStatKey": main,
+        "substats": [{"key": k, "value": v} for k, v in substats.items()],
+    }
+
+
+def _builds() -> list[dict]:
+    artifacts = {
+        "flower": _artifact("flower", "hp", 5, 20, critRate_=3.9, atk_=5.8),
+        "plume": _artifact("plume", "atk", 5, 16, hp_=4.7, critDMG_=14.0),
+        "sands": _artifact("sands", "atk_", 4, 12, hp=209.0, eleMas=19.0),
+        "goblet": _artifact("goblet", "pyro_dmg_", 5, 20, def_=7.3, heal_=0),
+        "circlet": _artifact("circlet", "critRate_", 5, 8, enerRech_=6.5),
+    }
+    character = {"key": "Albedo", "level": 80, "ascension": 5}
+    return [
+        {
+            "character": character,
+            "weapon": {"key": "TheBlackSword", "level": 90, "ascension": 6},
+            "artifacts": artifacts,
+        },
+        {
+            "character": {"key": "Albedo", "level": 1, "ascension": 0},
+            "weapon": {"key": "FavoniusSword", "level": 20, "ascension": 1},
+            "artifacts": {"flower": artifacts["flower"]},
+        },
+        {
+            "character": character,
+            "weapon": {"key": "SacrificialBow", "level": 70, "ascension": 4},
+            "artifacts": {**artifacts, "goblet": None},
+        },
+        # Weapon stats only count with a character, percent stats scale 1
+        {
+            "weapon": {"key": "TheBlackSword", "level": 90, "ascension": 6},
+            "artifacts": artifacts,
+        },
+        {"character": character, "artifacts": {}},
+    ]
+
+
+def test_character_base_stats(data_dir: Path):
+    app = AppData(data_dir)
+    calculator = StatCalculator(data_dir)
+    queries = [(level, asc) for level in (1, 20, 41, 80, 90, 100) for asc in (0, 6)]
+    result = calculator.character_base_stats(
+        ["Albedo"] * len(queries),
+        [level for level, _ in queries],
+        [asc for _, asc in queries],
+    )
+    for row, (level, asc) in zip(result, queries):
+        expected = app.get_character_base_stats(
+            {"key": "Albedo", "level": level, "ascension": asc}
+        )
+        assert row.tolist() == pytest.approx(
+            [expected["hp"], expected["atk"], expected["def_"]]
+        )
+
+
+def test_weapon_base_atk_and_substat(data_dir: Path):
+    app = AppData(data_dir)
+    calculator = StatCalculator(data_dir)
+    weapons = [
+        {"key": key, "level": level, "ascension": asc}
+        for key in WEAPONS
+        for level, asc in ((1, 0), (40, 1), (70, 4), (90, 6))
+    ]
+    atk = calculator.weapon_base_atk(
+        [w["key"] for w in weapons],
+        [w["level"] for w in weapons],
+        [w["ascension"] for w in weapons],
+    )
+    assert atk.tolist() == pytest.approx([app.get_weapon_base_atk(w) for w in weapons])
+
+    for weapon in weapons:
+        row = calculator.weapon_index[weapon["key"]]
+        stat = next(s for s in WEAPONS[weapon["key"]]["stats"] if s != "base_atk")
+        assert calculator.weapon_substats[row, weapon["level"] - 1] == pytest.approx(
+            app.get_weapon_substat(weapon, stat)
+        )
+
+
+def test_artifact_main_stat(data_dir: Path):
+    app = AppData(data_dir)
+    calculator = StatCalculator(data_dir)
+    queries = [
+        (rarity, level, stat)
+        for rarity in (4, 5)
+        for level in (0, 8, 20)
+        for stat in ARTIFACT_SCALING["5"]["0"]
+    ]
+    result = calculator.artifact_main_stat(*zip(*queries))
+    assert result.tolist() == pytest.approx(
+        [
+            app.get_main_stat({"rarity": r, "level": lvl, "mainStatKey": s})
+            for r, lvl, s in queries
+        ]
+    )
+
+
+def test_stats_table_totals(data_dir: Path):
+    app = AppData(data_dir)
+    builds = _builds()
+    results = StatCalculator(data_dir).evaluate_builds(builds)
+    for i, build in enumerate(builds):
+        for stat, expected in app.stats_table(build).items():
+            assert results[stat][i] == pytest.approx(expected), (i, stat)
+
+        base = app.get_character_base_stats(build.get("character"), build.get("weapon"))
+        for stat, key in (("base_hp", "hp"), ("base_atk", "atk"), ("base_def", "def_")):
+            if key in base:
+                assert results[stat][i] == pytest.approx(base[key])
+            else:
+                assert math.isnan(results[stat][i])
@@ -1,6 +1,7 @@
 import characters from "../data/characters";
 import { ICharacter } from "../types/character";
 import { IWeapon } from "../types/weapon";
+import { getCharacterCurveValue } from "./curveUtil";
 import { getWeaponBaseAtk } from "./weaponUtil";
 
 interface CharacterStats {
@@ -17,10 +18,20 @@ export const getCharacterBaseStats = (
     return {} as CharacterStats;
   }
   const charData = characters[character.key].data;
-  const levelMults: CharacterStats =
-    charData.scalings.level_multipliers[character.level - 1];
+  const scalings = charData.scalings as {
+    level_multipliers?: CharacterStats[];
+    ascension_values: Record<number, CharacterStats>;
+  };
+  // Compact data omits the level multipliers in favour of shared curves
+  const levelMults: CharacterStats = scalings.level_multipliers?.[
+    character.level - 1
+  ] ?? {
+    hp: getCharacterCurveValue(charData.curves.hp, character.level),
+    atk: getCharacterCurveValue(charData.curves.atk, character.level),
+    def_: getCharacterCurveValue(charData.curves.def_, character.level),
+  };
   const ascensionScaled: CharacterStats =
-    charData.scalings.ascension_values[character.ascension];
+    scalings.ascension_values[character.ascension];
 
   const bases = {
     hp: charData.base.hp * levelMults.hp + ascensionScaled.hp,
@@ -0,0 +1,36 @@
+import characterCurves from "../data/characters/curves.json";
+import weaponCurves from "../data/weapons/curves.json";
+
+// Curves are stored either as plain arrays or as base64 little-endian float32
+type EncodedCurve = number[] | string;
+type CurveTable = Record<string, EncodedCurve>;
+
+const decodedCurves = new Map<CurveTable, Map<string, number[]>>();
+
+const decodeCurve = (curve: EncodedCurve): number[] => {
+  if (typeof curve !== "string") {
+    return curve;
+  }
+  const bytes = Uint8Array.from(atob(curve), (char) => char.charCodeAt(0));
+  return Array.from(new Float32Array(bytes.buffer));
+};
+
+const getCurve = (table: CurveTable, name: string): number[] => {
+  let decoded = decodedCurves.get(table);
+  if (!decoded) {
+    decoded = new Map();
+    decodedCurves.set(table, decoded);
+  }
+  let curve = decoded.get(name);
+  if (!curve) {
+    curve = decodeCurve(table[name]);
+    decoded.set(name, curve);
+  }
+  return curve;
+};
+
+export const getCharacterCurveValue = (name: string, level: number): number =>
+  getCurve(characterCurves as unknown as CurveTable, name)[level - 1];
+
+export const getWeaponCurveValue = (name: string, level: number): number =>
+  getCurve(weaponCurves as unknown as CurveTable, name)[level - 1];
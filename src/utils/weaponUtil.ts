@@ -3,11 +3,24 @@ import pick from "lodash/pick";
 import weapons from "../data/weapons";
 import { StatKey } from "../types/constants";
 import { IWeapon } from "../types/weapon";
+import { getWeaponCurveValue } from "./curveUtil";
+
+type WeaponData = typeof weapons[keyof typeof weapons]["data"];
+
+// Compact data omits per-weapon scalings in favour of shared curves
+const getStatScaling = (data: WeaponData, stat: string, level: number) => {
+  const scalings = (data as { scalings?: Record<string, number[]> }).scalings;
+  return (
+    scalings?.[stat]?.[level - 1] ??
+    getWeaponCurveValue(data.stats[stat].curve, level)
+  );
+};
 
 export const getWeaponBaseAtk = (weapon: IWeapon): number => {
   const data = weapons[weapon.key as keyof typeof weapons].data;
   const weaponBaseAtk =
-    data.stats.base_atk.base_value * data.scalings.base_atk[weapon.level - 1] +
+    data.stats.base_atk.base_value *
+      getStatScaling(data, "base_atk", weapon.level) +
     data.ascension_base_atk[weapon.ascension];
   return weaponBaseAtk;
 };
@@ -20,7 +33,7 @@ export const getWeaponSubstat = (
 
   const substat = data.stats[stat as keyof typeof data.stats];
   if (substat) {
-    const scaled = substat.base_value * data.scalings[stat][weapon.level - 1];
+    const scaled = substat.base_value * getStatScaling(data, stat, weapon.level);
     return scaled;
   }
   return undefined;